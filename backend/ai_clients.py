@@ -2,10 +2,21 @@
 MarketMind — AI Clients Module
 Central access point for Gemini, Hugging Face, Groq, and Fal.ai (Flux).
 Keys are loaded from .env — the app gracefully degrades if a key is missing.
+All provider calls go through shared, pooled async HTTP clients so a slow
+completion never blocks the event loop.
 """
 import os
+import json
+import time
 import asyncio
-import requests
+import importlib.util
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from response_cache import get_response_cache, make_key
+from singleflight import SingleFlight
+from provider_router import HALF_OPEN, ProviderRouter, AllProvidersFailed, CircuitOpen
 
 # Load keys
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
@@ -16,36 +27,139 @@ FAL_KEY = os.getenv("FAL_KEY", "")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Gemini (Google Generative AI)
+# Shared HTTP connection pools
 # ──────────────────────────────────────────────────────────────────────────────
-_gemini_client = None
-
-def _get_gemini():
-    global _gemini_client
-    if _gemini_client is None:
-        if not GEMINI_API_KEY:
-            raise RuntimeError("GEMINI_API_KEY not set in .env file")
-        import google.generativeai as genai
-        genai.configure(api_key=GEMINI_API_KEY)
-        _gemini_client = genai.GenerativeModel(
-            model_name="gemini-2.0-flash",
-            generation_config={"temperature": 0.85, "max_output_tokens": 4096},
-        )
-    return _gemini_client
+# One keep-alive pool per provider so a burst against one vendor cannot starve
+# connections to the others. HTTP/2 is enabled when the `h2` package is present.
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+_PROVIDER_LIMITS = {
+    "gemini": {"max_connections": 50, "max_keepalive_connections": 20, "timeout": 60.0},
+    "groq": {"max_connections": 50, "max_keepalive_connections": 20, "timeout": 60.0},
+    "huggingface": {"max_connections": 20, "max_keepalive_connections": 10, "timeout": 20.0},
+    "openai": {"max_connections": 20, "max_keepalive_connections": 10, "timeout": 90.0},
+    "unsplash": {"max_connections": 10, "max_keepalive_connections": 5, "timeout": 10.0},
+    "serpapi": {"max_connections": 20, "max_keepalive_connections": 10, "timeout": 10.0},
+    "default": {"max_connections": 20, "max_keepalive_connections": 10, "timeout": 30.0},
+}
+
+_http_clients: dict[str, tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def _get_http_client(provider: str) -> httpx.AsyncClient:
+    """Return the pooled AsyncClient for a provider, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    cached = _http_clients.get(provider)
+    if cached is not None and cached[0] is loop and not cached[1].is_closed:
+        return cached[1]
+
+    cfg = _PROVIDER_LIMITS.get(provider, _PROVIDER_LIMITS["default"])
+    client = httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        timeout=httpx.Timeout(cfg["timeout"], connect=10.0),
+        limits=httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_keepalive_connections"],
+            keepalive_expiry=30.0,
+        ),
+    )
+    _http_clients[provider] = (loop, client)
+    return client
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client (called on application shutdown)."""
+    global _groq_client, _groq_http_client, _openai_client, _openai_http_client
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    _groq_client = _groq_http_client = None
+    _openai_client = _openai_http_client = None
+    for _, client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Gemini (Google Generative AI — REST)
+# ──────────────────────────────────────────────────────────────────────────────
+GEMINI_MODEL = "gemini-2.0-flash"
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent"
+GEMINI_GENERATION_CONFIG = {"temperature": 0.85, "maxOutputTokens": 4096}
+
+
+class GeminiError(RuntimeError):
+    """Raised when the Gemini REST API returns an error payload."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+def _gemini_text(data: dict) -> str:
+    candidates = data.get("candidates") or []
+    if not candidates:
+        feedback = data.get("promptFeedback", {})
+        raise GeminiError(200, f"No candidates returned ({feedback.get('blockReason', 'unknown reason')})")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(p.get("text", "") for p in parts)
+
+
+def _gemini_payload(prompt: str) -> dict:
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": GEMINI_GENERATION_CONFIG,
+    }
+
+
+def _gemini_error(r: httpx.Response) -> GeminiError:
+    try:
+        message = r.json().get("error", {}).get("message", r.text)
+    except ValueError:
+        message = r.text
+    return GeminiError(r.status_code, message)
+
+
+async def _gemini_request(prompt: str) -> str:
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not set in .env file")
+    client = _get_http_client("gemini")
+    r = await client.post(
+        GEMINI_URL.format(model=GEMINI_MODEL),
+        params={"key": GEMINI_API_KEY},
+        json=_gemini_payload(prompt),
+    )
+    if r.status_code != 200:
+        raise _gemini_error(r)
+    return _gemini_text(r.json())
+
+
+async def gemini_stream(prompt: str) -> AsyncIterator[str]:
+    """Yield Gemini text chunks as they arrive (server-sent events). Raises on failure."""
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not set in .env file")
+    client = _get_http_client("gemini")
+    async with client.stream(
+        "POST",
+        GEMINI_STREAM_URL.format(model=GEMINI_MODEL),
+        params={"key": GEMINI_API_KEY, "alt": "sse"},
+        json=_gemini_payload(prompt),
+    ) as r:
+        if r.status_code != 200:
+            await r.aread()
+            raise _gemini_error(r)
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = _gemini_text(json.loads(line[5:]))
+            if chunk:
+                yield chunk
+
 
 async def gemini_generate(prompt: str) -> str:
     """Generate a response from Gemini 2.0 Flash (Non-blocking) with retry."""
     try:
-        model = _get_gemini()
-        # Use to_thread for blocking genai call
-        response = await asyncio.to_thread(model.generate_content, prompt)
-        return response.text
+        return await _gemini_request(prompt)
     except Exception as e:
-        import traceback
-        print('=== FULL ERROR ===', e)
-        print('=== MESSAGE ===', str(e))
-        print('=== STACK ===')
-        traceback.print_exc()
         err_str = str(e)
         print(f"   ⚠️ [DEBUG] Gemini Exception caught: {err_str[:100]}...")
         if any(x in err_str.upper() for x in ["429", "QUOTA", "RESOURCE_EXHAUSTED", "LIMIT_EXCEEDED"]):
@@ -70,7 +184,8 @@ async def huggingface_generate(prompt: str, model: str = "mistralai/Mistral-7B-I
             "parameters": {"max_new_tokens": 1024, "temperature": 0.7}
         }
         
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=20)
+        client = _get_http_client("huggingface")
+        response = await client.post(API_URL, headers=headers, json=payload)
         if response.status_code != 200:
             return None 
 
@@ -87,74 +202,190 @@ async def huggingface_generate(prompt: str, model: str = "mistralai/Mistral-7B-I
 # ──────────────────────────────────────────────────────────────────────────────
 # Groq (LLaMA 3.1 70B, Mixtral)
 # ──────────────────────────────────────────────────────────────────────────────
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_GENERATION_PARAMS = {"temperature": 0.85, "max_tokens": 2048}
+
 _groq_client = None
+_groq_http_client = None  # the pooled client _groq_client was built on
 
 def _get_groq():
-    global _groq_client
-    if _groq_client is None:
+    global _groq_client, _groq_http_client
+    http_client = _get_http_client("groq")
+    if _groq_client is None or _groq_http_client is not http_client:
         if not GROQ_API_KEY:
             raise RuntimeError("GROQ_API_KEY not set in .env file")
-        from groq import Groq
-        # Initialize without proxies to avoid 'proxies' argument error in some environments
-        _groq_client = Groq(api_key=GROQ_API_KEY)
+        from groq import AsyncGroq
+        # Pass our own pooled client (also avoids the 'proxies' argument error in some environments)
+        _groq_client = AsyncGroq(api_key=GROQ_API_KEY, http_client=http_client)
+        _groq_http_client = http_client
     return _groq_client
 
 async def groq_generate(prompt: str, model: str = "llama-3.3-70b-versatile", system: str = "You are a helpful AI assistant.") -> str:
     """Generate a response from Groq. Raises exception on failure for fallback."""
     try:
         client = _get_groq()
-        completion = client.chat.completions.create(
+        completion = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=2048,
-            temperature=0.85,
+            **GROQ_GENERATION_PARAMS,
         )
         return completion.choices[0].message.content
     except Exception as e:
         print(f"   ⚠️ [GROQ] Error: {e}")
         raise e
 
+async def groq_stream(prompt: str, model: str = "llama-3.3-70b-versatile", system: str = "You are a helpful AI assistant.") -> AsyncIterator[str]:
+    """Yield Groq completion tokens as they arrive. Raises exception on failure for fallback."""
+    client = _get_groq()
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        **GROQ_GENERATION_PARAMS,
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Unified Generation Hub
 # ──────────────────────────────────────────────────────────────────────────────
-async def unified_generate(prompt: str, model_name: str = "groq", system: str = "You are MarketMind's expert marketing intelligence AI.") -> str:
-    """Route prompts to the requested model. Defaults to Groq (Stable) per user preference."""
+def _provider_family(model_name: str) -> str:
     m = model_name.lower()
-    
-    # Primary: Groq (llama-3.3-70b is extremely fast and stable)
-    if "llama" in m or "groq" in m or "stable" in m or model_name == "groq":
-        try: 
-            return await groq_generate(prompt, model="llama-3.3-70b-versatile", system=system)
-        except Exception as e: 
-            print(f"   🔄 [UNIFIED] Groq failed ({e}), falling back to Gemini...")
-            return await gemini_generate(prompt)
-
-    # Secondary: Gemini (fallback or explicit request)
-    res = await gemini_generate(prompt)
-    if res == "__FALLBACK_TRIGGERED__":
-        print("   🔄 [UNIFIED] Gemini exhausted. Attempting Groq fallback...")
+    return "groq" if ("llama" in m or "groq" in m or "stable" in m) else "gemini"
+
+
+def is_generation_error(text: Optional[str]) -> bool:
+    """unified_generate reports provider failures as a "⚠️ ..." message instead of raising."""
+    return isinstance(text, str) and text.startswith("⚠️")
+
+
+def _is_cacheable(text: Optional[str]) -> bool:
+    return bool(text) and not is_generation_error(text) and text != "__FALLBACK_TRIGGERED__"
+
+
+_text_router = ProviderRouter()
+
+
+def _text_preference(model_name: str) -> list[str]:
+    return ["groq", "gemini"] if _provider_family(model_name) == "groq" else ["gemini", "groq"]
+
+
+async def _route_generate(prompt: str, model_name: str, system: str) -> str:
+    # Groq (llama-3.3-70b) is the stable primary; Gemini when explicitly requested.
+    # The router skips providers whose breaker is open and records latency/errors.
+    providers = {
+        "groq": lambda: groq_generate(prompt, model=GROQ_MODEL, system=system),
+        "gemini": lambda: _gemini_request(prompt),
+    }
+    try:
+        _, text = await _text_router.call([(name, providers[name]) for name in _text_preference(model_name)])
+        return text
+    except AllProvidersFailed as e:
+        print(f"   ❌ [UNIFIED] All providers failed: {e}")
+        return generation_error_message(e)
+
+
+def generation_error_message(e: AllProvidersFailed) -> str:
+    """The "⚠️ ..." text reported to users when no provider could answer."""
+    if e.quota_exhausted:
+        return "⚠️ Multi-Model Quota Exceeded. Please wait a moment."
+    return f"⚠️ AI providers unavailable: {e}"
+
+
+_text_flight = SingleFlight("unified_generate")
+
+
+async def unified_generate(prompt: str, model_name: str = "groq", system: str = "You are MarketMind's expert marketing intelligence AI.",
+                           cache_ttl: float = 0, cache_scope: Optional[str] = None) -> str:
+    """Route prompts to the requested model. Defaults to Groq (Stable) per user preference.
+
+    Pass cache_ttl (seconds) for deterministic templates to serve repeats from the
+    response cache; cache_scope (usually the workspace id) keeps tenants apart.
+    Identical concurrent calls are coalesced into a single upstream request.
+    """
+    model_name = model_name or "groq"
+    family = _provider_family(model_name)
+    params = {"groq": GROQ_GENERATION_PARAMS, "gemini": GEMINI_GENERATION_CONFIG}[family]
+    key = make_key(family, model_name.lower(), system, prompt, params, cache_scope)
+
+    cache = get_response_cache() if cache_ttl > 0 else None
+    if cache is not None:
+        cached = await cache.get_async(key)
+        if cached is not None:
+            print(f"   ⚡ [UNIFIED] Response cache hit ({key[:12]})")
+            return cached
+
+    async def _generate() -> str:
+        result = await _route_generate(prompt, model_name, system)
+        if cache is not None and _is_cacheable(result):
+            await cache.set_async(key, result, cache_ttl)
+        return result
+
+    return await _text_flight.do(key, _generate)
+
+async def unified_stream(prompt: str, model_name: str = "groq", system: str = "You are MarketMind's expert marketing intelligence AI.") -> AsyncIterator[str]:
+    """Streaming twin of unified_generate: yields tokens as the provider produces them.
+    Falls back to the other provider only if the primary fails before the first token.
+    Raises AllProvidersFailed when no provider produced one, so callers can report the
+    failure out of band instead of streaming it as text."""
+    model_name = model_name or "groq"
+    providers = {
+        "groq": lambda: groq_stream(prompt, model=GROQ_MODEL, system=system),
+        "gemini": lambda: gemini_stream(prompt),
+    }
+
+    errors: dict[str, BaseException] = {}
+    for name in _text_preference(model_name):
+        health = _text_router.health(name)
+        if not health.acquire():
+            errors[name] = CircuitOpen(name)
+            continue
+        probe = health.state == HALF_OPEN
+        started = time.perf_counter()
+        emitted = False
         try:
-            return await groq_generate(prompt, model="llama-3.3-70b-versatile", system=system)
-        except:
-            return "⚠️ Multi-Model Quota Exceeded. Please wait a moment."
-    
-    return res
+            async for token in providers[name]():
+                if not emitted:
+                    # time-to-first-token is what matters for streaming health
+                    health.record_success(time.perf_counter() - started)
+                    emitted = True
+                yield token
+            return
+        except Exception as e:
+            if emitted:
+                print(f"   ⚠️ [UNIFIED] {name} stream broke mid-response: {e}")
+                return
+            health.record_failure(e)
+            print(f"   🔄 [UNIFIED] {name} stream failed ({e}), trying next provider...")
+            errors[name] = e
+        finally:
+            # Client went away before the first token: the probe produced no verdict
+            if probe and not emitted and health.probe_in_flight:
+                health.release()
+    raise AllProvidersFailed(errors)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Image Generation: DALL-E & Fal.ai (Flux)
 # ──────────────────────────────────────────────────────────────────────────────
 _openai_client = None
+_openai_http_client = None  # the pooled client _openai_client was built on
 
 def _get_openai():
-    global _openai_client
-    if _openai_client is None:
+    global _openai_client, _openai_http_client
+    http_client = _get_http_client("openai")
+    if _openai_client is None or _openai_http_client is not http_client:
         if not OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY not set in .env file")
         from openai import AsyncOpenAI
-        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+        _openai_http_client = http_client
     return _openai_client
 
 async def dalle_generate(prompt: str, size: str = "1024x1024") -> str:
@@ -184,10 +415,10 @@ async def unsplash_fallback(prompt: str) -> str:
         # Extract key words from prompt
         search_query = prompt.split()[0] if prompt else "modern"
         
-        r = requests.get(
+        client = _get_http_client("unsplash")
+        r = await client.get(
             "https://api.unsplash.com/search/photos",
             params={"query": search_query, "per_page": 1, "client_id": "demo"},  # Using demo client
-            timeout=10
         )
         
         if r.status_code == 200:
@@ -239,79 +470,106 @@ async def pollinations_generate(prompt: str) -> str:
         print(f"   ⚠️ [POLLINATIONS] Error: {e}")
         return None
 
-async def flux_generate(prompt: str) -> str:
-    """Generate a high-end image from Fal.ai (Flux.1) with multiple fallbacks."""
-    try:
-        if not FAL_KEY:
-            print(f"   ⚠️ Flux: FAL_KEY not set")
-            raise Exception("FAL_KEY not configured")
-        
-        print(f"   📡 [FLUX] Starting Flux image generation...")
-        os.environ["FAL_KEY"] = FAL_KEY  # Ensure FAL_KEY is in environment
+# Image cascade: "serial" tries providers one after another (original behaviour);
+# "race" gives Flux a short head start, then launches every fallback concurrently.
+IMAGE_CASCADE_MODE = os.getenv("IMAGE_CASCADE_MODE", "serial").lower()
+IMAGE_HEDGE_GRACE = float(os.getenv("IMAGE_HEDGE_GRACE", "4"))
+# Billed per image: in race mode these wait behind every free provider instead of joining the burst
+IMAGE_PAID_PROVIDERS = {"dalle"}
+IMAGE_FINAL_FALLBACK = "https://images.unsplash.com/photo-1611162617213-7d7a39e9b1d7?auto=format&fit=crop&q=80&w=1024"
+
+_image_flight = SingleFlight("flux_generate")
+_image_router = ProviderRouter(hedge=False)
+
+
+async def _flux_request(prompt: str) -> str:
+    """Generate via Fal.ai (Flux.1 schnell). Raises on failure."""
+    if not FAL_KEY:
+        print(f"   ⚠️ Flux: FAL_KEY not set")
+        raise Exception("FAL_KEY not configured")
+    
+    print(f"   📡 [FLUX] Starting Flux image generation...")
+    os.environ["FAL_KEY"] = FAL_KEY  # Ensure FAL_KEY is in environment
+    
+    def _flux_submit():
+        import fal_client
+        print(f"   📡 [FLUX] Submitting to fal-ai/flux/schnell...")
         
-        def _flux_submit():
-            import fal_client
-            print(f"   📡 [FLUX] Submitting to fal-ai/flux/schnell...")
-            
-            # Use sync submit (blocking but works reliably)
-            handler = fal_client.submit(
-                "fal-ai/flux/schnell",
-                arguments={"prompt": prompt, "image_size": "landscape_4_3"}
-            )
-            print(f"   ⏳ [FLUX] Waiting for result...")
-            result = handler.get()
-            
-            if result and "images" in result and len(result["images"]) > 0:
-                url = result["images"][0]["url"]
-                print(f"   ✅ [FLUX] Generated image: {url[:80]}...")
-                return url
-            else:
-                print(f"   ⚠️ [FLUX] No images in result: {result}")
-                raise Exception("No images in Flux response")
+        # Use sync submit (blocking but works reliably)
+        handler = fal_client.submit(
+            "fal-ai/flux/schnell",
+            arguments={"prompt": prompt, "image_size": "landscape_4_3"}
+        )
+        print(f"   ⏳ [FLUX] Waiting for result...")
+        result = handler.get()
         
-        # Run the blocking operation in a thread pool
-        url = await asyncio.to_thread(_flux_submit)
+        if result and "images" in result and len(result["images"]) > 0:
+            url = result["images"][0]["url"]
+            print(f"   ✅ [FLUX] Generated image: {url[:80]}...")
+            return url
+        else:
+            print(f"   ⚠️ [FLUX] No images in result: {result}")
+            raise Exception("No images in Flux response")
+    
+    # Run the blocking operation in a thread pool
+    return await asyncio.to_thread(_flux_submit)
+
+
+def is_image_url(url) -> bool:
+    """Only the shape is checked: Pollinations URLs embed the prompt, so their text is arbitrary."""
+    return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+
+def _acceptable(fn):
+    """Adapt a provider that signals failure by returning None into one that raises."""
+    async def _call(prompt: str) -> str:
+        url = await fn(prompt)
+        if not is_image_url(url):
+            raise Exception(f"{fn.__name__} returned no usable URL")
         return url
-            
-    except Exception as e:
-        print(f"   ❌ [FLUX] Error: {e}")
-        
-        # Fallback 2: Try Pollinations (Free Generative - HIGH PRIORITY FALLBACK)
-        try:
-            print(f"   🔄 [FLUX] Trying Pollinations free generative fallback...")
-            p_url = await pollinations_generate(prompt)
-            if p_url:
-                return p_url
-        except Exception as p_err:
-            print(f"   ⚠️ [POLLINATIONS] Fallback failed: {p_err}")
-
-        # Fallback 3: Try DALL-E
-        try:
-            print(f"   🔄 [FLUX] Trying DALLE fallback...")
-            dalle_url = await dalle_generate(prompt)
-            if dalle_url:
-                return dalle_url
-        except Exception as dalle_err:
-            print(f"   ⚠️ [DALLE] Fallback failed: {dalle_err}")
-        
-        # Fallback 4: Try Unsplash
-        try:
-            print(f"   🔄 [FLUX] Trying Unsplash fallback...")
-            unsplash_url = await unsplash_fallback(prompt)
-            if unsplash_url:
-                return unsplash_url
-        except Exception as unsplash_err:
-            print(f"   ⚠️ [UNSPLASH] Fallback failed: {unsplash_err}")
-        
-        # Fallback 3: Use placeholder
-        try:
-            print(f"   🔄 [FLUX] Trying placeholder fallback...")
-            placeholder_url = await placeholder_image(prompt)
-            if placeholder_url:
-                return placeholder_url
-        except Exception as placeholder_err:
-            print(f"   ⚠️ [PLACEHOLDER] Fallback failed: {placeholder_err}")
-        
-        print(f"   ❌ All image generation methods failed for prompt: {prompt[:100]}...")
+    return _call
+
+
+# Priority order: 1. Flux -> 2. Pollinations (Free) -> 3. DALLE -> 4. Unsplash -> 5. Placeholder
+IMAGE_PROVIDERS = [
+    ("flux", _acceptable(_flux_request)),
+    ("pollinations", _acceptable(pollinations_generate)),
+    ("dalle", _acceptable(dalle_generate)),
+    ("unsplash", _acceptable(unsplash_fallback)),
+    ("placeholder", _acceptable(placeholder_image)),
+]
+
+
+async def flux_generate(prompt: str) -> str:
+    """Generate a high-end image from Fal.ai (Flux.1) with multiple fallbacks.
+    Identical prompts in flight at the same time share one cascade."""
+    return await _image_flight.do(prompt, lambda: _image_cascade(prompt))
+
+
+async def _image_cascade(prompt: str) -> str:
+    candidates = [(name, lambda fn=fn: fn(prompt)) for name, fn in IMAGE_PROVIDERS]
+    try:
+        if IMAGE_CASCADE_MODE == "race":
+            provider, url = await _image_router.race(candidates, grace=IMAGE_HEDGE_GRACE,
+                                                     sequential=IMAGE_PAID_PROVIDERS)
+        else:
+            provider, url = await _image_router.call(candidates)
+        print(f"   ✅ [IMAGES] {provider} delivered the image")
+        return url
+    except AllProvidersFailed as e:
+        print(f"   ❌ All image generation methods failed for prompt: {prompt[:100]}... ({e})")
         # Final absolute fallback to a reliable photo placeholder
-        return f"https://images.unsplash.com/photo-1611162617213-7d7a39e9b1d7?auto=format&fit=crop&q=80&w=1024"
+        return IMAGE_FINAL_FALLBACK
+
+
+def get_ai_stats() -> dict:
+    """Counters for the /metrics endpoint."""
+    return {
+        "text_providers": _text_router.stats(),
+        "image_providers": {"mode": IMAGE_CASCADE_MODE, **_image_router.stats()},
+        "response_cache": get_response_cache().stats(),
+        "single_flight": {
+            "unified_generate": _text_flight.stats(),
+            "flux_generate": _image_flight.stats(),
+        },
+    }
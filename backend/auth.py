@@ -2,9 +2,14 @@
 MarketMind — Auth Module
 JWT-based authentication with bcrypt password hashing and RBAC.
 """
+import asyncio
 import os
+import threading
+import time
 import uuid
 import bcrypt as _bcrypt
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -12,65 +17,201 @@ from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from user_store import UserExists, get_user_repository
+
 # Load from env, fallback for dev
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "marketmind-dev-secret-key-change-in-production-2026")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+# bcrypt runs on its own bounded pool (it releases the GIL), never on the event loop
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "64"))  # queued + running before 429
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# In-memory user store (replace with DB in production)
-_users_db: dict[str, dict] = {}
+
+class _TokenCache:
+    """Bounded LRU of verified token → user principal. An entry dies at the token's `exp`
+    or after TOKEN_CACHE_TTL, whichever comes first, so account changes still propagate."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        item = self._data.get(token)
+        if item is None or item[0] <= time.time():
+            if item is not None:
+                del self._data[token]
+            self.misses += 1
+            return None
+        self._data.move_to_end(token)
+        self.hits += 1
+        return item[1]
+
+    def set(self, token: str, principal: dict, exp: float) -> None:
+        if self.max_entries <= 0:
+            return
+        self._data[token] = (min(exp, time.time() + self.ttl), principal)
+        self._data.move_to_end(token)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_token_cache = _TokenCache()
+
+
+def get_auth_stats() -> dict:
+    return {"token_cache": _token_cache.stats(), "bcrypt": _bcrypt_pool.stats()}
+
+
+def _principal(user: dict) -> dict:
+    """The user as seen by route handlers — everything except the password hash."""
+    return {k: v for k, v in user.items() if k != "hashed_password"}
 
 
 def _hash_password(plain: str) -> str:
-    return _bcrypt.hashpw(plain.encode(), _bcrypt.gensalt()).decode()
+    return _bcrypt.hashpw(plain.encode(), _bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 
 def _verify_password(plain: str, hashed: str) -> bool:
     return _bcrypt.checkpw(plain.encode(), hashed.encode())
 
 
+def _needs_rehash(hashed: str) -> bool:
+    """True when a stored hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+class _BcryptPool:
+    """Bounded executor with admission control: past max_pending callers get a 429 at once
+    instead of queueing behind a login burst."""
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, max_pending: int = BCRYPT_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Authentication is busy, please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        with self._lock:
+            self.pending += 1
+        job = self._executor.submit(fn, *args)
+        # Settle when the job itself ends, not when the caller stops waiting: a disconnected
+        # client's hash keeps a worker busy and must keep counting against admission
+        job.add_done_callback(self._settled)
+        return await asyncio.wrap_future(job)
+
+    def _settled(self, job: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            if not job.cancelled():
+                self.completed += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+_bcrypt_pool = _BcryptPool()
+
+
+def shutdown_auth() -> None:
+    _bcrypt_pool.shutdown()
+
+
 def _seed_demo_user():
     """Pre-seed a demo user so the app works out of the box."""
     demo_email = "demo@marketmind.ai"
     # Pre-computed bcrypt hash for "demo1234"
     demo_hash = "$2b$12$qMvuDPeaBDq7laEn1KnJtuuKlSTDjgAnkvPRN4ckozJpGRmEZRZli"
-    _users_db[demo_email] = {
+    get_user_repository().add_if_missing({
         "email": demo_email,
         "name": "Demo User",
         "hashed_password": demo_hash,
         "role": "admin",
         "workspace_id": "demo-workspace-001",
         "created_at": datetime.utcnow().isoformat(),
-    }
+    })
 
 
 # Seed on module load
 _seed_demo_user()
 
 
-def register_user(email: str, password: str, name: str) -> dict:
-    if email.lower() in _users_db:
+async def register_user(email: str, password: str, name: str) -> dict:
+    users = get_user_repository()
+    if users.get(email) is not None:
         raise HTTPException(status_code=409, detail="An account with this email already exists.")
     user = {
         "email": email.lower(),
         "name": name,
-        "hashed_password": _hash_password(password),
+        "hashed_password": await _bcrypt_pool.run(_hash_password, password),
         "role": "admin",
         "workspace_id": str(uuid.uuid4()),
         "created_at": datetime.utcnow().isoformat(),
     }
-    _users_db[email.lower()] = user
+    try:
+        users.add(user)
+    except UserExists:
+        raise HTTPException(status_code=409, detail="An account with this email already exists.")
     return user
 
 
-def authenticate_user(email: str, password: str) -> Optional[dict]:
-    user = _users_db.get(email.lower())
+async def authenticate_user(email: str, password: str) -> Optional[dict]:
+    users = get_user_repository()
+    user = users.get(email)
     if not user:
         return None
-    if not _verify_password(password, user["hashed_password"]):
+    if not await _bcrypt_pool.run(_verify_password, password, user["hashed_password"]):
         return None
+    if _needs_rehash(user["hashed_password"]):
+        # Only now do we have the plaintext, so upgrade the stored hash to the current cost.
+        # Best effort: a saturated pool must not fail a login that already verified.
+        try:
+            new_hash = await _bcrypt_pool.run(_hash_password, password)
+        except HTTPException:
+            return user
+        user["hashed_password"] = new_hash
+        users.update_password_hash(user["email"], new_hash)
     return user
 
 
@@ -81,21 +222,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def resolve_token(token: str) -> Optional[dict]:
+    """Principal for a bearer token, or None if it is invalid, expired or its user is gone.
+    Cached, so the rate limiter and the route dependency share one verification."""
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-
-    user = _users_db.get(email.lower())
+        return None
+    email = payload.get("sub")
+    user = get_user_repository().get(email) if email else None
     if not user:
-        raise credentials_exception
-    return user
+        return None
+    principal = _principal(user)
+    _token_cache.set(token, principal, float(payload.get("exp", 0)))
+    return principal
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    principal = resolve_token(token)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
@@ -0,0 +1,120 @@
+"""
+Benchmark: security layer as BaseHTTPMiddleware (before) vs pure ASGI (after).
+Drives the ASGI apps directly (no network, no server) so only middleware cost shows.
+
+    cd backend && python bench_security.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("SHARED_STATE_BACKEND", "memory")
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+import security
+from security import SECURITY_HEADERS, SecurityMiddleware, threat_store
+from waf import get_waf
+
+STREAM_CHUNKS = 50
+
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for i in range(STREAM_CHUNKS):
+                yield f"chunk {i}\n"
+        return StreamingResponse(body(), media_type="text/plain")
+
+    if mode == "asgi":
+        app.add_middleware(SecurityMiddleware)
+    elif mode == "basehttp":
+        # The pre-ASGI layer: same checks, run through @app.middleware("http")
+        @app.middleware("http")
+        async def security_middleware(request: Request, call_next):
+            client_ip = request.client.host if request.client else "unknown"
+            if request.url.path in security.HONEYPOT_PATHS:
+                await threat_store.record_honeypot(client_ip)
+                return Response("Not Found", status_code=404)
+            if await threat_store.is_blocked(client_ip):
+                return Response("Forbidden", status_code=403)
+            waf = get_waf()
+            if waf.scan_query(request.url.query) or waf.scan_headers(request.scope["headers"]):
+                return Response('{"detail": "Request blocked by WAF."}', status_code=400)
+            response = await call_next(request)
+            for name, value in SECURITY_HEADERS:
+                response.headers[name.decode()] = value.decode()
+            return response
+    return app
+
+
+async def call(app, path: str) -> tuple[float, int]:
+    """One request; returns (seconds to first body byte, body bytes)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench/1.0")],
+        "client": ("127.0.0.1", 5000), "server": ("bench", 80),
+    }
+    started = time.perf_counter()
+    first = None
+    size = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # never disconnects
+
+    async def send(message):
+        nonlocal first, size
+        if message["type"] == "http.response.body" and message.get("body"):
+            if first is None:
+                first = time.perf_counter() - started
+            size += len(message["body"])
+
+    await app(scope, receive, send)
+    return first or 0.0, size
+
+
+async def bench(app, path: str, n: int) -> tuple[float, float]:
+    for _ in range(50):  # warm-up
+        await call(app, path)
+    ttfb = []
+    started = time.perf_counter()
+    for _ in range(n):
+        ttfb.append((await call(app, path))[0])
+    elapsed = time.perf_counter() - started
+    ttfb.sort()
+    return n / elapsed, ttfb[len(ttfb) // 2] * 1e6
+
+
+async def main(n: int):
+    print(f"🏁 Security middleware benchmark — {n} sequential requests per case\n")
+    print(f"{'middleware':<12}{'endpoint':<10}{'req/s':>10}{'p50 TTFB µs':>14}")
+    results = {}
+    for mode in ("none", "basehttp", "asgi"):
+        app = build_app(mode)
+        for path in ("/health", "/stream"):
+            rps, ttfb = await bench(app, path, n)
+            results[(mode, path)] = rps
+            print(f"{mode:<12}{path:<10}{rps:>10.0f}{ttfb:>14.1f}")
+    print()
+    for path in ("/health", "/stream"):
+        gain = results[("asgi", path)] / results[("basehttp", path)]
+        print(f"✅ {path}: pure ASGI is {gain:.2f}x the throughput of BaseHTTPMiddleware")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000))
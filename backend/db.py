@@ -0,0 +1,28 @@
+"""
+MarketMind — Local SQLite Storage
+Shared helper for the on-disk stores (response cache, outcomes, products, users...).
+Databases live under MARKETMIND_DATA_DIR (default: backend/data) and run in WAL
+mode so several uvicorn workers on one node can read and write concurrently.
+"""
+import os
+import sqlite3
+
+DATA_DIR = os.getenv("MARKETMIND_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+
+def db_path(name: str) -> str:
+    """Resolve a database file name inside the data directory (':memory:' passes through)."""
+    if name == ":memory:" or os.path.isabs(name):
+        return name
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
+
+
+def connect(name: str) -> sqlite3.Connection:
+    """Open a WAL-mode connection usable from any thread (callers serialise writes with their own lock)."""
+    conn = sqlite3.connect(db_path(name), check_same_thread=False, timeout=10.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
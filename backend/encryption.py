@@ -2,38 +2,78 @@
 MarketMind — AES-256 Encryption Utility
 Uses Fernet symmetric encryption (AES-128-CBC with HMAC-SHA256) from the cryptography library.
 In production, derive the key from a KMS-managed secret, not an env var.
+
+Keys are derived lazily on first use and cached, so importing this module is free.
+Rotation: ENCRYPTION_SECRETS is a comma-separated list, newest first. New data is
+encrypted with the first secret; data written under any listed secret still decrypts,
+and `rotate`/`rotate_many` re-encrypt old ciphertexts under the newest one. An entry
+of the form `fernet:<urlsafe base64 key>` is used as a Fernet key without derivation.
 """
 import os
 import base64
-from cryptography.fernet import Fernet
+from functools import lru_cache
+from typing import Iterable, Optional
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 _SECRET = os.getenv("JWT_SECRET", "marketmind-super-secret-key-change-in-production-2026")
+_SECRETS = [s.strip() for s in os.getenv("ENCRYPTION_SECRETS", "").split(",") if s.strip()] or [_SECRET]
 _SALT = b"marketmind_salt_2026"
+_KDF_ITERATIONS = 480000
+
 
-def _get_fernet() -> Fernet:
+@lru_cache(maxsize=None)
+def _derive_key(secret: str) -> bytes:
+    if secret.startswith("fernet:"):
+        return secret[len("fernet:"):].encode()
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=_SALT,
-        iterations=480000,
+        iterations=_KDF_ITERATIONS,
     )
-    key = base64.urlsafe_b64encode(kdf.derive(_SECRET.encode()))
-    return Fernet(key)
+    return base64.urlsafe_b64encode(kdf.derive(secret.encode()))
 
-_fernet = _get_fernet()
+
+@lru_cache(maxsize=1)
+def _get_fernet() -> MultiFernet:
+    """Built on first use (PBKDF2 is deliberately slow) and reused for the process lifetime."""
+    return MultiFernet([Fernet(_derive_key(secret)) for secret in _SECRETS])
 
 
 def encrypt(plaintext: str) -> str:
     """Encrypt a string. Returns base64-encoded ciphertext."""
     if not plaintext:
         return plaintext
-    return _fernet.encrypt(plaintext.encode()).decode()
+    return _get_fernet().encrypt(plaintext.encode()).decode()
 
 
 def decrypt(ciphertext: str) -> str:
     """Decrypt a Fernet-encrypted string."""
     if not ciphertext:
         return ciphertext
-    return _fernet.decrypt(ciphertext.encode()).decode()
+    return _get_fernet().decrypt(ciphertext.encode()).decode()
+
+
+def rotate(ciphertext: str) -> str:
+    """Re-encrypt a ciphertext under the newest secret."""
+    if not ciphertext:
+        return ciphertext
+    return _get_fernet().rotate(ciphertext.encode()).decode()
+
+
+def encrypt_many(values: Iterable[Optional[str]]) -> list[Optional[str]]:
+    """Encrypt many fields (e.g. every PII column of a lead batch) with one key lookup."""
+    fernet = _get_fernet()
+    return [fernet.encrypt(v.encode()).decode() if v else v for v in values]
+
+
+def decrypt_many(values: Iterable[Optional[str]]) -> list[Optional[str]]:
+    fernet = _get_fernet()
+    return [fernet.decrypt(v.encode()).decode() if v else v for v in values]
+
+
+def rotate_many(values: Iterable[Optional[str]]) -> list[Optional[str]]:
+    fernet = _get_fernet()
+    return [fernet.rotate(v.encode()).decode() if v else v for v in values]
@@ -0,0 +1,175 @@
+"""
+MarketMind — Search Grounding Client
+Async SerpAPI client on the shared pooled HTTP client, with a TTL cache keyed by the
+normalised query (memory in front of SQLite, so every worker and restart reuses it)
+and single-flight for identical lookups in flight. Competitor grounding fans out over
+several facets (pricing, reviews, news, market) in parallel and merges them into one block.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ai_clients import SERPAPI_KEY, _get_http_client
+from response_cache import MemoryCache, ResponseCache, SQLiteCache, TieredCache, make_key
+from singleflight import SingleFlight
+
+SERPAPI_URL = "https://serpapi.com/search.json"
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(6 * 60 * 60)))
+SEARCH_CACHE_DB = os.getenv("SEARCH_CACHE_DB", "search_cache.db")
+GROUNDING_RESULTS_PER_FACET = 4
+# Facets searched per competitor analysis — each is one SerpAPI call on a cache miss
+GROUNDING_FACETS = [f.strip() for f in os.getenv("GROUNDING_FACETS", "market,pricing,reviews,news").split(",") if f.strip()]
+
+NO_GROUNDING_NOTE = "(Live data not available — using trained knowledge. Add SERPAPI_KEY for real-time grounding.)"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class SearchError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace-insensitive cache key material."""
+    return _clean_query(query).lower()
+
+
+def _clean_query(query: str) -> str:
+    return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+_cache: Optional[ResponseCache] = None
+_flight = SingleFlight("serpapi")
+upstream_calls = 0
+
+
+def _get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(TieredCache(MemoryCache(max_entries=512), SQLiteCache(SEARCH_CACHE_DB)))
+    return _cache
+
+
+async def _fetch(query: str, num: int) -> list[dict]:
+    global upstream_calls
+    upstream_calls += 1
+    client = _get_http_client("serpapi")
+    r = await client.get(SERPAPI_URL, params={"q": query, "api_key": SERPAPI_KEY, "num": num})
+    if r.status_code != 200:
+        raise SearchError(f"SerpAPI returned status {r.status_code}", r.status_code)
+    return [
+        {"title": x.get("title"), "snippet": x.get("snippet"), "link": x.get("link")}
+        for x in r.json().get("organic_results", [])
+    ]
+
+
+async def search(query: str, num: int = 5) -> list[dict]:
+    """Organic results as [{title, snippet, link}]. Cached for SEARCH_CACHE_TTL seconds."""
+    if not SERPAPI_KEY:
+        raise SearchError("SERPAPI_KEY not configured on server")
+    key = make_key("serpapi", "organic", "", normalize_query(query), {"num": num})
+    cache = _get_cache()
+    cached = await cache.get_async(key)
+    if cached is not None:
+        return json.loads(cached)
+
+    async def run() -> list[dict]:
+        # Case matters upstream ("iOS", "AT&T"); only the cache key is folded
+        results = await _fetch(_clean_query(query), num)
+        await cache.set_async(key, json.dumps(results), SEARCH_CACHE_TTL)
+        return results
+
+    return await _flight.do(key, run)
+
+
+@dataclass
+class Grounding:
+    """Search results per facet, in facet order."""
+    sections: dict[str, list[dict]] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def live(self) -> bool:
+        return any(self.sections.values())
+
+    def fingerprints(self) -> dict[str, str]:
+        """Content hash per successfully searched facet. Order-insensitive, so a reshuffled
+        results page does not count as a change."""
+        out = {}
+        for facet, results in self.sections.items():
+            if facet in self.errors:
+                continue
+            items = sorted(
+                f"{x.get('link') or ''}\n{normalize_query(x.get('snippet') or '')}"
+                for x in results[:GROUNDING_RESULTS_PER_FACET]
+            )
+            out[facet] = hashlib.sha256("\n\n".join(items).encode("utf-8")).hexdigest()[:16]
+        return out
+
+    def text(self, facets: Optional[set[str]] = None) -> str:
+        """Prompt block for every facet, or only the given ones."""
+        if not SERPAPI_KEY:
+            return NO_GROUNDING_NOTE
+        if not self.live:
+            return "(Live search unavailable)"
+        seen: set[str] = set()
+        blocks = []
+        for facet, results in self.sections.items():
+            if facets is not None and facet not in facets:
+                continue
+            lines = []
+            for x in results[:GROUNDING_RESULTS_PER_FACET]:
+                link = x.get("link") or "Unknown Source"
+                if link in seen:
+                    continue
+                seen.add(link)
+                lines.append(f"• {x.get('snippet') or ''} (Source: {link})")
+            if lines:
+                blocks.append(f"[{facet.upper()}]\n" + "\n".join(lines))
+        return "\n\n".join(blocks)
+
+
+def competitor_facets(competitor: str, client_product: str = "") -> dict[str, str]:
+    """Queries for the GROUNDING_FACETS that are enabled, in that order."""
+    market = f"{competitor} vs {client_product}" if client_product else competitor
+    queries = {
+        "market": f"{market} market analysis 2026",
+        "pricing": f"{competitor} pricing plans",
+        "reviews": f"{competitor} customer reviews",
+        "news": f"{competitor} news",
+    }
+    return {facet: queries[facet] for facet in GROUNDING_FACETS if facet in queries} or {"market": queries["market"]}
+
+
+async def ground(facets: dict[str, str], limit: Optional[asyncio.Semaphore] = None) -> Grounding:
+    """Run every facet query concurrently; a failed facet is reported, not fatal.
+    `limit` caps concurrent searches when several groundings share one budget."""
+    out = Grounding()
+    if not SERPAPI_KEY:
+        return out
+
+    async def one(query: str) -> list[dict]:
+        if limit is None:
+            return await search(query)
+        async with limit:
+            return await search(query)
+
+    settled = await asyncio.gather(*(one(q) for q in facets.values()), return_exceptions=True)
+    for facet, value in zip(facets, settled):
+        if isinstance(value, BaseException):
+            print(f"   ⚠️ [GROUNDING] {facet} search failed: {value}")
+            out.errors[facet] = str(value) or value.__class__.__name__
+            out.sections[facet] = []
+        else:
+            out.sections[facet] = value
+    return out
+
+
+def get_grounding_stats() -> dict:
+    return {"cache": _get_cache().stats(), "upstream_calls": upstream_calls, "single_flight": _flight.stats()}
@@ -0,0 +1,465 @@
+"""
+MarketMind — Lead Scoring Engine (watsonx stub)
+Rule-based scoring shared by the single-lead endpoint and bulk jobs.
+`compute_lead_score` scores one dict; `score_frame` scores whole columns at once with
+NumPy and produces identical results, for batch uploads and bulk re-scoring.
+`score_file_parallel` shards very large files across a process pool (opt-in).
+"""
+import codecs
+import csv
+import io
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import AnyStr, BinaryIO, Iterable, Iterator, Optional
+
+try:
+    import numpy as np
+except ImportError:  # the per-row scorer still works without NumPy
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Process-pool mode: 0 disables it, -1 uses every core
+LEAD_SCORING_PROCESSES = int(os.getenv("LEAD_SCORING_PROCESSES", "0"))
+LEAD_SCORING_SHARD_BYTES = int(os.getenv("LEAD_SCORING_SHARD_BYTES", str(4 << 20)))
+
+# ─── Rules ────────────────────────────────────────────────────────────────────
+BASE_SCORE = 50
+OPEN_POINTS, OPEN_CAP = 4, 20
+VISIT_POINTS, VISIT_CAP = 3, 15
+SMB_MIN, SMB_MAX, SMB_POINTS = 1, 200, 15
+ENTERPRISE_MIN, ENTERPRISE_POINTS = 500, 5
+EXECUTIVE_KEYWORDS = ["ceo", "founder", "owner", "managing director"]
+EXECUTIVE_POINTS = 10
+FUNCTION_KEYWORDS = ["marketing", "sales", "growth", "cmo"]
+FUNCTION_POINTS = 7
+DECISION_MAKER_KEYWORDS = ["ceo", "founder"]
+
+# (min score, tier, colour, next action) — highest threshold first
+TIERS = [
+    (80, "Hot", "#059669", "Call within 48 hours. Send pricing PDF today."),
+    (60, "Warm", "#D97706", "Send a case study email. Schedule a discovery call."),
+    (40, "Cool", "#2F80ED", "Add to nurture sequence. Share a relevant blog post."),
+    (None, "Cold", "#64748B", "Keep in long-term nurture. Re-engage in 30 days."),
+]
+TIER_NAMES = [t[1] for t in TIERS]
+
+_EXECUTIVE_RE = re.compile("|".join(map(re.escape, EXECUTIVE_KEYWORDS)))
+_FUNCTION_RE = re.compile("|".join(map(re.escape, FUNCTION_KEYWORDS)))
+_DECISION_RE = re.compile("|".join(map(re.escape, DECISION_MAKER_KEYWORDS)))
+
+
+def _tier_index(score: int) -> int:
+    for i, (threshold, *_rest) in enumerate(TIERS):
+        if threshold is None or score >= threshold:
+            return i
+    return len(TIERS) - 1
+
+
+def _signals(email_opens: int, page_visits: int, decision_maker: bool) -> list[dict]:
+    signals = []
+    if email_opens > 3:
+        signals.append({"signal": f"Opened {email_opens} emails", "impact": "+positive"})
+    if page_visits > 2:
+        signals.append({"signal": f"Visited {page_visits} pages", "impact": "+positive"})
+    if decision_maker:
+        signals.append({"signal": "Decision maker title detected", "impact": "+positive"})
+    return signals[:3]
+
+
+def _result(score: int, email_opens: int, page_visits: int, decision_maker: bool) -> dict:
+    _, tier, color, next_action = TIERS[_tier_index(score)]
+    return {
+        "score": score,
+        "tier": tier,
+        "tier_color": color,
+        "signals": _signals(email_opens, page_visits, decision_maker),
+        "next_action": next_action,
+    }
+
+
+def compute_lead_score(lead: dict) -> dict:
+    """
+    Rule-based lead scoring engine (watsonx stub).
+    Returns score 0-100, tier, top signals.
+    In production: call IBM watsonx AutoAI endpoint here.
+    """
+    score = BASE_SCORE
+
+    # Intent signals
+    email_opens = int(lead.get("email_opens", 0) or 0)
+    page_visits = int(lead.get("page_visits", 0) or 0)
+    score += min(email_opens * OPEN_POINTS, OPEN_CAP)
+    score += min(page_visits * VISIT_POINTS, VISIT_CAP)
+
+    # Firmographic fit
+    company_size = int(lead.get("company_size", 0) or 0)
+    if SMB_MIN <= company_size <= SMB_MAX:  # SMB sweet spot
+        score += SMB_POINTS
+    elif company_size > ENTERPRISE_MIN:
+        score += ENTERPRISE_POINTS
+
+    # Role-based scoring
+    role = str(lead.get("role", "")).lower()
+    if _EXECUTIVE_RE.search(role):
+        score += EXECUTIVE_POINTS
+    elif _FUNCTION_RE.search(role):
+        score += FUNCTION_POINTS
+
+    score = min(max(score, 0), 100)
+    return _result(score, email_opens, page_visits, bool(_DECISION_RE.search(role)))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Vectorized engine
+# ──────────────────────────────────────────────────────────────────────────────
+@dataclass
+class LeadFrame:
+    """Columnar leads: equal-length int64 arrays plus lowercased role strings."""
+    email_opens: "np.ndarray"
+    page_visits: "np.ndarray"
+    company_size: "np.ndarray"
+    roles: list[str]
+    valid: Optional["np.ndarray"] = None  # False where a numeric cell could not be parsed
+    # Exact values of cells clipped to ±INT_CLIP, per column, for the signal text
+    exact: dict[str, dict[int, int]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.email_opens)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "LeadFrame":
+        """Build a frame from row dicts using the same coercions as compute_lead_score."""
+        valid = np.ones(len(rows), dtype=bool)
+        exact: dict[str, dict[int, int]] = {}
+        columns = []
+        for name in ("email_opens", "page_visits", "company_size"):
+            column, clipped = _int_column([r.get(name, 0) for r in rows], valid)
+            columns.append(column)
+            if clipped:
+                exact[name] = clipped
+        roles = [str(r.get("role", "")).lower() for r in rows]
+        return cls(*columns, roles=roles, valid=valid, exact=exact)
+
+
+# Far beyond every scoring threshold, and small enough that value * points stays inside int64
+INT_CLIP = 10 ** 15
+
+
+def _int_column(values: list, valid: "np.ndarray") -> tuple["np.ndarray", dict[int, int]]:
+    """int(v or 0) for every cell; NumPy's parser first, Python int() only for stragglers.
+    Cells outside ±INT_CLIP are clipped (scores and tiers are unchanged); their exact values
+    are returned by row index."""
+    cleaned = [v or 0 for v in values]
+    try:
+        arr = np.asarray(cleaned)
+        if arr.dtype.kind in "iubUO":
+            arr = arr.astype(np.int64)
+            if not ((arr > INT_CLIP) | (arr < -INT_CLIP)).any():
+                return arr, {}
+    except (ValueError, TypeError, OverflowError):
+        pass
+    out = np.zeros(len(cleaned), dtype=np.int64)
+    clipped: dict[int, int] = {}
+    for i, v in enumerate(cleaned):
+        try:
+            n = int(v)
+        except (ValueError, TypeError, OverflowError):
+            valid[i] = False
+            continue
+        if -INT_CLIP <= n <= INT_CLIP:
+            out[i] = n
+        else:
+            out[i] = INT_CLIP if n > 0 else -INT_CLIP
+            clipped[i] = n
+    return out, clipped
+
+
+def classify_roles(roles: Iterable[str]) -> tuple["np.ndarray", "np.ndarray"]:
+    """Return (role points, decision-maker flag) per row. Keyword regexes run once per distinct role."""
+    codes_by_role: dict[str, int] = {}
+    codes = np.fromiter((codes_by_role.setdefault(r, len(codes_by_role)) for r in roles), dtype=np.int64)
+    distinct = list(codes_by_role)
+    points = np.array([
+        EXECUTIVE_POINTS if _EXECUTIVE_RE.search(r) else FUNCTION_POINTS if _FUNCTION_RE.search(r) else 0
+        for r in distinct
+    ], dtype=np.int64)
+    decision = np.array([bool(_DECISION_RE.search(r)) for r in distinct], dtype=bool)
+    return points[codes], decision[codes]
+
+
+def score_arrays(email_opens, page_visits, company_size, role_points) -> tuple["np.ndarray", "np.ndarray"]:
+    """Pure-numeric kernel: (scores, tier indices). Shared with the process-pool shards."""
+    score = np.full(len(email_opens), BASE_SCORE, dtype=np.int64)
+    score += np.minimum(email_opens * OPEN_POINTS, OPEN_CAP)
+    score += np.minimum(page_visits * VISIT_POINTS, VISIT_CAP)
+    smb = (company_size >= SMB_MIN) & (company_size <= SMB_MAX)
+    score += np.where(smb, SMB_POINTS, np.where(company_size > ENTERPRISE_MIN, ENTERPRISE_POINTS, 0))
+    score += role_points
+    np.clip(score, 0, 100, out=score)
+
+    tier = np.full(len(score), len(TIERS) - 1, dtype=np.int8)
+    for i in range(len(TIERS) - 2, -1, -1):
+        tier[score >= TIERS[i][0]] = i
+    return score, tier
+
+
+@dataclass
+class ScoredFrame:
+    scores: "np.ndarray"
+    tiers: "np.ndarray"
+    email_opens: "np.ndarray"
+    page_visits: "np.ndarray"
+    decision_maker: "np.ndarray"
+    valid: Optional["np.ndarray"] = None
+    exact: dict[str, dict[int, int]] = field(default_factory=dict)
+
+    def tier_counts(self) -> dict[str, int]:
+        tiers = self.tiers if self.valid is None else self.tiers[self.valid]
+        counts = np.bincount(tiers, minlength=len(TIERS))
+        return {name: int(counts[i]) for i, name in enumerate(TIER_NAMES)}
+
+    def result(self, i: int) -> dict:
+        """The compute_lead_score dict for row i."""
+        email_opens = self.exact.get("email_opens", {}).get(i, int(self.email_opens[i]))
+        page_visits = self.exact.get("page_visits", {}).get(i, int(self.page_visits[i]))
+        return _result(int(self.scores[i]), email_opens, page_visits, bool(self.decision_maker[i]))
+
+
+def score_frame(frame: LeadFrame) -> ScoredFrame:
+    """Score every lead in the frame at once; identical to compute_lead_score row by row."""
+    role_points, decision = classify_roles(frame.roles)
+    scores, tiers = score_arrays(frame.email_opens, frame.page_visits, frame.company_size, role_points)
+    return ScoredFrame(scores, tiers, frame.email_opens, frame.page_visits, decision, frame.valid, frame.exact)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Incremental CSV ingestion
+# ──────────────────────────────────────────────────────────────────────────────
+def split_complete_records(buf: AnyStr) -> int:
+    """Index just past the last newline that ends a CSV record (not inside a quoted field), or 0.
+    Works on str or UTF-8 bytes (newline and quote bytes never occur inside multi-byte characters)."""
+    nl, quote = ("\n", '"') if isinstance(buf, str) else (b"\n", b'"')
+    cut = buf.rfind(nl)
+    if cut < 0:
+        return 0
+    parity = buf.count(quote, 0, cut) & 1
+    while parity:
+        prev = buf.rfind(nl, 0, cut)
+        if prev < 0:
+            return 0
+        parity ^= buf.count(quote, prev, cut) & 1
+        cut = prev
+    return cut + 1
+
+
+def parse_records(text: str, fieldnames: list[str]) -> list[dict]:
+    """csv.DictReader semantics for a block of complete records with a known header."""
+    return _records(csv.reader(io.StringIO(text, newline="")), fieldnames)
+
+
+def _records(reader: Iterator[list[str]], fieldnames: list[str]) -> list[dict]:
+    rows = []
+    width = len(fieldnames)
+    for values in reader:
+        if not values:
+            continue
+        row = dict(zip(fieldnames, values))
+        if len(values) < width:
+            row.update((name, None) for name in fieldnames[len(values):])
+        elif len(values) > width:
+            row[None] = values[width:]
+        rows.append(row)
+    return rows
+
+
+class CSVChunker:
+    """Incremental CSV parser: feed raw bytes, get back lists of row dicts for every complete record."""
+
+    def __init__(self, chunk_rows: int = 2000):
+        self.chunk_rows = chunk_rows
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._pending = ""
+        self.fieldnames: list[str] | None = None
+
+    def _parse(self, text: str) -> Iterator[list[dict]]:
+        reader = csv.reader(io.StringIO(text, newline=""))
+        if self.fieldnames is None:
+            self.fieldnames = next(reader, None)
+            if self.fieldnames is None:
+                return
+        rows = _records(reader, self.fieldnames)
+        for i in range(0, len(rows), self.chunk_rows):
+            yield rows[i:i + self.chunk_rows]
+
+    def feed(self, data: bytes) -> Iterator[list[dict]]:
+        text = self._pending + self._decoder.decode(data)
+        cut = split_complete_records(text)
+        self._pending = text[cut:]
+        if cut:
+            yield from self._parse(text[:cut])
+
+    def close(self) -> Iterator[list[dict]]:
+        text = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if text.strip():
+            yield from self._parse(text)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Process-pool mode
+# ──────────────────────────────────────────────────────────────────────────────
+# The parent never decodes rows: it cuts the upload into record-aligned byte windows,
+# copies each window once into shared memory and hands workers (offset, length) pairs.
+# Workers parse, score and keep a local top-K; only that top-K and the tier counts are
+# pickled back, so neither row dicts nor column arrays cross the process boundary.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    """Configured worker count (0 = pool mode off unless a request forces it)."""
+    if LEAD_SCORING_PROCESSES < 0:
+        return os.cpu_count() or 1
+    return LEAD_SCORING_PROCESSES
+
+
+def _workers() -> int:
+    return pool_size() or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs an event loop and open sockets is unsafe
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool (a worker died) so the next request spawns a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class ShardResult:
+    """What one worker sends back for its byte range."""
+    total: int = 0
+    invalid: int = 0
+    tiers: dict[str, int] = field(default_factory=dict)
+    top: list[tuple[int, int, dict]] = field(default_factory=list)  # (score, valid-row position, lead)
+
+
+def _record_end(buf, start: int, target: int) -> int:
+    """First record boundary at or after `target`, given that buf[start:] begins at a record."""
+    if target >= len(buf):
+        return len(buf)
+    parity = buf.count(b'"', start, target) & 1
+    pos = target
+    while True:
+        nl = buf.find(b"\n", pos)
+        if nl < 0:
+            return len(buf)
+        parity ^= buf.count(b'"', pos, nl) & 1
+        if not parity:
+            return nl + 1
+        pos = nl + 1
+
+
+def _score_shard(shm_name: str, start: int, end: int, fieldnames: list[str], top_k: int) -> ShardResult:
+    """Worker entry point: score buf[start:end] of a shared-memory window."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        text = bytes(shm.buf[start:end]).decode("utf-8", errors="replace")
+    finally:
+        shm.close()
+    rows = parse_records(text, fieldnames)
+    if not rows:
+        return ShardResult(tiers=dict.fromkeys(TIER_NAMES, 0))
+    frame = LeadFrame.from_rows(rows)
+    result = score_frame(frame)
+    idx = np.flatnonzero(frame.valid)
+    out = ShardResult(total=len(idx), invalid=len(rows) - len(idx), tiers=result.tier_counts())
+    if top_k > 0 and len(idx):
+        for pos in np.lexsort((idx, -result.scores[idx]))[:top_k]:
+            i = int(idx[pos])
+            out.top.append((int(result.scores[i]), int(pos), {**rows[i], **result.result(i)}))
+    return out
+
+
+def score_file_parallel(fileobj: BinaryIO, top_k: int, shard_bytes: int = LEAD_SCORING_SHARD_BYTES) -> Iterator[ShardResult]:
+    """Score a CSV file across the process pool; yields shard results in file order.
+    Blocking — call it from a worker thread, never on the event loop."""
+    pool: Optional[ProcessPoolExecutor] = _get_pool()
+    window_bytes = shard_bytes * _workers()
+    fieldnames: Optional[list[str]] = None
+    pending = b""
+    eof = False
+    while not eof:
+        data = fileobj.read(window_bytes)
+        eof = not data
+        buf = pending + data
+        if fieldnames is None:
+            if buf.startswith(codecs.BOM_UTF8):
+                buf = buf[len(codecs.BOM_UTF8):]
+            header_end = _record_end(buf, 0, 0)
+            if header_end == len(buf) and not eof:
+                pending = buf  # header not complete yet
+                continue
+            header = buf[:header_end].decode("utf-8", errors="replace")
+            fieldnames = next(csv.reader(io.StringIO(header, newline="")), None)
+            if fieldnames is None:
+                return
+            buf = buf[header_end:]
+        cut = len(buf) if eof else split_complete_records(buf)
+        block, pending = buf[:cut], buf[cut:]
+        if not block:
+            continue
+        try:
+            results = _score_window(pool, block, fieldnames, top_k, shard_bytes)
+        except BrokenProcessPool:
+            print("⚠️ [LEAD SCORING] Process pool broke — scoring the rest of this file in-process")
+            _discard_pool(pool)
+            pool = None
+            results = _score_window(None, block, fieldnames, top_k, shard_bytes)
+        yield from results
+
+
+def _score_window(pool: Optional[ProcessPoolExecutor], block: bytes, fieldnames: list[str], top_k: int,
+                  shard_bytes: int) -> list[ShardResult]:
+    """Score one window shard by shard — across `pool`, or in this process when it is None."""
+    shm = shared_memory.SharedMemory(create=True, size=len(block))
+    try:
+        shm.buf[:len(block)] = block
+        shards = []
+        start = 0
+        while start < len(block):
+            end = _record_end(block, start, start + shard_bytes)
+            shards.append((start, end))
+            start = end
+        if pool is None:
+            return [_score_shard(shm.name, start, end, fieldnames, top_k) for start, end in shards]
+        futures = [pool.submit(_score_shard, shm.name, start, end, fieldnames, top_k) for start, end in shards]
+        return [f.result() for f in futures]
+    finally:
+        shm.close()
+        shm.unlink()
@@ -7,12 +7,18 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from slowapi.errors import RateLimitExceeded
 
-from security import add_security_middleware, limiter
+from security import add_security_middleware, threat_store
+from rate_limit import rate_limiter
+from waf import get_waf
+from grounding import get_grounding_stats
+from structured_output import get_structured_output_stats
+from ai_clients import close_http_clients, get_ai_stats
+from lead_scoring import shutdown_pool
+from auth import get_auth_stats, get_current_user, shutdown_auth
 from routers.auth_router import router as auth_router
 from routers.campaigns import router as campaigns_router
 from routers.instagram import router as instagram_router
@@ -34,20 +40,9 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-# Apply security middleware (CORS, honeypot, threat detection, security headers)
+# Apply security middleware (rate limits, CORS, honeypot, threat detection, WAF, security headers)
 add_security_middleware(app)
 
-# Rate limiter state
-app.state.limiter = limiter
-
-
-@app.exception_handler(RateLimitExceeded)
-async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    return JSONResponse(
-        status_code=429,
-        content={"detail": "Rate limit exceeded. Please slow down and try again shortly."}
-    )
-
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -59,6 +54,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await close_http_clients()
+    shutdown_pool()
+    shutdown_auth()
+
+
 # Register all routers
 app.include_router(auth_router)
 app.include_router(campaigns_router)
@@ -99,6 +101,20 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics(user: dict = Depends(get_current_user)):
+    """Runtime counters: response cache, request coalescing, search grounding, structured output, auth, threat tracking, WAF, rate limits."""
+    return {
+        **get_ai_stats(),
+        "grounding": get_grounding_stats(),
+        "structured_output": get_structured_output_stats(),
+        "auth": get_auth_stats(),
+        "threats": threat_store.stats(),
+        "waf": get_waf().stats(),
+        "rate_limit": rate_limiter.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     print("\n🚀 [DEBUG] Starting MarketMind Backend (Reload Disabled for Stability)...")
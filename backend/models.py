@@ -1,7 +1,7 @@
 """
 Pydantic request/response models for all API endpoints.
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 
 
@@ -77,6 +77,15 @@ class CompetitorRequest(BaseModel):
     report_types: Optional[List[str]] = None
     client_product_id: Optional[str] = None  # To compare against a local product
     model: Optional[str] = None
+    force_refresh: bool = False  # Regenerate in full even if the grounding has not changed
+
+
+class CompetitorBatchRequest(BaseModel):
+    competitors: List[str] = Field(..., min_length=1, max_length=50)
+    client_product_id: Optional[str] = None
+    model: Optional[str] = None
+    concurrency: Optional[int] = Field(None, ge=1)  # Capped by COMPETITOR_BATCH_CONCURRENCY_MAX
+    force_refresh: bool = False
 
 
 # ─── Products ──────────────────────────────────────────────────────────────────
@@ -88,6 +97,10 @@ class ProductCreateRequest(BaseModel):
     sales_volume: Optional[int] = 0
 
 
+class ProductBulkImportRequest(BaseModel):
+    products: List[ProductCreateRequest] = Field(..., min_length=1, max_length=10000)
+
+
 # ─── Lead Scoring ─────────────────────────────────────────────────────────────
 class LeadRequest(BaseModel):
     name: Optional[str] = None
@@ -104,18 +117,22 @@ class LeadRequest(BaseModel):
 # ─── Simulator ────────────────────────────────────────────────────────────────
 class SimulatorStartRequest(BaseModel):
     persona: str
+    model: Optional[str] = None
 
 
 class SimulatorMessageRequest(BaseModel):
-    persona: str
+    persona: Optional[str] = None  # Taken from the session when session_id is set
     rep_message: str
-    history: List[dict] = []
+    session_id: Optional[str] = None  # From /simulator/start; the server then holds the history
+    history: List[dict] = []  # Only used without a session
     model: Optional[str] = None
 
 
 class SimulatorDebriefRequest(BaseModel):
-    persona: str
-    transcript: List[dict]
+    persona: Optional[str] = None
+    session_id: Optional[str] = None  # Debrief the stored transcript instead of `transcript`
+    transcript: List[dict] = []
+    model: Optional[str] = None
 
 
 # ─── Intelligence ─────────────────────────────────────────────────────────────
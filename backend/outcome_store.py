@@ -0,0 +1,131 @@
+"""
+MarketMind — Outcome Memory Store
+Persistent generation→action→outcome log. Every insert also bumps a per-(workspace,
+module, action_type) counter in the same transaction, so rule derivation reads a
+handful of counter rows instead of replaying the log, and nothing is lost on restart.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from db import connect
+
+OUTCOME_MEMORY_DB = os.getenv("OUTCOME_MEMORY_DB", "outcome_memory.db")
+RULE_MIN_OUTCOMES = 2  # a (module, action_type) pair becomes a rule at this many outcomes
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class OutcomeStore:
+    """SQLite-backed outcome log with incrementally maintained counters."""
+
+    def __init__(self, path: str = OUTCOME_MEMORY_DB):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS outcomes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, workspace_id TEXT NOT NULL,"
+            " module TEXT NOT NULL, action_type TEXT NOT NULL, content_snippet TEXT,"
+            " outcome TEXT, rating INTEGER, logged_at TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_outcomes_workspace_module ON outcomes(workspace_id, module, id);"
+            "CREATE TABLE IF NOT EXISTS outcome_counters ("
+            " workspace_id TEXT NOT NULL, module TEXT NOT NULL, action_type TEXT NOT NULL,"
+            " count INTEGER NOT NULL, rule_since TEXT,"
+            " PRIMARY KEY (workspace_id, module, action_type));"
+            "CREATE TABLE IF NOT EXISTS outcome_totals ("
+            " workspace_id TEXT PRIMARY KEY, outcomes INTEGER NOT NULL);"
+        )
+
+    def log(self, workspace_id: str, module: str, action_type: str, content_snippet: Optional[str] = None,
+            outcome: Optional[str] = None, rating: Optional[int] = None) -> dict:
+        """Append one outcome and update its counters atomically. O(1) in the size of the log."""
+        logged_at = _utcnow()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(
+                    "INSERT INTO outcomes (workspace_id, module, action_type, content_snippet, outcome, rating, logged_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (workspace_id, module, action_type, content_snippet, outcome, rating, logged_at),
+                )
+                self._conn.execute(
+                    "INSERT INTO outcome_counters (workspace_id, module, action_type, count, rule_since)"
+                    " VALUES (?, ?, ?, 1, CASE WHEN ? <= 1 THEN ? END)"
+                    " ON CONFLICT (workspace_id, module, action_type) DO UPDATE SET"
+                    "  count = count + 1,"
+                    "  rule_since = CASE WHEN count + 1 = ? THEN ? ELSE rule_since END",
+                    (workspace_id, module, action_type, RULE_MIN_OUTCOMES, logged_at, RULE_MIN_OUTCOMES, logged_at),
+                )
+                self._conn.execute(
+                    "INSERT INTO outcome_totals (workspace_id, outcomes) VALUES (?, 1)"
+                    " ON CONFLICT (workspace_id) DO UPDATE SET outcomes = outcomes + 1",
+                    (workspace_id,),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"id": cur.lastrowid, "logged_at": logged_at}
+
+    def total(self, workspace_id: str) -> int:
+        """Outcomes logged for a workspace — a single primary-key lookup."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT outcomes FROM outcome_totals WHERE workspace_id = ?", (workspace_id,)
+            ).fetchone()
+        return row["outcomes"] if row else 0
+
+    def counters(self, workspace_id: str, min_count: int = 1) -> list[dict]:
+        """Per-(module, action_type) counts for a workspace, read from the counter index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT module, action_type, count, rule_since FROM outcome_counters"
+                " WHERE workspace_id = ? AND count >= ?",
+                (workspace_id, min_count),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent(self, workspace_id: str, module: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """Latest outcomes for a workspace (optionally one module), newest first."""
+        query = "SELECT * FROM outcomes WHERE workspace_id = ?"
+        params: list = [workspace_id]
+        if module is not None:
+            query += " AND module = ?"
+            params.append(module)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_many(self, ids: list[int]) -> dict[int, dict]:
+        """Outcomes by primary key."""
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT * FROM outcomes WHERE id IN ({marks})", ids).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def high_rated(self, workspace_id: str, min_rating: int) -> list[dict]:
+        """Rated outcomes with a snippet, oldest first (used to backfill the vector index)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, content_snippet FROM outcomes WHERE workspace_id = ? AND rating >= ?"
+                " AND content_snippet IS NOT NULL AND content_snippet != '' ORDER BY id",
+                (workspace_id, min_rating),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: Optional[OutcomeStore] = None
+
+
+def get_outcome_store() -> OutcomeStore:
+    global _store
+    if _store is None:
+        _store = OutcomeStore()
+    return _store
@@ -0,0 +1,71 @@
+"""
+MarketMind — Concurrent Stage Runner
+Launches independent generation stages (text, image, future assets) together,
+each with its own timeout, and collects whatever finished as partial results.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+
+@dataclass
+class Stage:
+    """One independent unit of work in a generation pipeline."""
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    timeout: Optional[float] = None
+    # Returns an error message for a value that signals failure without raising
+    check: Optional[Callable[[Any], Optional[str]]] = None
+
+
+@dataclass
+class StageResults:
+    results: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    timings_ms: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+
+async def _run_stage(stage: Stage) -> Any:
+    coro = stage.run()
+    if stage.timeout:
+        return await asyncio.wait_for(coro, timeout=stage.timeout)
+    return await coro
+
+
+async def run_stages(stages: list[Stage]) -> StageResults:
+    """Run all stages concurrently. End-to-end latency is that of the slowest stage."""
+    out = StageResults()
+    started = time.perf_counter()
+
+    async def _timed(stage: Stage):
+        try:
+            return await _run_stage(stage)
+        finally:
+            out.timings_ms[stage.name] = int((time.perf_counter() - started) * 1000)
+
+    tasks = [asyncio.create_task(_timed(stage), name=f"stage:{stage.name}") for stage in stages]
+    try:
+        settled = await asyncio.gather(*tasks, return_exceptions=True)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    for stage, value in zip(stages, settled):
+        if isinstance(value, asyncio.TimeoutError):
+            out.errors[stage.name] = f"timed out after {stage.timeout:g}s"
+        elif isinstance(value, BaseException):
+            out.errors[stage.name] = str(value) or value.__class__.__name__
+        elif stage.check is not None and (error := stage.check(value)):
+            out.errors[stage.name] = error
+        else:
+            out.results[stage.name] = value
+    return out
@@ -0,0 +1,130 @@
+"""
+MarketMind — Product Catalog Store
+Client portfolio products behind a small repository interface. The default backend is
+SQLite (WAL) with a unique product-id index and a (workspace, seq) index, so lookups
+are point reads and listing pages by keyset instead of scanning every workspace.
+"""
+import os
+import threading
+import uuid
+from typing import Iterable, Optional, Protocol
+
+from db import connect
+
+PRODUCTS_DB = os.getenv("PRODUCTS_DB", "products.db")
+
+_COLUMNS = ("id", "name", "description", "category", "price", "sales_volume", "workspace_id")
+
+# Sample portfolio shown to every new install
+DEFAULT_PRODUCTS = [
+    {
+        "id": "prod_1",
+        "name": "MarketMind Pro",
+        "description": "Enterprise-grade marketing intelligence platform with real-time grounding.",
+        "category": "SaaS",
+        "price": 499.0,
+        "sales_volume": 1250,
+        "workspace_id": "default"
+    },
+    {
+        "id": "prod_2",
+        "name": "Campaign Automator",
+        "description": "AI-driven tool for multi-platform ad campaign generation.",
+        "category": "SaaS",
+        "price": 199.0,
+        "sales_volume": 3400,
+        "workspace_id": "default"
+    }
+]
+
+
+def new_product_id() -> str:
+    # Full 128-bit uuid: ids are UNIQUE, and an 8-hex-digit id collides within a large bulk import
+    return f"prod_{uuid.uuid4().hex}"
+
+
+class ProductRepository(Protocol):
+    def get(self, product_id: str, workspace_id: str) -> Optional[dict]: ...
+    def list(self, workspace_id: str, limit: Optional[int], after: int = 0) -> tuple[list[dict], Optional[int]]: ...
+    def count(self, workspace_id: str) -> int: ...
+    def add_many(self, products: Iterable[dict]) -> int: ...
+    def delete(self, product_id: str, workspace_id: str) -> bool: ...
+
+
+class SQLiteProductRepository:
+    def __init__(self, path: str = PRODUCTS_DB):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS products ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE,"
+            " name TEXT NOT NULL, description TEXT NOT NULL, category TEXT,"
+            " price REAL, sales_volume INTEGER, workspace_id TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_products_workspace ON products(workspace_id, seq);"
+        )
+        # Seed only on an empty catalog, so deleting a sample product sticks
+        if self._conn.execute("SELECT 1 FROM products LIMIT 1").fetchone() is None:
+            self.add_many(DEFAULT_PRODUCTS)
+
+    @staticmethod
+    def _row(row) -> dict:
+        return {name: row[name] for name in _COLUMNS}
+
+    def get(self, product_id: str, workspace_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM products WHERE id = ? AND workspace_id = ?", (product_id, workspace_id)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, workspace_id: str, limit: Optional[int], after: int = 0) -> tuple[list[dict], Optional[int]]:
+        """One page in insertion order plus the cursor for the next page (None on the last page).
+        `limit=None` returns everything after the cursor."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM products WHERE workspace_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (workspace_id, after, -1 if limit is None else limit + 1),
+            ).fetchall()
+        if limit is None:
+            return [self._row(r) for r in rows], None
+        next_cursor = rows[limit - 1]["seq"] if len(rows) > limit else None
+        return [self._row(r) for r in rows[:limit]], next_cursor
+
+    def count(self, workspace_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM products WHERE workspace_id = ?", (workspace_id,)
+            ).fetchone()[0]
+
+    def add_many(self, products: Iterable[dict]) -> int:
+        """Insert products in a single transaction (all or nothing)."""
+        values = [tuple(p.get(name) for name in _COLUMNS) for p in products]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO products ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    values,
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(values)
+
+    def delete(self, product_id: str, workspace_id: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM products WHERE id = ? AND workspace_id = ?", (product_id, workspace_id)
+            )
+        return cur.rowcount > 0
+
+
+_repository: Optional[ProductRepository] = None
+
+
+def get_product_repository() -> ProductRepository:
+    global _repository
+    if _repository is None:
+        _repository = SQLiteProductRepository()
+    return _repository
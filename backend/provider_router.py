@@ -0,0 +1,311 @@
+"""
+MarketMind — Adaptive Provider Router
+Tracks rolling latency/error rates per AI provider, opens a circuit breaker on
+repeated failures or quota errors, skips known-dead providers immediately and can
+hedge a slow primary by firing the next provider after a p95-based delay.
+"""
+import asyncio
+import contextlib
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Collection, Iterator, Optional
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+BREAKER_QUOTA_COOLDOWN = float(os.getenv("BREAKER_QUOTA_COOLDOWN", "60"))
+PROVIDER_HEDGE_ENABLED = os.getenv("PROVIDER_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+PROVIDER_HEDGE_DEFAULT_DELAY = float(os.getenv("PROVIDER_HEDGE_DELAY", "8"))
+PROVIDER_HEDGE_MIN_DELAY = 0.5
+STATS_WINDOW = 100
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Caps on concurrent calls per provider name for the current task (see provider_budget)
+_budgets: ContextVar[Optional[dict[str, asyncio.Semaphore]]] = ContextVar("provider_budgets", default=None)
+
+
+@contextlib.contextmanager
+def provider_budget(limits: dict[str, asyncio.Semaphore]) -> Iterator[None]:
+    """Within this block every router attempt holds the named provider's semaphore, so a
+    batch can cap each provider it actually calls — fallbacks included."""
+    token = _budgets.set(limits)
+    try:
+        yield
+    finally:
+        _budgets.reset(token)
+
+
+class AllProvidersFailed(Exception):
+    """Raised when every candidate provider failed or was skipped."""
+
+    def __init__(self, errors: dict[str, BaseException]):
+        super().__init__("; ".join(f"{name}: {err}" for name, err in errors.items()) or "no provider available")
+        self.errors = errors
+
+    @property
+    def quota_exhausted(self) -> bool:
+        return bool(self.errors) and all(is_quota_error(e) for e in self.errors.values())
+
+
+class CircuitOpen(Exception):
+    """Raised when a provider's breaker refuses a call (open, or its half-open probe is busy)."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name}: circuit open")
+        self.name = name
+
+
+def is_quota_error(exc: BaseException) -> bool:
+    """Classify an exception as a rate-limit/quota error by status code, not message text."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429
+
+
+class ProviderHealth:
+    """Rolling window of outcomes for one provider plus its circuit breaker."""
+
+    def __init__(self, name: str, window: int = STATS_WINDOW):
+        self.name = name
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.quota_errors = 0
+        self.hedges_won = 0
+
+    # ── breaker ──────────────────────────────────────────────────────────────
+    def available(self) -> bool:
+        """Whether a call may be routed here. Read-only, so filtering candidates claims nothing."""
+        if self.state == OPEN:
+            return time.monotonic() >= self.open_until
+        if self.state == HALF_OPEN:
+            return not self.probe_in_flight
+        return True
+
+    def acquire(self) -> bool:
+        """Claim a call right before making it. Once the cooldown has passed exactly one caller
+        gets the probe; everyone else is refused until that probe records an outcome."""
+        if not self.available():
+            return False
+        if self.state != CLOSED:
+            self.state = HALF_OPEN
+            self.probe_in_flight = True
+        return True
+
+    def release(self) -> None:
+        """The probe ended without an outcome (cancelled); let the next caller probe."""
+        self.probe_in_flight = False
+
+    def _open(self, cooldown: float) -> None:
+        self.state = OPEN
+        self.open_until = time.monotonic() + cooldown
+        self.probe_in_flight = False
+
+    def record_success(self, latency: float) -> None:
+        self.calls += 1
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.probe_in_flight = False
+
+    def record_failure(self, exc: BaseException) -> None:
+        self.calls += 1
+        self.failures += 1
+        self._outcomes.append(False)
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if is_quota_error(exc):
+            self.quota_errors += 1
+            self._open(BREAKER_QUOTA_COOLDOWN)
+        elif self.state == HALF_OPEN or self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+            self._open(BREAKER_COOLDOWN)
+
+    # ── stats ────────────────────────────────────────────────────────────────
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def stats(self) -> dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "quota_errors": self.quota_errors,
+            "error_rate": round(self.error_rate, 3),
+            "p50_ms": round(p50 * 1000) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000) if p95 is not None else None,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ProviderRouter:
+    """Runs a call against an ordered list of providers with breakers and optional hedging."""
+
+    def __init__(self, hedge: bool = PROVIDER_HEDGE_ENABLED):
+        self.hedge = hedge
+        self.providers: dict[str, ProviderHealth] = {}
+
+    def health(self, name: str) -> ProviderHealth:
+        if name not in self.providers:
+            self.providers[name] = ProviderHealth(name)
+        return self.providers[name]
+
+    def order(self, preferred: list[str]) -> list[str]:
+        """Preferred order with open-breaker providers removed (they are skipped, not waited on)."""
+        return [name for name in preferred if self.health(name).available()]
+
+    def hedge_delay(self, name: str) -> float:
+        health = self.health(name)
+        p95 = health.percentile(0.95)
+        if p95 is None or health.samples < 20:
+            return PROVIDER_HEDGE_DEFAULT_DELAY
+        return max(p95, PROVIDER_HEDGE_MIN_DELAY)
+
+    async def attempt(self, name: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        health = self.health(name)
+        # Wait for budget before claiming the breaker, so a queued call never holds the probe
+        async with (_budgets.get() or {}).get(name) or contextlib.nullcontext():
+            if not health.acquire():
+                raise CircuitOpen(name)
+            probe = health.state == HALF_OPEN
+            started = time.perf_counter()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                if probe:
+                    health.release()
+                raise
+            except Exception as e:
+                health.record_failure(e)
+                raise
+            health.record_success(time.perf_counter() - started)
+            return result
+
+    async def call(self, candidates: list[tuple[str, Callable[[], Awaitable[Any]]]]) -> tuple[str, Any]:
+        """Return (provider, result) from the first provider to succeed."""
+        fns = dict(candidates)
+        names = self.order([name for name, _ in candidates])
+        errors: dict[str, BaseException] = {}
+        if not names:
+            raise AllProvidersFailed({name: RuntimeError("circuit open") for name in fns})
+
+        if not self.hedge or len(names) == 1:
+            for name in names:
+                try:
+                    return name, await self.attempt(name, fns[name])
+                except Exception as e:
+                    print(f"   🔄 [ROUTER] {name} failed ({e}), trying next provider...")
+                    errors[name] = e
+            raise AllProvidersFailed(errors)
+        return await self._hedged(names, fns, errors)
+
+    async def _hedged(self, names: list[str], fns: dict, errors: dict) -> tuple[str, Any]:
+        pending: dict[asyncio.Task, str] = {}
+        queue = list(names)
+
+        def launch() -> None:
+            name = queue.pop(0)
+            pending[asyncio.create_task(self.attempt(name, fns[name]))] = name
+
+        launch()
+        try:
+            while pending:
+                timeout = self.hedge_delay(names[0]) if queue else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"   🏁 [ROUTER] {names[0]} slower than p95 — hedging with {queue[0]}")
+                    launch()
+                    continue
+                for task in self._by_priority(done, pending, names):
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        if name != names[0]:
+                            self.health(name).hedges_won += 1
+                        return name, task.result()
+                    errors[name] = task.exception()
+                    print(f"   🔄 [ROUTER] {name} failed ({errors[name]})")
+                if not pending and queue:
+                    launch()
+            raise AllProvidersFailed(errors)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _by_priority(done: set, pending: dict, names: list[str]) -> list:
+        """Tasks that finished in the same tick, in preference order (sets iterate arbitrarily)."""
+        return sorted(done, key=lambda task: names.index(pending[task]))
+
+    async def race(self, candidates: list[tuple[str, Callable[[], Awaitable[Any]]]], grace: float,
+                   sequential: Collection[str] = ()) -> tuple[str, Any]:
+        """Start the first provider alone; after `grace` seconds (or as soon as it fails)
+        launch every remaining provider at once. First success wins (ties go to the earlier
+        provider), losers are cancelled. Providers named in `sequential` (paid ones) never
+        join the burst: they are tried one at a time, in order, once everything else failed."""
+        fns = dict(candidates)
+        names = self.order([name for name, _ in candidates])
+        errors: dict[str, BaseException] = {}
+        if not names:
+            raise AllProvidersFailed({name: RuntimeError("circuit open") for name in fns})
+
+        pending: dict[asyncio.Task, str] = {}
+        rest = [name for name in names[1:] if name not in sequential]
+        tail = [name for name in names[1:] if name in sequential]
+
+        def launch(batch: list[str]) -> None:
+            for name in batch:
+                pending[asyncio.create_task(self.attempt(name, fns[name]))] = name
+
+        launch(names[:1])
+        try:
+            while True:
+                if not pending:
+                    if rest:
+                        launch(rest)
+                        rest = []
+                    elif tail:
+                        launch(tail[:1])
+                        tail = tail[1:]
+                    else:
+                        raise AllProvidersFailed(errors)
+                done, _ = await asyncio.wait(pending, timeout=grace if rest else None, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"   🏁 [ROUTER] {names[0]} exceeded {grace:g}s grace — racing {', '.join(rest)}")
+                    launch(rest)
+                    rest = []
+                    continue
+                for task in self._by_priority(done, pending, names):
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        if name != names[0]:
+                            self.health(name).hedges_won += 1
+                        return name, task.result()
+                    errors[name] = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {name: h.stats() for name, h in self.providers.items()}
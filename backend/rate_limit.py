@@ -0,0 +1,142 @@
+"""
+MarketMind — Rate Limiting
+Token buckets keyed by authenticated workspace (by client IP for anonymous calls), held
+in the shared counter store so every worker enforces the same budget. Each endpoint
+spends a weighted cost: a health check is free, an LLM call costs a few units, an image
+generation costs more — so provider quotas are protected without slowing cheap routes.
+"""
+import json
+import math
+import os
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth import resolve_token
+from shared_state import take_async
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "2"))      # units refilled per second
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))    # bucket size
+RATE_LIMIT_ANON_RATE = float(os.getenv("RATE_LIMIT_ANON_RATE", "1"))
+RATE_LIMIT_ANON_BURST = float(os.getenv("RATE_LIMIT_ANON_BURST", "30"))
+
+DEFAULT_COST = 1
+# Longest matching path prefix wins
+DEFAULT_COSTS: dict[str, float] = {
+    "/health": 0,
+    "/docs": 0,
+    "/redoc": 0,
+    "/openapi.json": 0,
+    "/campaigns/generate": 12,       # LLM + image
+    "/instagram/generate": 12,       # LLM + image
+    "/images/": 10,
+    "/competitor/analyse": 8,        # LLM + grounding searches
+    "/competitor/analyse-batch": 20, # provider budgets pace the analyses inside the batch
+    "/competitor/weekly-digest": 4,
+    "/intelligence/weekly-brief": 4,
+    "/pitch/": 4,
+    "/leads/outreach": 4,
+    "/leads/score-batch": 5,         # CPU-heavy bulk scoring
+    "/leads/score": 2,
+    "/simulator/message": 3,
+    "/simulator/debrief": 4,
+    "/search/": 2,
+}
+
+
+def load_costs() -> dict[str, float]:
+    costs = dict(DEFAULT_COSTS)
+    override = os.getenv("RATE_LIMIT_COSTS", "")
+    if override:
+        costs.update({path: float(cost) for path, cost in json.loads(override).items()})
+    return costs
+
+
+class RateLimiter:
+    def __init__(self, costs: Optional[dict[str, float]] = None):
+        costs = load_costs() if costs is None else costs
+        # Longest prefix first, so the first match is the most specific
+        self._costs = sorted(costs.items(), key=lambda item: -len(item[0]))
+        self.allowed = 0
+        self.limited = 0
+
+    def cost(self, path: str) -> float:
+        for prefix, cost in self._costs:
+            if path.startswith(prefix):
+                return cost
+        return DEFAULT_COST
+
+    async def check(self, key: str, cost: float, authenticated: bool) -> tuple[bool, float, float]:
+        """(allowed, remaining units, retry-after seconds). Fails open if the shared store is busy."""
+        rate, burst = (RATE_LIMIT_RATE, RATE_LIMIT_BURST) if authenticated else (RATE_LIMIT_ANON_RATE, RATE_LIMIT_ANON_BURST)
+        # A cost above the bucket size could never be paid; charge at most a full bucket
+        allowed, remaining, retry_after = await take_async("bucket", key, min(cost, burst), rate, burst)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, remaining, retry_after
+
+    def stats(self) -> dict:
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "rate_per_s": RATE_LIMIT_RATE,
+            "burst": RATE_LIMIT_BURST,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token else None
+    return None
+
+
+class RateLimitMiddleware:
+    """Pure ASGI: spends the endpoint's cost from the caller's bucket before the route runs."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not RATE_LIMIT_ENABLED or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        cost = rate_limiter.cost(scope["path"])
+        if cost <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        token = _bearer_token(scope)
+        principal = resolve_token(token) if token else None
+        if principal is not None:
+            key = f"ws:{principal.get('workspace_id')}"
+        else:
+            key = f"ip:{scope['client'][0] if scope.get('client') else 'unknown'}"
+
+        allowed, remaining, retry_after = await rate_limiter.check(key, cost, principal is not None)
+        if not allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Please slow down and try again shortly."},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after))), "X-RateLimit-Remaining": str(int(remaining))},
+            )
+            await response(scope, receive, send)
+            return
+
+        remaining_header = (b"x-ratelimit-remaining", str(int(remaining)).encode())
+
+        async def send_with_remaining(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), remaining_header]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_remaining)
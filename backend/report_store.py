@@ -0,0 +1,73 @@
+"""
+MarketMind — Competitor Report Store
+Last generated report per (workspace, competitor, client product), together with the
+grounding snapshot it was written from and a fingerprint per search facet. Weekly
+re-runs compare fresh fingerprints against the stored ones to decide what to regenerate.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from db import connect
+from grounding import normalize_query
+
+COMPETITOR_REPORTS_DB = os.getenv("COMPETITOR_REPORTS_DB", "competitor_reports.db")
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CompetitorReportStore:
+    """One row per (workspace, competitor, client product); each save replaces the previous run."""
+
+    def __init__(self, path: str = COMPETITOR_REPORTS_DB):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS competitor_reports ("
+            " workspace_id TEXT NOT NULL, competitor_key TEXT NOT NULL, client_key TEXT NOT NULL,"
+            " competitor TEXT NOT NULL, model TEXT, content TEXT NOT NULL, metrics TEXT NOT NULL,"
+            " grounding TEXT NOT NULL, fingerprints TEXT NOT NULL,"
+            " generated_at TEXT NOT NULL, updated_at TEXT NOT NULL,"
+            " PRIMARY KEY (workspace_id, competitor_key, client_key));"
+        )
+
+    def get(self, workspace_id: str, competitor: str, client_key: str = "") -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM competitor_reports WHERE workspace_id = ? AND competitor_key = ? AND client_key = ?",
+                (workspace_id, normalize_query(competitor), client_key),
+            ).fetchone()
+        if row is None:
+            return None
+        report = dict(row)
+        for column in ("metrics", "grounding", "fingerprints"):
+            report[column] = json.loads(report[column])
+        return report
+
+    def save(self, workspace_id: str, competitor: str, client_key: str, model: str, content: str,
+             metrics: dict, grounding: dict, fingerprints: dict, generated_at: Optional[str] = None) -> str:
+        """Store the latest run. `generated_at` carries over when nothing was regenerated."""
+        now = _utcnow()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO competitor_reports (workspace_id, competitor_key, client_key, competitor,"
+                " model, content, metrics, grounding, fingerprints, generated_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (workspace_id, normalize_query(competitor), client_key, competitor, model, content,
+                 json.dumps(metrics), json.dumps(grounding), json.dumps(fingerprints), generated_at or now, now),
+            )
+        return now
+
+
+_store: Optional[CompetitorReportStore] = None
+
+
+def get_report_store() -> CompetitorReportStore:
+    global _store
+    if _store is None:
+        _store = CompetitorReportStore()
+    return _store
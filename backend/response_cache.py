@@ -0,0 +1,271 @@
+"""
+MarketMind — LLM Response Cache
+Content-addressed cache for deterministic prompt templates (weekly brief, digest, pitch...).
+Keys hash (provider, model, system prompt, rendered prompt, generation params, scope),
+so any change in inputs is a miss. Entries expire after a TTL and each tier is size-bounded (LRU).
+
+Backends (RESPONSE_CACHE_BACKEND):
+  memory — in-process LRU only
+  tiered — in-process LRU in front of a local SQLite tier that survives restarts (default)
+  off    — disable caching
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+from db import connect
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "tiered").lower()
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "50000"))
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "response_cache.db")
+
+
+def make_key(provider: str, model: str, system: str, prompt: str,
+             params: Optional[dict] = None, scope: Optional[str] = None) -> str:
+    """Stable content address for a generation request."""
+    material = json.dumps(
+        [provider, model, system, prompt, params or {}, scope or ""],
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    blocking: bool  # calls do disk I/O and belong off the event loop
+
+    def get(self, key: str) -> Optional[str]: ...
+    def set(self, key: str, value: str, ttl: float) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def clear(self) -> None: ...
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Local disk tier: shared by every worker on the node and kept across restarts."""
+
+    blocking = True
+
+    def __init__(self, path: str = RESPONSE_CACHE_DB, max_entries: int = RESPONSE_CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache(accessed_at)")
+
+    def get_entry(self, key: str) -> Optional[tuple[str, float]]:
+        """Return (value, expires_at) for a live entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["expires_at"] < now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return row["value"], row["expires_at"]
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            self._writes += 1
+            # Amortise eviction: purge expired rows and trim to the LRU bound every 64 writes
+            if self._writes % 64 == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+        self._conn.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            " SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+
+class TieredCache:
+    """Memory tier in front of a slower shared tier; disk hits are promoted to memory."""
+
+    blocking = True
+
+    def __init__(self, memory: MemoryCache, disk: SQLiteCache):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        self.memory.set(key, value, ttl=expires_at - time.time())
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.memory.set(key, value, ttl)
+        self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+
+class ResponseCache:
+    """Front door used by ai_clients: wraps a backend and keeps hit/miss counters."""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, key: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        if self.backend is not None and ttl > 0:
+            self.backend.set(key, value, ttl)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """get() for the event loop: memory hits are served inline, disk lookups run on a
+        worker thread, and a locked disk tier counts as a miss instead of stalling requests."""
+        if self.backend is None:
+            return None
+        memory = self.backend.memory if isinstance(self.backend, TieredCache) else None
+        value = memory.get(key) if memory is not None else None
+        if value is None and self.backend.blocking:
+            try:
+                value = await asyncio.to_thread(self.backend.get, key)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ [RESPONSE CACHE] Lookup skipped: {e}")
+        elif value is None:
+            value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set_async(self, key: str, value: str, ttl: float) -> None:
+        if self.backend is None or ttl <= 0:
+            return
+        if not self.backend.blocking:
+            self.backend.set(key, value, ttl)
+            return
+        try:
+            await asyncio.to_thread(self.backend.set, key, value, ttl)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ [RESPONSE CACHE] Store skipped: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": RESPONSE_CACHE_BACKEND if self.enabled else "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def _build_backend() -> Optional[CacheBackend]:
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+    memory = MemoryCache()
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return memory
+    return TieredCache(memory, SQLiteCache())
+
+
+def get_response_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(_build_backend())
+    return _cache
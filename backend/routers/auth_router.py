@@ -12,7 +12,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=TokenResponse)
 async def register(req: RegisterRequest):
-    user = register_user(email=req.email, password=req.password, name=req.name)
+    user = await register_user(email=req.email, password=req.password, name=req.name)
     token = create_access_token({"sub": user["email"]})
     return {
         "access_token": token,
@@ -23,7 +23,7 @@ async def register(req: RegisterRequest):
 
 @router.post("/login", response_model=TokenResponse)
 async def login(req: LoginRequest):
-    user = authenticate_user(req.email, req.password)
+    user = await authenticate_user(req.email, req.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     token = create_access_token({"sub": user["email"]})
@@ -1,15 +1,21 @@
 """
 Module 1 — Campaign & Content Generation (Gemini 1.5 Pro)
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from auth import get_current_user
 from models import CampaignRequest
-from ai_clients import unified_generate
+from ai_clients import unified_generate, flux_generate, is_generation_error, is_image_url
+from pipeline import Stage, run_stages
+from semantic_memory import get_semantic_memory, prompt_block, why_this
 import json, asyncio
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 
+# Per-stage budgets — the request takes as long as the slowest stage, capped here
+TEXT_STAGE_TIMEOUT = 60.0
+IMAGE_STAGE_TIMEOUT = 30.0
+
 CAMPAIGN_PROMPT = """You are MarketMind's Campaign Intelligence Engine.
 
 Product/Business: {product_description}
@@ -17,7 +23,7 @@ Campaign Goal: {goal}
 Platform: {platform}
 Tone: {tone}
 {brand_note}
-
+{memory_note}
 Generate a complete campaign package:
 
 ## Campaign Headline (3 variants)
@@ -44,42 +50,47 @@ Suggested ad spend breakdown: paid vs organic. Include CTA button text.
 async def generate_campaign(req: CampaignRequest, user: dict = Depends(get_current_user)):
     print(f"📢 [Campaign] Generating package for: {req.product_description[:50]}...")
     brand_note = f"Brand Voice Style: {req.brand_voice}" if req.brand_voice else ""
+    recalled = await asyncio.to_thread(
+        get_semantic_memory().similar, user.get("workspace_id", ""),
+        f"{req.product_description} {req.goal} {req.platform}", 3, "campaigns",
+    )
     prompt = CAMPAIGN_PROMPT.format(
         product_description=req.product_description,
         goal=req.goal, platform=req.platform, tone=req.tone,
-        brand_note=brand_note
+        brand_note=brand_note, memory_note=prompt_block(recalled)
     )
     
-    try:
-        # Step 1: Start tasks
-        print(f"   - Calling AI for campaign strategy...")
-        content_task = unified_generate(prompt, model_name=req.model)
-        
-        # Generate a matching hero image
-        print(f"   - Calling Flux for visual assets...")
-        flux_prompt = f"Professional {req.visual_style} style marketing hero image for {req.product_description[:100]}. Goal: {req.goal}. Platform: {req.platform}."
-        
-        try:
-            image_url = await asyncio.wait_for(flux_generate(flux_prompt), timeout=30.0)
-        except Exception as e:
-            print(f"   ⚠️ Image generation failed or timed out: {e}")
-            image_url = None
-            
-        content = await content_task
-        
-        print(f"✅ [Campaign] Generation complete.")
-        return {
-            "status": "complete",
-            "content": content,
-            "image_url": image_url if image_url and "error" not in image_url.lower() else None,
-            "model": req.model or "gemini-1.5-pro",
-            "why_this": [
-                {"rule": "Omnichannel consistency prioritized across 3+ channels", "confidence": 92, "outcomes": 24},
-                {"rule": f"Targeting {req.goal} goals with data-driven copy", "confidence": 88, "outcomes": 15},
-                {"rule": f"Generated {req.visual_style} visual assets to match campaign tone", "confidence": 95, "outcomes": 10},
-            ]
-        }
-    except Exception as e:
-        print(f"❌ [Campaign] Critical failure: {e}")
-        from fastapi import HTTPException
-        raise HTTPException(status_code=500, detail=str(e))
+    flux_prompt = f"Professional {req.visual_style} style marketing hero image for {req.product_description[:100]}. Goal: {req.goal}. Platform: {req.platform}."
+
+    # Text and visual assets are independent — launch them together
+    print(f"   - Launching AI strategy + Flux visual stages concurrently...")
+    stages = await run_stages([
+        Stage("content", lambda: unified_generate(prompt, model_name=req.model), timeout=TEXT_STAGE_TIMEOUT,
+              check=lambda text: text if is_generation_error(text) else None),
+        Stage("image", lambda: flux_generate(flux_prompt), timeout=IMAGE_STAGE_TIMEOUT,
+              check=lambda url: None if is_image_url(url) else "no usable image URL"),
+    ])
+    for name, err in stages.errors.items():
+        print(f"   ⚠️ Stage '{name}' failed: {err}")
+
+    if not stages.results:
+        print(f"❌ [Campaign] Critical failure: all stages failed")
+        raise HTTPException(status_code=500, detail="; ".join(f"{k}: {v}" for k, v in stages.errors.items()))
+
+    content = stages.get("content")
+    image_url = stages.get("image")
+
+    print(f"✅ [Campaign] Generation complete in {max(stages.timings_ms.values())}ms.")
+    return {
+        "status": "complete" if stages.complete else "partial",
+        "content": content,
+        "image_url": image_url,
+        "model": req.model or "gemini-1.5-pro",
+        "stage_errors": stages.errors,
+        "timings_ms": stages.timings_ms,
+        "why_this": why_this(recalled) + [
+            {"rule": "Omnichannel consistency prioritized across 3+ channels", "confidence": 92, "outcomes": 24},
+            {"rule": f"Targeting {req.goal} goals with data-driven copy", "confidence": 88, "outcomes": 15},
+            {"rule": f"Generated {req.visual_style} visual assets to match campaign tone", "confidence": 95, "outcomes": 10},
+        ]
+    }
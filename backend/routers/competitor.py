@@ -1,33 +1,58 @@
 """
 Module 4 — Competitor Intelligence (Gemini + optional SerpAPI grounding)
 """
+import asyncio
+import json
 import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from auth import get_current_user
-from models import CompetitorRequest
-from ai_clients import unified_generate, SERPAPI_KEY
-import requests
+from models import CompetitorBatchRequest, CompetitorRequest
+from ai_clients import unified_generate, is_generation_error
+from provider_router import provider_budget
+from grounding import competitor_facets, ground
+from structured_output import ScoreExtractor
+from report_store import get_report_store
 
 from routers.products import get_product_by_id
 
 router = APIRouter(prefix="/competitor", tags=["competitor"])
 
+DIGEST_CACHE_TTL = 6 * 60 * 60
 
-def serp_search(query: str) -> str:
-    """Fetch live web snippets with sources for grounding (optional)."""
-    if not SERPAPI_KEY:
-        return "(Live data not available — using trained knowledge. Add SERPAPI_KEY for real-time grounding.)"
-    try:
-        r = requests.get("https://serpapi.com/search", params={"q": query, "api_key": SERPAPI_KEY, "num": 5}, timeout=8)
-        results = r.json().get("organic_results", [])
-        snippets = []
-        for x in results[:4]:
-            source = x.get('link', 'Unknown Source')
-            snippet = x.get('snippet', '')
-            snippets.append(f"• {snippet} (Source: {source})")
-        return "\n".join(snippets)
-    except Exception:
-        return "(Live search unavailable)"
+# Batch runs: competitors analysed at once, and per-provider caps on concurrent calls within a run
+# (applied to whichever provider is actually called, so router fallbacks count against their own cap)
+COMPETITOR_BATCH_CONCURRENCY = int(os.getenv("COMPETITOR_BATCH_CONCURRENCY", "4"))
+COMPETITOR_BATCH_CONCURRENCY_MAX = int(os.getenv("COMPETITOR_BATCH_CONCURRENCY_MAX", "10"))
+COMPETITOR_PROVIDER_BUDGETS: dict[str, int] = {
+    "groq": 4, "gemini": 2, "serpapi": 8,
+    **json.loads(os.getenv("COMPETITOR_PROVIDER_BUDGETS", "{}")),
+}
+
+# Reports older than this are regenerated in full even if their grounding has not moved
+COMPETITOR_REPORT_MAX_AGE_DAYS = int(os.getenv("COMPETITOR_REPORT_MAX_AGE_DAYS", "30"))
+
+# Report sections (matched by heading text) and the grounding facets each one draws on
+REPORT_SECTIONS: dict[str, set[str]] = {
+    "Strategic Comparison": {"market", "news"},
+    "Pricing & Positioning Loopholes": {"pricing"},
+    "Social & Creative Intelligence": {"reviews", "news"},
+    "Loopholes & Strategic Advantage": {"market", "pricing", "reviews", "news"},
+    "Research Sources": {"market", "pricing", "reviews", "news"},
+}
+_HEADING_RE = re.compile(r"^## ", re.MULTILINE)
+
+# Defaults stand in for any score the model leaves out or garbles
+METRICS_EXTRACTOR = ScoreExtractor("competitor_metrics", {
+    "Product Quality": 60,
+    "Market Share": 40,
+    "Customer Satisfaction": 70,
+    "Innovation Rate": 55,
+})
 
 
 COMPETITOR_PROMPT = """You are MarketMind's Lead Strategic Analyst.
@@ -85,87 +110,267 @@ Return ONLY the JSON object. No explanation, no markdown, and no backticks:
 }}
 """
 
-@router.post("/analyse")
-async def analyse_competitor(req: CompetitorRequest, user: dict = Depends(get_current_user)):
-    print(f"🔍 [Competitor Intel] Analysing: {req.competitor_name}...")
-    
-    workspace_id = user.get("workspace_id", "default")
-    client_product_desc = "General Brand Context"
-    client_sales = "N/A"
-    
-    if req.client_product_id:
-        product = get_product_by_id(req.client_product_id, workspace_id)
+DELTA_PROMPT = """You are MarketMind's Lead Strategic Analyst, updating an existing intelligence report on {competitor}.
+CLIENT CONTEXT:
+Client Product: {client_product_desc}
+Client Sales Metrics: {client_sales}
+
+NEW LIVE DATA (changed since the previous report):
+{live_data}
+
+PREVIOUS VERSION OF THE SECTIONS TO UPDATE:
+{previous_sections}
+
+PREVIOUS SCORES: {previous_metrics}
+
+Rewrite ONLY the following sections in light of the new data. Keep each section's exact "## " heading, use
+**BOLD** for key metrics and insights, write 4-5 sentences per section, compare directly against the Client's
+context, and keep anything from the previous version that the new data does not contradict:
+{section_list}
+Do not output any other section.
+
+IMPORTANT: At the very end of your response, provide the updated JSON metrics.
+Return ONLY the JSON object. No explanation, no markdown, and no backticks:
+{{
+  "Product Quality": [SCORE],
+  "Market Share": [SCORE],
+  "Customer Satisfaction": [SCORE],
+  "Innovation Rate": [SCORE]
+}}
+"""
+
+def _client_context(client_product_id: Optional[str], workspace_id: str) -> tuple[str, str, str]:
+    """(prompt description, product name for search queries, sales line) for the client's product."""
+    if client_product_id:
+        product = get_product_by_id(client_product_id, workspace_id)
         if product:
-            client_product_desc = f"{product['name']}: {product['description']}"
-            client_sales = f"Price: ${product['price']}, Volume: {product['sales_volume']} units"
+            return (
+                f"{product['name']}: {product['description']}",
+                product["name"],
+                f"Price: ${product['price']}, Volume: {product['sales_volume']} units",
+            )
+    return "General Brand Context", "", "N/A"
 
-    try:
-        # Improved search query for better grounding data (Now Async)
-        search_query = f"{req.competitor_name} vs {client_product_desc} market analysis reviews 2026"
-        live_data = await serp_search(search_query)
-        
+
+def split_sections(content: str) -> tuple[str, list[tuple[Optional[str], str]]]:
+    """(preamble, [(section name or None, text incl. heading)]) split on "## " headings."""
+    starts = [m.start() for m in _HEADING_RE.finditer(content)]
+    if not starts:
+        return content, []
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(content)]):
+        chunk = content[start:end].strip()
+        heading = chunk.split("\n", 1)[0].lower()
+        name = next((n for n in REPORT_SECTIONS if n.lower() in heading), None)
+        sections.append((name, chunk))
+    return content[:starts[0]].strip(), sections
+
+
+def merge_sections(previous: str, updated: str) -> str:
+    """Previous report with every section present in `updated` swapped in (new ones appended)."""
+    preamble, old = split_sections(previous)
+    fresh = {name: text for name, text in split_sections(updated)[1] if name}
+    merged = [text if name not in fresh else fresh.pop(name) for name, text in old]
+    merged.extend(fresh.values())
+    return "\n\n".join(part for part in [preamble, *merged] if part)
+
+
+def _is_stale(report: dict) -> bool:
+    generated = datetime.strptime(report["generated_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - generated > timedelta(days=COMPETITOR_REPORT_MAX_AGE_DAYS)
+
+
+async def run_analysis(competitor_name: str, client_context: tuple[str, str, str], model: Optional[str] = None,
+                       search_limit: Optional[asyncio.Semaphore] = None,
+                       workspace_id: str = "default", client_key: str = "", force_refresh: bool = False) -> dict:
+    """Ground, generate and extract metrics for one competitor. Shared by the single and batch endpoints.
+
+    When a previous report exists, only the sections whose grounding facets changed are
+    regenerated, and nothing is regenerated when the searches return the same results.
+    """
+    print(f"🔍 [Competitor Intel] Analysing: {competitor_name}...")
+    client_product_desc, client_product_name, client_sales = client_context
+
+    # Market, pricing, reviews and news searches run concurrently (cached per query)
+    grounding = await ground(competitor_facets(competitor_name, client_product_name), limit=search_limit)
+    fingerprints = grounding.fingerprints()
+    model_to_use = model or "groq"
+
+    store = get_report_store()
+    previous = None if force_refresh else store.get(workspace_id, competitor_name, client_key)
+    if previous is not None and (_is_stale(previous) or not (fingerprints or previous["fingerprints"])):
+        # No grounding on either run (e.g. no SERPAPI_KEY): nothing shows whether the market moved,
+        # and an "unchanged" verdict would pin the first report until it ages out
+        previous = None
+    changed: list[str] = []
+    affected: list[str] = list(REPORT_SECTIONS)
+    if previous is not None:
+        changed = [f for f, fp in fingerprints.items() if previous["fingerprints"].get(f) != fp]
+        present = {name for name, _ in split_sections(previous["content"])[1]}
+        affected = [name for name, facets in REPORT_SECTIONS.items() if facets & set(changed)]
+        # A facet whose search failed this time keeps its last known snapshot
+        fingerprints = {**previous["fingerprints"], **fingerprints}
+        if any(name not in present for name in affected):
+            # A changed section we cannot find under a "## " heading cannot be patched in place
+            print(f"   - Sections missing from the previous report ({', '.join(n for n in affected if n not in present)})")
+            previous = None
+            affected = list(REPORT_SECTIONS)
+
+    if previous is not None and not affected:
+        mode = "unchanged"
+        content, metrics, generated_at = previous["content"], previous["metrics"], previous["generated_at"]
+        print(f"   - Grounding unchanged since {generated_at}; reusing report")
+    elif previous is not None and len(affected) < len(REPORT_SECTIONS):
+        mode = "partial"
+        print(f"   - Regenerating {len(affected)}/{len(REPORT_SECTIONS)} sections (changed: {', '.join(changed)})")
+        facets = set().union(*(REPORT_SECTIONS[name] for name in affected))
+        old_sections = dict(split_sections(previous["content"])[1])
+        prompt = DELTA_PROMPT.format(
+            competitor=competitor_name,
+            client_product_desc=client_product_desc,
+            client_sales=client_sales,
+            live_data=grounding.text(facets),
+            previous_sections="\n\n".join(old_sections[name] for name in affected),
+            previous_metrics=json.dumps(previous["metrics"]),
+            section_list="\n".join(f"- {name}" for name in affected),
+        )
+        raw_content = await unified_generate(prompt, model_name=model_to_use)
+        if is_generation_error(raw_content):
+            # Providers down: the last report beats an error message
+            mode = "unchanged"
+            content, metrics, generated_at = previous["content"], previous["metrics"], previous["generated_at"]
+        else:
+            extraction = METRICS_EXTRACTOR.extract(raw_content)
+            content = merge_sections(previous["content"], extraction.text)
+            metrics = {**previous["metrics"],
+                       **{k: v for k, v in extraction.values.items() if k not in extraction.missing}}
+            generated_at = store.save(workspace_id, competitor_name, client_key, model_to_use, content, metrics,
+                                      grounding.sections, fingerprints)
+    else:
+        mode = "full"
         prompt = COMPETITOR_PROMPT.format(
-            competitor=req.competitor_name, 
-            live_data=live_data,
+            competitor=competitor_name,
+            live_data=grounding.text(),
             client_product_desc=client_product_desc,
             client_sales=client_sales
         )
-        
-        model_to_use = req.model or "groq"
         print(f"   - Using model: {model_to_use} (Stable Primary)")
         raw_content = await unified_generate(prompt, model_name=model_to_use)
-        
-        # Robust Metrics Extraction
-        import json, re
-        metrics = {
-            "Product Quality": 60, 
-            "Market Share": 40, 
-            "Customer Satisfaction": 70, 
-            "Innovation Rate": 55
-        }
-        clean_content = raw_content
+        if is_generation_error(raw_content):
+            # No report to fall back on; default metrics would pass for real scores
+            raise HTTPException(status_code=502, detail=raw_content)
 
-        try:
-            # Try to find JSON block directly
-            json_match = re.search(r'{[\s\n]*"Product Quality":.*?"Innovation Rate":[\s\d]*}', raw_content, re.DOTALL)
-            if json_match:
-                extracted_json = json_match.group(0).strip()
-                metrics.update(json.loads(extracted_json))
-                clean_content = raw_content.replace(extracted_json, "").strip()
-                # Remove common markers
-                clean_content = re.sub(r'<MARKET_METRICS>|</MARKET_METRICS>|\[VISUALIZATION_DATA\]', '', clean_content, flags=re.IGNORECASE).strip()
-            else:
-                # Try more general JSON match if specific one fails
-                fallback_json = re.search(r'\{.*Product Quality.*\}', raw_content, re.DOTALL)
-                if fallback_json:
-                    metrics.update(json.loads(fallback_json.group(0)))
-                    clean_content = raw_content.replace(fallback_json.group(0), "").strip()
-        except Exception as e:
-            print(f"   ⚠️ [Metrics Extraction] Failed to parse JSON: {e}")
+        extraction = METRICS_EXTRACTOR.extract(raw_content)
+        if extraction.missing:
+            print(f"   ⚠️ [Metrics Extraction] Using defaults for: {', '.join(extraction.missing)}")
             # Log the raw content fragment for debugging
             print(f"   [RAW FRAGMENT]: {raw_content[-200:]}")
+        content, metrics = extraction.text, extraction.values
+        generated_at = store.save(workspace_id, competitor_name, client_key, model_to_use, content, metrics,
+                                  grounding.sections, fingerprints)
+
+    print(f"✅ [Competitor Intel] Analysis complete for {competitor_name} ({mode})")
+    return {
+        "status": "complete",
+        "competitor": competitor_name,
+        "content": content,
+        "metrics": metrics,
+        "live_data_used": grounding.live,
+        "model": model_to_use,
+        "generated_at": generated_at,
+        "delta": {
+            "mode": mode,
+            "changed_facets": changed,
+            "regenerated_sections": affected if mode != "unchanged" else [],
+        },
+        "why_this": [
+            {"rule": "Strategic loophole detection active", "confidence": 92, "outcomes": 45},
+            {"rule": "Sales trajectory comparison grounded in internal metrics", "confidence": 88, "outcomes": 21},
+        ]
+    }
 
-        print(f"✅ [Competitor Intel] Analysis complete for {req.competitor_name}")
-        return {
-            "status": "complete",
-            "competitor": req.competitor_name,
-            "content": clean_content,
-            "metrics": metrics,
-            "live_data_used": bool(SERPAPI_KEY),
-            "model": model_to_use,
-            "why_this": [
-                {"rule": "Strategic loophole detection active", "confidence": 92, "outcomes": 45},
-                {"rule": "Sales trajectory comparison grounded in internal metrics", "confidence": 88, "outcomes": 21},
-            ]
-        }
+
+@router.post("/analyse")
+async def analyse_competitor(req: CompetitorRequest, user: dict = Depends(get_current_user)):
+    workspace_id = user.get("workspace_id", "default")
+    try:
+        return await run_analysis(req.competitor_name, _client_context(req.client_product_id, workspace_id), req.model,
+                                  workspace_id=workspace_id, client_key=req.client_product_id or "",
+                                  force_refresh=req.force_refresh)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ [Competitor Intel] Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/analyse-batch")
+async def analyse_competitor_batch(req: CompetitorBatchRequest, user: dict = Depends(get_current_user)):
+    """Analyse a competitor landscape in one call. Streams NDJSON: one `report` (or `error`) line per
+    competitor as soon as it finishes, then a `summary` line carrying the metrics matrix."""
+    workspace_id = user.get("workspace_id", "default")
+    competitors = list(dict.fromkeys(name.strip() for name in req.competitors if name.strip()))
+    if not competitors:
+        raise HTTPException(status_code=400, detail="No competitor names given")
+    client_context = _client_context(req.client_product_id, workspace_id)
+    model = req.model or "groq"
+    concurrency = min(req.concurrency or COMPETITOR_BATCH_CONCURRENCY, COMPETITOR_BATCH_CONCURRENCY_MAX)
+    print(f"🔍 [Competitor Intel] Batch of {len(competitors)} competitors (concurrency {concurrency})")
+
+    async def ndjson():
+        slots = asyncio.Semaphore(concurrency)
+        search_limit = asyncio.Semaphore(COMPETITOR_PROVIDER_BUDGETS.get("serpapi", concurrency))
+        llm_limits = {name: asyncio.Semaphore(budget) for name, budget in COMPETITOR_PROVIDER_BUDGETS.items()
+                      if name != "serpapi"}
+        started = time.perf_counter()
+
+        async def one(name: str) -> tuple[str, Optional[dict], Optional[str]]:
+            async with slots:
+                try:
+                    with provider_budget(llm_limits):
+                        report = await run_analysis(name, client_context, model, search_limit,
+                                                    workspace_id=workspace_id, client_key=req.client_product_id or "",
+                                                    force_refresh=req.force_refresh)
+                    return name, report, None
+                except Exception as e:
+                    print(f"❌ [Competitor Intel] Error for {name}: {e}")
+                    return name, None, getattr(e, "detail", None) or str(e) or e.__class__.__name__
+
+        tasks = [asyncio.create_task(one(name)) for name in competitors]
+        matrix: dict[str, dict] = {}
+        failed: dict[str, str] = {}
+        modes = {"full": 0, "partial": 0, "unchanged": 0}
+        try:
+            for finished in asyncio.as_completed(tasks):
+                name, report, error = await finished
+                if report is None:
+                    failed[name] = error
+                    yield json.dumps({"error": {"competitor": name, "detail": error}}) + "\n"
+                else:
+                    matrix[name] = report["metrics"]
+                    modes[report["delta"]["mode"]] += 1
+                    yield json.dumps({"report": report}) + "\n"
+        finally:
+            # Client went away mid-run: stop spending provider quota
+            for task in tasks:
+                task.cancel()
+
+        yield json.dumps({"summary": {
+            "completed": len(matrix),
+            "failed": failed,
+            "delta_modes": modes,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+            "model": model,
+            # Rows in request order, so the frontend can render the landscape as-is
+            "metrics_matrix": {name: matrix[name] for name in competitors if name in matrix},
+        }}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @router.get("/weekly-digest")
 async def get_weekly_digest(user: dict = Depends(get_current_user)):
     prompt = """Generate a MonDay morning competitive intelligence digest for a B2B SaaS marketing platform (MarketMind).
     Cover: top competitor moves this week, market trend signals, platform algorithm changes, and 3 recommended actions."""
-    content = await unified_generate(prompt)
+    content = await unified_generate(prompt, cache_ttl=DIGEST_CACHE_TTL, cache_scope=user.get("workspace_id"))
     return {"status": "complete", "content": content, "week": "Week of Feb 23, 2026"}
@@ -8,6 +8,9 @@ from ai_clients import unified_generate
 
 router = APIRouter(prefix="/intelligence", tags=["intelligence"])
 
+# BRIEF_PROMPT is fixed, so the brief only needs regenerating a few times a day per workspace
+BRIEF_CACHE_TTL = 6 * 60 * 60
+
 BRIEF_PROMPT = """Generate a MarketMind Weekly Intelligence Brief for a small business owner.
 
 STRICT FORMATTING RULES:
@@ -47,7 +50,10 @@ STRICT FORMATTING RULES:
 
 @router.post("/weekly-brief")
 async def generate_weekly_brief(req: IntelligenceRequest, user: dict = Depends(get_current_user)):
-    content = await unified_generate(BRIEF_PROMPT, model_name=req.model)
+    content = await unified_generate(
+        BRIEF_PROMPT, model_name=req.model,
+        cache_ttl=BRIEF_CACHE_TTL, cache_scope=user.get("workspace_id"),
+    )
     return {
         "status": "complete",
         "period": req.period,
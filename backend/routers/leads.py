@@ -1,79 +1,29 @@
 """
 Module 5 — Lead Scoring & Intelligence (IBM watsonx stub / Gemini fallback)
 """
+import asyncio
+import heapq
+import json
 import math
-from fastapi import APIRouter, Depends, UploadFile, File
+from typing import AsyncIterator, BinaryIO
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from auth import get_current_user
 from models import LeadRequest
 from ai_clients import unified_generate
+from lead_scoring import (
+    HAS_NUMPY, CSVChunker, LeadFrame, ShardResult, compute_lead_score, pool_size, score_file_parallel,
+    score_frame, np,
+)
 import csv, io
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
-
-def compute_lead_score(lead: dict) -> dict:
-    """
-    Rule-based lead scoring engine (watsonx stub).
-    Returns score 0-100, tier, top signals.
-    In production: call IBM watsonx AutoAI endpoint here.
-    """
-    score = 50  # base
-
-    # Intent signals
-    email_opens = int(lead.get("email_opens", 0) or 0)
-    page_visits = int(lead.get("page_visits", 0) or 0)
-    score += min(email_opens * 4, 20)
-    score += min(page_visits * 3, 15)
-
-    # Firmographic fit
-    company_size = int(lead.get("company_size", 0) or 0)
-    if 1 <= company_size <= 200:  # SMB sweet spot
-        score += 15
-    elif company_size > 500:
-        score += 5
-
-    # Role-based scoring
-    role = str(lead.get("role", "")).lower()
-    if any(kw in role for kw in ["ceo", "founder", "owner", "managing director"]):
-        score += 10
-    elif any(kw in role for kw in ["marketing", "sales", "growth", "cmo"]):
-        score += 7
-
-    score = min(max(score, 0), 100)
-
-    if score >= 80:
-        tier, color = "Hot", "#059669"
-    elif score >= 60:
-        tier, color = "Warm", "#D97706"
-    elif score >= 40:
-        tier, color = "Cool", "#2F80ED"
-    else:
-        tier, color = "Cold", "#64748B"
-
-    signals = []
-    if email_opens > 3:
-        signals.append({"signal": f"Opened {email_opens} emails", "impact": "+positive"})
-    if page_visits > 2:
-        signals.append({"signal": f"Visited {page_visits} pages", "impact": "+positive"})
-    if "ceo" in role or "founder" in role:
-        signals.append({"signal": "Decision maker title detected", "impact": "+positive"})
-
-    if score >= 80:
-        next_action = "Call within 48 hours. Send pricing PDF today."
-    elif score >= 60:
-        next_action = "Send a case study email. Schedule a discovery call."
-    elif score >= 40:
-        next_action = "Add to nurture sequence. Share a relevant blog post."
-    else:
-        next_action = "Keep in long-term nurture. Re-engage in 30 days."
-
-    return {
-        "score": score,
-        "tier": tier,
-        "tier_color": color,
-        "signals": signals[:3],
-        "next_action": next_action,
-    }
+BATCH_CHUNK_ROWS = 2000      # rows scored per chunk
+BATCH_READ_BYTES = 1 << 16   # bytes pulled from the upload per read
+BATCH_TOP_K = 1000           # leads returned by /score-batch (all rows are still counted)
+BATCH_PARALLEL_MIN_BYTES = 8 << 20  # below this a process pool costs more than it saves
 
 
 @router.post("/score")
@@ -110,28 +60,242 @@ Format as a detailed report."""
     # ... previous logic for single lead ...
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Batch scoring — incremental CSV ingestion with bounded memory
+# ──────────────────────────────────────────────────────────────────────────────
+class BatchAccumulator:
+    """Running tier counts plus a bounded top-K heap; memory is O(K) regardless of file size."""
+
+    def __init__(self, top_k: int = BATCH_TOP_K):
+        self.top_k = top_k
+        self._heap: list[tuple[int, int, dict]] = []  # (score, -seq, lead): min-heap keeps the best K
+        self.total = 0
+        self.invalid = 0
+        self.tiers = {"Hot": 0, "Warm": 0, "Cool": 0, "Cold": 0}
+
+    def add(self, lead: dict) -> None:
+        self.total += 1
+        self.tiers[lead["tier"]] += 1
+        self._offer(lead["score"], self.total, lambda: lead)
+
+    def add_scored(self, rows: list[dict], result, valid) -> None:
+        """Bulk add a vectorized chunk; only rows that can enter the top-K are turned into dicts."""
+        idx = np.flatnonzero(valid)
+        base = self.total
+        self.total += len(idx)
+        for tier, count in result.tier_counts().items():
+            self.tiers[tier] += count
+        if self.top_k <= 0 or not len(idx):
+            return
+        order = np.lexsort((idx, -result.scores[idx]))[:self.top_k]
+        for pos in order:
+            i = int(idx[pos])
+            self._offer(int(result.scores[i]), base + int(pos) + 1, lambda i=i: {**rows[i], **result.result(i)})
+
+    def merge(self, shard: ShardResult) -> None:
+        """Fold in a process-pool shard; shards must arrive in file order to keep tie-breaking stable."""
+        base = self.total
+        self.total += shard.total
+        self.invalid += shard.invalid
+        for tier, count in shard.tiers.items():
+            self.tiers[tier] += count
+        for score, pos, lead in shard.top:
+            self._offer(score, base + pos + 1, lambda lead=lead: lead)
+
+    def _offer(self, score: int, seq: int, make_lead) -> None:
+        if self.top_k <= 0:
+            return
+        # On equal scores the earlier row wins, matching the old stable sort
+        key = (score, -seq)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, (*key, make_lead()))
+        elif key > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, (*key, make_lead()))
+
+    def top(self) -> list[dict]:
+        return [lead for _, _, lead in sorted(self._heap, key=lambda x: (-x[0], -x[1]))]
+
+    def stats(self) -> dict:
+        return {
+            "total": self.total,
+            "hot": self.tiers["Hot"],
+            "warm": self.tiers["Warm"],
+            "cool": self.tiers["Cool"],
+            "cold": self.tiers["Cold"],
+            "invalid": self.invalid,
+        }
+
+
+def score_rows(rows: list[dict], acc: BatchAccumulator, materialize: bool = True) -> list[dict]:
+    """Score one chunk of parsed CSV rows; rows with unparseable numbers are counted and skipped.
+    With materialize=False only the accumulator is updated (nothing is returned)."""
+    if HAS_NUMPY:
+        return _score_rows_vectorized(rows, acc, materialize)
+    scored = []
+    for row in rows:
+        try:
+            lead = {**row, **compute_lead_score(row)}
+        except (TypeError, ValueError):
+            acc.invalid += 1
+            continue
+        acc.add(lead)
+        scored.append(lead)
+    return scored
+
+
+def _score_rows_vectorized(rows: list[dict], acc: BatchAccumulator, materialize: bool) -> list[dict]:
+    frame = LeadFrame.from_rows(rows)
+    result = score_frame(frame)
+    if not materialize:
+        acc.invalid += int(len(rows) - frame.valid.sum())
+        acc.add_scored(rows, result, frame.valid)
+        return []
+    scored = []
+    for i, row in enumerate(rows):
+        if not frame.valid[i]:
+            acc.invalid += 1
+            continue
+        lead = {**row, **result.result(i)}
+        acc.add(lead)
+        scored.append(lead)
+    return scored
+
+
+def _score_file_chunk(fileobj: BinaryIO, chunker: CSVChunker, acc: BatchAccumulator,
+                      materialize: bool) -> tuple[list[dict], bool]:
+    """Read and score the next slice of a spooled upload (runs in a worker thread)."""
+    data = fileobj.read(BATCH_READ_BYTES)
+    chunks = chunker.feed(data) if data else chunker.close()
+    scored = []
+    for rows in chunks:
+        scored.extend(score_rows(rows, acc, materialize))
+    return scored, not data
+
+
+async def _iter_spooled(fileobj: BinaryIO, acc: BatchAccumulator, materialize: bool = True) -> AsyncIterator[list[dict]]:
+    chunker = CSVChunker(BATCH_CHUNK_ROWS)
+    done = False
+    while not done:
+        scored, done = await asyncio.to_thread(_score_file_chunk, fileobj, chunker, acc, materialize)
+        if scored:
+            yield scored
+
+
+def _score_file_pooled(fileobj: BinaryIO, acc: BatchAccumulator) -> None:
+    for shard in score_file_parallel(fileobj, acc.top_k):
+        acc.merge(shard)
+
+
+def _use_pool(fileobj: BinaryIO, parallel: bool | None) -> bool:
+    """Pool mode only pays off past a few shards' worth of bytes; small files stay in-process."""
+    if parallel is False or not HAS_NUMPY or (parallel is None and pool_size() <= 0):
+        return False
+    fileobj.seek(0, 2)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return parallel is True or size >= BATCH_PARALLEL_MIN_BYTES
+
+
+async def _iter_body(request: Request, acc: BatchAccumulator, body_read: asyncio.Event) -> AsyncIterator[list[dict]]:
+    """Score a raw text/csv request body as it arrives off the socket."""
+    chunker = CSVChunker(BATCH_CHUNK_ROWS)
+    async for data in request.stream():
+        for rows in chunker.feed(data):
+            yield score_rows(rows, acc)
+        await asyncio.sleep(0)  # let other requests run between chunks
+    body_read.set()
+    for rows in chunker.close():
+        yield score_rows(rows, acc)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse that leaves `receive` to the handler until `body_read` is set, so it can
+    keep reading the request body while results stream out. A disconnect mid-body surfaces in the
+    handler as ClientDisconnect; after that the stock disconnect watch takes over and cancels the stream."""
+
+    def __init__(self, content, body_read: asyncio.Event, **kwargs):
+        super().__init__(content, **kwargs)
+        self.body_read = body_read
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await self.body_read.wait()
+        await super().listen_for_disconnect(receive)
+
+
+_RESULT_FIELDS = ["score", "tier", "tier_color", "next_action", "signals"]
+
+
+def _csv_line(values: list) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue()
+
+
 @router.post("/score-batch")
-async def score_batch(file: UploadFile = File(...), user: dict = Depends(get_current_user)):
-    """Batch CSV lead scoring — up to 1000 rows."""
-    content = await file.read()
-    text = content.decode("utf-8-sig", errors="replace")
-    reader = csv.DictReader(io.StringIO(text))
-    results = []
-    for i, row in enumerate(reader):
-        if i >= 1000:
-            break
-        score_data = compute_lead_score(row)
-        results.append({**row, **score_data})
-
-    results.sort(key=lambda x: x["score"], reverse=True)
-    stats = {
-        "total": len(results),
-        "hot": sum(1 for r in results if r["tier"] == "Hot"),
-        "warm": sum(1 for r in results if r["tier"] == "Warm"),
-        "cool": sum(1 for r in results if r["tier"] == "Cool"),
-        "cold": sum(1 for r in results if r["tier"] == "Cold"),
-    }
-    return {"status": "complete", "stats": stats, "leads": results, "model": "watsonx-rules"}
+async def score_batch(file: UploadFile = File(...), top: int = Query(BATCH_TOP_K, ge=0, le=10000),
+                      parallel: bool | None = Query(None, description="Force process-pool mode on/off (default: LEAD_SCORING_PROCESSES)"),
+                      user: dict = Depends(get_current_user)):
+    """Batch CSV lead scoring — any number of rows; returns tier stats and the top-scored leads."""
+    acc = BatchAccumulator(top_k=top)
+    if await asyncio.to_thread(_use_pool, file.file, parallel):
+        await asyncio.to_thread(_score_file_pooled, file.file, acc)
+    else:
+        async for _ in _iter_spooled(file.file, acc, materialize=False):
+            pass
+    return {"status": "complete", "stats": acc.stats(), "leads": acc.top(), "model": "watsonx-rules"}
+
+
+@router.post("/score-batch/stream")
+async def score_batch_stream(request: Request, format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+                             user: dict = Depends(get_current_user)):
+    """Stream every scored lead back as NDJSON (ending with a `summary` line) or CSV.
+    Accepts a raw text/csv body (parsed as it arrives) or a multipart upload with a `file` field."""
+    acc = BatchAccumulator(top_k=0)
+    form = None
+    body_read = asyncio.Event()
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "file"):
+            await form.close()
+            raise HTTPException(status_code=400, detail="Multipart upload must include a 'file' field")
+        body_read.set()  # the form parser has consumed the body; only a disconnect can arrive now
+        batches = _iter_spooled(upload.file, acc)
+    else:
+        batches = _iter_body(request, acc, body_read)
+
+    async def ndjson():
+        async for scored in batches:
+            yield "".join(json.dumps(lead, default=str) + "\n" for lead in scored)
+        yield json.dumps({"summary": {**acc.stats(), "model": "watsonx-rules"}}) + "\n"
+
+    async def as_csv():
+        header_written = False
+        async for scored in batches:
+            lines = []
+            for lead in scored:
+                if not header_written:
+                    fields = [k for k in lead if k not in _RESULT_FIELDS and k is not None]
+                    lines.append(_csv_line(fields + _RESULT_FIELDS))
+                    header_written = True
+                signals = "; ".join(s["signal"] for s in lead["signals"])
+                lines.append(_csv_line([lead.get(k) for k in fields] + [
+                    lead["score"], lead["tier"], lead["tier_color"], lead["next_action"], signals,
+                ]))
+            yield "".join(lines)
+
+    async def body():
+        try:
+            async for part in (ndjson() if format == "ndjson" else as_csv()):
+                yield part
+        except ClientDisconnect:
+            pass  # client went away mid-upload; nobody is left to read the rest
+        finally:
+            if form is not None:
+                await form.close()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return BodyStreamingResponse(body(), body_read, media_type=media_type)
 
 
 @router.post("/outreach")
@@ -2,69 +2,83 @@
 Outcome Memory Engine — Logs generation→action→outcome chains.
 Returns enriched Why This panel data.
 """
-from fastapi import APIRouter, Depends
+import asyncio
+import heapq
+from fastapi import APIRouter, Depends, Query
 from auth import get_current_user
 from models import OutcomeLogRequest
-from collections import defaultdict
+from outcome_store import RULE_MIN_OUTCOMES, get_outcome_store
+from semantic_memory import get_semantic_memory
 
 router = APIRouter(prefix="/memory", tags=["outcome-memory"])
 
-# In-memory store (replace with ChromaDB/Pinecone in production)
-_memory_store: list[dict] = []
-_rules_cache: dict[str, list] = {}
+MAX_RULES = 3
+FIRST_RULE_AT = 5
 
+# Persistent store (SQLite, indexed by workspace/module) with incremental counters.
+# Derived rules are cached per workspace and keyed by the workspace's outcome total,
+# so a log from any worker invalidates them without a scan.
+_rules_cache: dict[str, tuple[int, list]] = {}
 
-def _derive_rules(workspace_id: str) -> list[dict]:
-    """Derive Outcome Memory rules from logged outcomes for a workspace."""
-    workspace_outcomes = [m for m in _memory_store if m.get("workspace_id") == workspace_id]
 
-    if not workspace_outcomes:
+def _derive_rules(workspace_id: str, total: int | None = None) -> list[dict]:
+    """Derive Outcome Memory rules from the workspace's (module, action_type) counters."""
+    store = get_outcome_store()
+    if total is None:
+        total = store.total(workspace_id)
+    if not total:
         return []
+    cached = _rules_cache.get(workspace_id)
+    if cached is not None and cached[0] == total:
+        return cached[1]
 
     # Simple pattern detection (in production: ML clustering)
-    module_counts = defaultdict(lambda: defaultdict(int))
-    for outcome in workspace_outcomes:
-        module_counts[outcome["module"]][outcome["action_type"]] += 1
-
     rules = []
-    for module, actions in module_counts.items():
-        for action, count in actions.items():
-            if count >= 2:
-                confidence = min(60 + (count * 5), 97)
-                rules.append({
-                    "rule": f"{action.replace('_', ' ').title()} on {module} generates higher engagement",
-                    "module": module,
-                    "confidence": confidence,
-                    "outcomes": count,
-                    "created_at": "2026-02-20T10:00:00Z"
-                })
+    for counter in store.counters(workspace_id, min_count=RULE_MIN_OUTCOMES):
+        count = counter["count"]
+        rules.append({
+            "rule": f"{counter['action_type'].replace('_', ' ').title()} on {counter['module']} generates higher engagement",
+            "module": counter["module"],
+            "confidence": min(60 + (count * 5), 97),
+            "outcomes": count,
+            "created_at": counter["rule_since"],
+        })
 
-    return sorted(rules, key=lambda x: -x["confidence"])[:3]
+    rules = heapq.nlargest(MAX_RULES, rules, key=lambda x: x["confidence"])
+    _rules_cache[workspace_id] = (total, rules)
+    return rules
 
 
 @router.post("/log")
 async def log_outcome(req: OutcomeLogRequest, user: dict = Depends(get_current_user)):
     """Log a generation outcome to the memory engine."""
-    entry = {
-        **req.model_dump(),
-        "workspace_id": user.get("workspace_id"),
-        "logged_at": "2026-02-23T12:00:00Z"
-    }
-    _memory_store.append(entry)
-    return {"status": "logged", "rule_count": len(_derive_rules(user.get("workspace_id", "")))}
+    workspace_id = user.get("workspace_id", "")
+    logged = get_outcome_store().log(workspace_id, **req.model_dump())
+    indexed = await asyncio.to_thread(
+        get_semantic_memory().index_outcome, workspace_id, logged["id"], req.content_snippet, req.rating
+    )
+    return {"status": "logged", "rule_count": len(_derive_rules(workspace_id)), "indexed": indexed}
+
+
+@router.get("/similar")
+async def similar_outcomes(q: str = Query(..., min_length=1), module: str | None = None,
+                           k: int = Query(3, ge=1, le=20), user: dict = Depends(get_current_user)):
+    """Past high-rated outcomes whose snippets are most similar to `q`."""
+    hits = await asyncio.to_thread(get_semantic_memory().similar, user.get("workspace_id", ""), q, k, module)
+    return {"results": hits, "count": len(hits)}
 
 
 @router.get("/rules")
 async def get_rules(user: dict = Depends(get_current_user)):
     """Get active Outcome Memory rules for the current workspace."""
     workspace_id = user.get("workspace_id", "")
-    rules = _derive_rules(workspace_id)
-    outcomes_count = len([m for m in _memory_store if m.get("workspace_id") == workspace_id])
+    outcomes_count = get_outcome_store().total(workspace_id)
+    rules = _derive_rules(workspace_id, outcomes_count)
     return {
         "rules": rules,
         "total_outcomes": outcomes_count,
         "rules_active": len(rules),
-        "next_rule_at": max(0, 5 - outcomes_count),
+        "next_rule_at": max(0, FIRST_RULE_AT - outcomes_count),
         "status": "active" if rules else "learning"
     }
 
@@ -72,11 +86,11 @@ async def get_rules(user: dict = Depends(get_current_user)):
 @router.get("/status")
 async def get_memory_status(user: dict = Depends(get_current_user)):
     workspace_id = user.get("workspace_id", "")
-    outcomes = len([m for m in _memory_store if m.get("workspace_id") == workspace_id])
-    rules = _derive_rules(workspace_id)
+    outcomes = get_outcome_store().total(workspace_id)
+    rules = _derive_rules(workspace_id, outcomes)
     return {
         "outcomes_logged": outcomes,
         "rules_active": len(rules),
-        "progress_to_first_rule": min(outcomes / 5 * 100, 100),
+        "progress_to_first_rule": min(outcomes / FIRST_RULE_AT * 100, 100),
         "status": "active" if rules else ("learning" if outcomes > 0 else "empty")
     }
@@ -1,18 +1,28 @@
 """
 Module 3 — Sales Pitch & Cold Email Generation (Groq Mixtral <3s)
 """
+import asyncio
 from fastapi import APIRouter, Depends
 from auth import get_current_user
 from models import ColdEmailRequest, SalesPitchRequest, ProposalRequest
 from ai_clients import unified_generate
+from semantic_memory import get_semantic_memory, prompt_block, why_this
 
 router = APIRouter(prefix="/pitch", tags=["pitch"])
 
+# Identical pitch inputs render identical prompts — reuse the answer for an hour
+PITCH_CACHE_TTL = 60 * 60
+
+
+async def _recall(user: dict, text: str) -> list[dict]:
+    """Past high-rated pitch outcomes similar to this request (empty until some are logged)."""
+    return await asyncio.to_thread(get_semantic_memory().similar, user.get("workspace_id", ""), text, 3, "pitch")
+
 COLD_EMAIL_PROMPT = """Generate a high-converting cold email sequence using the {framework} framework.
 
 Prospect: {prospect_name}, {role} at {company}
 {trigger}
-
+{memory_note}
 ## Subject Lines (5 variants)
 Rank by predicted open rate. Include a personalisation token.
 
@@ -31,7 +41,7 @@ PITCH_PROMPT = """Generate a complete sales pitch for a {duration}-minute meetin
 Product: {product_description}
 Prospect Company: {prospect_company}
 Context: {meeting_context}
-
+{memory_note}
 ## Opening Hook (30 seconds)
 Attention-grabbing opener referencing their specific business.
 
@@ -57,7 +67,7 @@ Follow-up email to send within 2 hours.
 PROPOSAL_PROMPT = """Generate a comprehensive sales proposal document.
 
 Brief: {brief_text}
-
+{memory_note}
 Structure:
 1. Executive Summary (1 page)
 2. Problem Statement (client's specific problem)
@@ -75,14 +85,18 @@ Make it persuasive, professional, and personalised.
 @router.post("/cold-email")
 async def generate_cold_email(req: ColdEmailRequest, user: dict = Depends(get_current_user)):
     trigger = f"Trigger event: {req.trigger_event}" if req.trigger_event else ""
+    recalled = await _recall(user, f"cold email {req.role} {req.company} {req.trigger_event or ''}")
     prompt = COLD_EMAIL_PROMPT.format(
         framework=req.framework.upper(), prospect_name=req.prospect_name,
-        role=req.role, company=req.company, trigger=trigger
+        role=req.role, company=req.company, trigger=trigger, memory_note=prompt_block(recalled)
+    )
+    content = await unified_generate(
+        prompt, model_name=req.model or "groq",
+        cache_ttl=PITCH_CACHE_TTL, cache_scope=user.get("workspace_id"),
     )
-    content = await unified_generate(prompt, model_name=req.model or "groq")
     return {
         "status": "complete", "content": content, "model": req.model or "groq-llama-70b",
-        "why_this": [
+        "why_this": why_this(recalled) + [
             {"rule": f"{req.framework.upper()} framework emails have 34% higher reply rate for {req.role} titles", "confidence": 85, "outcomes": 42},
             {"rule": "Trigger-event personalisation doubles reply rate vs generic cold emails", "confidence": 92, "outcomes": 67},
         ]
@@ -91,15 +105,19 @@ async def generate_cold_email(req: ColdEmailRequest, user: dict = Depends(get_cu
 
 @router.post("/sales-pitch")
 async def generate_sales_pitch(req: SalesPitchRequest, user: dict = Depends(get_current_user)):
+    recalled = await _recall(user, f"{req.product_description} {req.prospect_company} {req.meeting_context or ''}")
     prompt = PITCH_PROMPT.format(
         duration="30", product_description=req.product_description,
         prospect_company=req.prospect_company,
-        meeting_context=req.meeting_context or "Introduction call"
+        meeting_context=req.meeting_context or "Introduction call", memory_note=prompt_block(recalled)
+    )
+    content = await unified_generate(
+        prompt, model_name=req.model or "groq",
+        cache_ttl=PITCH_CACHE_TTL, cache_scope=user.get("workspace_id"),
     )
-    content = await unified_generate(prompt, model_name=req.model or "groq")
     return {
         "status": "complete", "content": content, "model": req.model or "groq-llama-70b",
-        "why_this": [
+        "why_this": why_this(recalled) + [
             {"rule": "Company-specific research in opening increases win rate by 28%", "confidence": 80, "outcomes": 35},
         ]
     }
@@ -107,6 +125,10 @@ async def generate_sales_pitch(req: SalesPitchRequest, user: dict = Depends(get_
 
 @router.post("/proposal")
 async def generate_proposal(req: ProposalRequest, user: dict = Depends(get_current_user)):
-    prompt = PROPOSAL_PROMPT.format(brief_text=req.brief_text)
-    content = await unified_generate(prompt, model_name=req.model or "groq")
-    return {"status": "complete", "content": content, "model": req.model or "groq-llama-70b", "why_this": []}
+    recalled = await _recall(user, req.brief_text)
+    prompt = PROPOSAL_PROMPT.format(brief_text=req.brief_text, memory_note=prompt_block(recalled))
+    content = await unified_generate(
+        prompt, model_name=req.model or "groq",
+        cache_ttl=PITCH_CACHE_TTL, cache_scope=user.get("workspace_id"),
+    )
+    return {"status": "complete", "content": content, "model": req.model or "groq-llama-70b", "why_this": why_this(recalled)}
@@ -1,66 +1,58 @@
 """
 Module 8 — Product Management (Client Portfolio)
 """
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from auth import get_current_user
-from models import ProductCreateRequest
-import uuid
+from models import ProductBulkImportRequest, ProductCreateRequest
+from product_store import get_product_repository, new_product_id
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-# In-memory store (replace with DB for production)
-_product_store: list[dict] = [
-    {
-        "id": "prod_1",
-        "name": "MarketMind Pro",
-        "description": "Enterprise-grade marketing intelligence platform with real-time grounding.",
-        "category": "SaaS",
-        "price": 499.0,
-        "sales_volume": 1250,
-        "workspace_id": "default"
-    },
-    {
-        "id": "prod_2",
-        "name": "Campaign Automator",
-        "description": "AI-driven tool for multi-platform ad campaign generation.",
-        "category": "SaaS",
-        "price": 199.0,
-        "sales_volume": 3400,
-        "workspace_id": "default"
-    }
-]
+PRODUCTS_MAX_PAGE_SIZE = 1000
+
 
 @router.post("/")
 async def create_product(req: ProductCreateRequest, user: dict = Depends(get_current_user)):
     product = {
-        "id": f"prod_{uuid.uuid4().hex[:8]}",
+        "id": new_product_id(),
         **req.model_dump(),
         "workspace_id": user.get("workspace_id", "default")
     }
-    _product_store.append(product)
+    get_product_repository().add_many([product])
     return {"status": "created", "product": product}
 
+@router.post("/bulk")
+async def import_products(req: ProductBulkImportRequest, user: dict = Depends(get_current_user)):
+    """Import many products in one transaction."""
+    workspace_id = user.get("workspace_id", "default")
+    products = [{"id": new_product_id(), **p.model_dump(), "workspace_id": workspace_id} for p in req.products]
+    imported = get_product_repository().add_many(products)
+    return {"status": "created", "imported": imported, "ids": [p["id"] for p in products]}
+
 @router.get("/")
-async def list_products(user: dict = Depends(get_current_user)):
+async def list_products(response: Response,
+                        limit: Optional[int] = Query(None, ge=1, le=PRODUCTS_MAX_PAGE_SIZE),
+                        after: int = Query(0, ge=0, description="Cursor from the X-Next-Cursor header"),
+                        user: dict = Depends(get_current_user)):
+    """The workspace catalog. Without `limit` every product is returned, as before paging existed;
+    with it, one page at a time driven by the X-Total-Count and X-Next-Cursor headers."""
     workspace_id = user.get("workspace_id", "default")
-    return [p for p in _product_store if p.get("workspace_id") == workspace_id]
+    repo = get_product_repository()
+    products, next_cursor = repo.list(workspace_id, limit=limit, after=after)
+    response.headers["X-Total-Count"] = str(repo.count(workspace_id))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return products
 
 @router.delete("/{product_id}")
 async def delete_product(product_id: str, user: dict = Depends(get_current_user)):
-    global _product_store
     workspace_id = user.get("workspace_id", "default")
-    
-    initial_len = len(_product_store)
-    _product_store = [p for p in _product_store if not (p["id"] == product_id and p["workspace_id"] == workspace_id)]
-    
-    if len(_product_store) == initial_len:
+    if not get_product_repository().delete(product_id, workspace_id):
         raise HTTPException(status_code=404, detail="Product not found or unauthorized")
-        
+
     return {"status": "deleted", "id": product_id}
 
 # Helper for competitor router
 def get_product_by_id(product_id: str, workspace_id: str):
-    for p in _product_store:
-        if p["id"] == product_id and p["workspace_id"] == workspace_id:
-            return p
-    return None
+    return get_product_repository().get(product_id, workspace_id)
@@ -1,16 +1,25 @@
 """
 Module 6 — Sales Practice Simulator (Groq LLaMA 3.1 70B streaming, <500ms responses)
 """
-import asyncio
 import json
-from fastapi import APIRouter, Depends
+import os
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from auth import get_current_user
 from models import SimulatorStartRequest, SimulatorMessageRequest, SimulatorDebriefRequest
-from ai_clients import unified_generate
+from ai_clients import generation_error_message, is_generation_error, unified_generate, unified_stream
+from provider_router import AllProvidersFailed
+from session_store import get_session_store
 
 router = APIRouter(prefix="/simulator", tags=["simulator"])
 
+DEFAULT_PERSONA = "Skeptical CFO"
+# Messages sent verbatim with every turn; older ones are folded into the session summary
+# SIMULATOR_SUMMARY_BATCH at a time, so prompts stay bounded however long the session runs
+SIMULATOR_RECENT_MESSAGES = int(os.getenv("SIMULATOR_RECENT_MESSAGES", "10"))
+SIMULATOR_SUMMARY_BATCH = int(os.getenv("SIMULATOR_SUMMARY_BATCH", "6"))
+
 PERSONAS = {
     "Skeptical CFO": {
         "name": "Rajesh Malhotra",
@@ -94,6 +103,17 @@ Count and list filler phrases if any are visible in the transcript.
 One paragraph of direct coaching advice.
 """
 
+SUMMARY_PROMPT = """You keep running notes on a sales practice call between a Sales Rep and {name} ({role}, {company}).
+
+Notes so far:
+{summary}
+
+New exchanges to fold in:
+{transcript}
+
+Rewrite the notes in under 150 words: objections raised and whether the rep addressed them, facts, prices
+and numbers the rep shared, anything promised, and {name}'s current stance. Output only the notes."""
+
 @router.get("/personas")
 async def get_personas():
     return {"personas": [
@@ -102,21 +122,30 @@ async def get_personas():
     ]}
 
 
-@router.post("/message")
-async def send_message(req: SimulatorMessageRequest, user: dict = Depends(get_current_user)):
-    persona_data = PERSONAS.get(req.persona, PERSONAS["Skeptical CFO"])
+def _persona(key: Optional[str]) -> tuple[str, dict]:
+    key = key if key in PERSONAS else DEFAULT_PERSONA
+    return key, PERSONAS[key]
+
+
+def _transcript(messages: list[dict], persona_name: str, rep_label: str = "Sales Rep") -> str:
+    return "\n".join(
+        f"{rep_label if m['role'] == 'rep' else persona_name}: {m['content']}" for m in messages
+    )
+
+
+def _build_turn(persona_data: dict, rep_message: str, history: list[dict], summary: str = "") -> tuple[str, str]:
+    """Return (system prompt, turn prompt) for a rep message."""
     system = SIMULATOR_SYSTEM.format(**persona_data)
 
     # Build conversation context
-    history_text = ""
-    for msg in req.history[-10:]:  # last 10 messages
-        role_label = "Sales Rep" if msg["role"] == "rep" else persona_data["name"]
-        history_text += f"{role_label}: {msg['content']}\n"
+    history_text = _transcript(history, persona_data["name"])
+    if summary:
+        history_text = f"Summary of the earlier conversation:\n{summary}\n\nMost recent messages:\n{history_text}"
 
     prompt = f"""Conversation Context:
 {history_text}
 
-Sales Rep's Latest Turn: {req.rep_message}
+Sales Rep's Latest Turn: {rep_message}
 
 INSTRUCTIONS FOR THIS TURN:
 - If this is Turn 1, start with a conversational opening.
@@ -125,21 +154,176 @@ INSTRUCTIONS FOR THIS TURN:
 - Vary your opening phrase and tone to keep it fresh.
 
 {persona_data['name']}:"""
+    return system, prompt
+
+
+def _load_session(session_id: str, user: dict) -> dict:
+    session = get_session_store().get(session_id, user.get("workspace_id", "default"))
+    if session is None:
+        raise HTTPException(status_code=404, detail="Simulator session not found or expired")
+    return session
+
+
+def _recent_messages(session: dict) -> list[dict]:
+    """Everything not yet summarised, capped in case summarisation is falling behind."""
+    window = SIMULATOR_RECENT_MESSAGES + SIMULATOR_SUMMARY_BATCH
+    after = max(session["summarized_upto"], session["messages"] - window)
+    return get_session_store().messages(session["id"], after=after)
+
+
+def _prepare_turn(req: SimulatorMessageRequest, user: dict) -> tuple[Optional[dict], str, dict, str, str, str]:
+    """(session or None, persona key, persona data, system prompt, turn prompt, model) for a rep message."""
+    if req.session_id is None:
+        persona_key, persona_data = _persona(req.persona)
+        system, prompt = _build_turn(persona_data, req.rep_message, req.history[-SIMULATOR_RECENT_MESSAGES:])
+        return None, persona_key, persona_data, system, prompt, req.model or "groq"
+
+    session = _load_session(req.session_id, user)
+    persona_key, persona_data = _persona(session["persona"])
+    system, prompt = _build_turn(persona_data, req.rep_message, _recent_messages(session), session["summary"])
+    return session, persona_key, persona_data, system, prompt, req.model or session["model"] or "groq"
+
+
+_summarizing: set[str] = set()
+
 
-    response = await unified_generate(prompt, model_name=req.model or "groq", system=system)
+async def _roll_summary(session_id: str, workspace_id: str) -> None:
+    """Fold messages that fell out of the recent window into the session summary (runs after the response)."""
+    store = get_session_store()
+    session = store.get(session_id, workspace_id)
+    if session is None or session_id in _summarizing:
+        return
+    upto = session["messages"] - SIMULATOR_RECENT_MESSAGES
+    if upto - session["summarized_upto"] < SIMULATOR_SUMMARY_BATCH:
+        return
+    _summarizing.add(session_id)
+    try:
+        _, persona_data = _persona(session["persona"])
+        prompt = SUMMARY_PROMPT.format(
+            **persona_data,
+            summary=session["summary"] or "(none yet)",
+            transcript=_transcript(store.messages(session_id, after=session["summarized_upto"], upto=upto), persona_data["name"]),
+        )
+        summary = await unified_generate(prompt, model_name=session["model"] or "groq")
+        if is_generation_error(summary):
+            print(f"   ⚠️ [Simulator] Summary update skipped for {session_id}: {summary}")
+            return
+        store.set_summary(session_id, summary.strip(), upto)
+    finally:
+        _summarizing.discard(session_id)
+
+
+def _record_turn(session: Optional[dict], req: SimulatorMessageRequest, response: str,
+                 background: BackgroundTasks) -> Optional[int]:
+    if session is None:
+        return None
+    count = get_session_store().append(session["id"], [
+        {"role": "rep", "content": req.rep_message},
+        {"role": "persona", "content": response},
+    ])
+    background.add_task(_roll_summary, session["id"], session["workspace_id"])
+    return count
+
+
+@router.post("/start")
+async def start_session(req: SimulatorStartRequest, user: dict = Depends(get_current_user)):
+    """Open a server-held session; later turns send only `session_id` and the new rep message."""
+    persona_key, persona_data = _persona(req.persona)
+    session = get_session_store().create(user.get("workspace_id", "default"), persona_key, req.model)
+    return {
+        "session_id": session["id"],
+        "persona": persona_key,
+        "persona_name": persona_data["name"],
+        "created_at": session["created_at"],
+    }
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str, user: dict = Depends(get_current_user)):
+    session = _load_session(session_id, user)
+    messages = get_session_store().messages(session_id)
+    return {
+        "session_id": session_id,
+        "persona": session["persona"],
+        "summary": session["summary"],
+        "created_at": session["created_at"],
+        "updated_at": session["updated_at"],
+        "messages": [{"role": m["role"], "content": m["content"]} for m in messages],
+    }
+
+
+@router.post("/message")
+async def send_message(req: SimulatorMessageRequest, background: BackgroundTasks,
+                       user: dict = Depends(get_current_user)):
+    session, persona_key, persona_data, system, prompt, model = _prepare_turn(req, user)
+    response = await unified_generate(prompt, model_name=model, system=system)
+    if is_generation_error(response):
+        # Not a persona turn: keep it out of the transcript, summary and debrief
+        raise HTTPException(status_code=502, detail=response)
+    _record_turn(session, req, response, background)
     return {
         "status": "complete",
         "persona_response": response,
-        "persona": req.persona,
+        "persona": persona_key,
         "persona_name": persona_data["name"],
+        "session_id": req.session_id,
     }
 
 
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@router.post("/message/stream")
+async def stream_message(req: SimulatorMessageRequest, background: BackgroundTasks,
+                         user: dict = Depends(get_current_user)):
+    """Server-sent events variant of /message: one `{"token": ...}` event per chunk, then `{"done": true}`
+    (or a single `{"error": ...}` if no provider could answer)."""
+    session, persona_key, persona_data, system, prompt, model = _prepare_turn(req, user)
+
+    async def event_stream():
+        parts = []
+        try:
+            async for token in unified_stream(prompt, model_name=model, system=system):
+                parts.append(token)
+                yield _sse({"token": token})
+        except AllProvidersFailed as e:
+            yield _sse({"error": generation_error_message(e)})
+            return
+        response = "".join(parts)
+        # Stored only once the reply is complete; a dropped stream leaves the session as it was
+        _record_turn(session, req, response, background)
+        yield _sse({
+            "done": True,
+            "persona_response": response,
+            "persona": persona_key,
+            "persona_name": persona_data["name"],
+            "session_id": req.session_id,
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background,
+    )
+
+
 @router.post("/debrief")
 async def generate_debrief(req: SimulatorDebriefRequest, user: dict = Depends(get_current_user)):
-    transcript_text = "\n".join(
-        [f"{'Rep' if m['role'] == 'rep' else 'Customer'}: {m['content']}" for m in req.transcript]
-    )
-    prompt = DEBRIEF_PROMPT.format(persona=req.persona, transcript=transcript_text)
-    content = await unified_generate(prompt, model_name=req.model)
+    summary = ""
+    if req.session_id is not None:
+        # Same bounded view the turns use: rolling summary plus the unsummarised tail
+        session = _load_session(req.session_id, user)
+        persona, transcript, model = session["persona"], _recent_messages(session), session["model"]
+        summary = session["summary"]
+    else:
+        persona, transcript, model = req.persona or DEFAULT_PERSONA, req.transcript, None
+    if not transcript and not summary:
+        raise HTTPException(status_code=400, detail="Nothing to debrief: the transcript is empty")
+    transcript_text = _transcript(transcript, "Customer", rep_label="Rep")
+    if summary:
+        transcript_text = f"Summary of the earlier conversation:\n{summary}\n\nMost recent messages:\n{transcript_text}"
+    prompt = DEBRIEF_PROMPT.format(persona=persona, transcript=transcript_text)
+    content = await unified_generate(prompt, model_name=req.model or model or "groq")
     return {"status": "complete", "debrief": content}
@@ -3,29 +3,160 @@ MarketMind — Security Module (Hubverse MLDM v8)
 Multi-level defence matrix: rate limiting, WAF, CORS, honeypot, threat detection, security headers.
 """
 import os
-import time
-from collections import defaultdict
-from typing import Callable
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["120/minute"])
+from rate_limit import RateLimitMiddleware
+from shared_state import add_async, get_async, get_state_backend
+from waf import WAF_BODY_INSPECT_BYTES, get_waf
 
-# Threat tracking (in-memory — use Redis in production)
-_ip_threat_scores: dict[str, int] = defaultdict(int)
-_ip_honeypot_hits: set[str] = set()
+# Threat scores decay with a half-life, so a one-off scanner is forgiven over time
+THREAT_BLOCK_SCORE = 100
+THREAT_HALF_LIFE = float(os.getenv("THREAT_HALF_LIFE", "900"))
+HONEYPOT_PENALTY = 50
+WAF_PENALTY = 30
 
-BLOCKED_PATTERNS = ["../", "..\\", "<script", "{{", "eval(", "exec(", "DROP ", "UNION "]
+
+class ThreatStore:
+    """Per-IP threat scores and honeypot hits on the shared, size-bounded counter backend,
+    so a block issued by one worker applies to all of them."""
+
+    def __init__(self, half_life: float = THREAT_HALF_LIFE):
+        self.half_life = half_life
+
+    async def score(self, ip: str) -> float:
+        return await get_async("threat", ip, self.half_life)
+
+    async def is_blocked(self, ip: str) -> bool:
+        # Penalties are whole points; round so decay over the last few ms doesn't matter
+        return round(await self.score(ip)) >= THREAT_BLOCK_SCORE
+
+    async def penalise(self, ip: str, points: float) -> float:
+        return await add_async("threat", ip, points, self.half_life)
+
+    async def record_honeypot(self, ip: str) -> None:
+        await add_async("honeypot", ip, 1, self.half_life)
+        await self.penalise(ip, HONEYPOT_PENALTY)
+
+    def stats(self) -> dict:
+        return get_state_backend().stats()
+
+
+threat_store = ThreatStore()
+
+# Bodies of these types get their first WAF_BODY_INSPECT_BYTES peeked; the rest streams untouched
+WAF_BODY_CONTENT_TYPES = (b"application/json", b"application/x-www-form-urlencoded", b"text/plain")
 
 HONEYPOT_PATHS = {"/admin", "/wp-admin", "/phpMyAdmin", "/config.php", "/.env", "/api/v0/"}
 
 
+# OWASP recommended response headers
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"cache-control", b"no-store"),
+    (b"x-marketmind-security", b"MLDM-v8"),
+]
+_SECURITY_HEADER_NAMES = {name for name, _ in SECURITY_HEADERS}
+
+
+class SecurityMiddleware:
+    """Honeypot, IP block, WAF and security headers as a pure ASGI middleware.
+    Unlike BaseHTTPMiddleware it never wraps the response in a task/queue, so streaming
+    responses pass straight through and handlers can keep reading the request body."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip security checks for non-HTTP traffic and CORS preflight (OPTIONS)
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        path = scope["path"]
+
+        # Honeypot detection
+        if path in HONEYPOT_PATHS:
+            await threat_store.record_honeypot(client_ip)
+            await Response("Not Found", status_code=404)(scope, receive, send)
+            return
+
+        # Block known threat IPs
+        if await threat_store.is_blocked(client_ip):
+            await Response("Forbidden", status_code=403)(scope, receive, send)
+            return
+
+        # WAF — one compiled pass each over query string, headers and a body prefix
+        waf = get_waf()
+        headers = scope["headers"]
+        rule = waf.scan_query(scope["query_string"].decode("latin-1")) or waf.scan_headers(headers)
+        content_type = _content_type(headers)
+        if rule is None and content_type.startswith(WAF_BODY_CONTENT_TYPES):
+            prefix, receive = await _peek_body(receive, WAF_BODY_INSPECT_BYTES)
+            rule = waf.scan_body(prefix, content_type)
+        if rule is not None:
+            print(f"   🛡️ [WAF] Blocked {client_ip} {scope['method']} {path} (rule: {rule.name})")
+            await threat_store.penalise(client_ip, WAF_PENALTY)
+            response = Response(
+                content='{"detail": "Request blocked by WAF."}',
+                status_code=400,
+                media_type="application/json"
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                raw = [(k, v) for k, v in message.get("headers", []) if k.lower() not in _SECURITY_HEADER_NAMES]
+                message = {**message, "headers": raw + SECURITY_HEADERS}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def _content_type(headers: list[tuple[bytes, bytes]]) -> bytes:
+    for name, value in headers:
+        if name == b"content-type":
+            return value.lower()
+    return b""
+
+
+async def _peek_body(receive: Receive, limit: int) -> tuple[bytes, Receive]:
+    """Read request messages until `limit` bytes are seen, then hand back a receive that
+    replays them before continuing with the live stream (the body is never fully buffered)."""
+    buffered: list[Message] = []
+    size = 0
+    while size < limit:
+        message = await receive()
+        buffered.append(message)
+        if message["type"] != "http.request":
+            break
+        size += len(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    prefix = b"".join(m.get("body", b"") for m in buffered if m["type"] == "http.request")
+
+    async def replay() -> Message:
+        if buffered:
+            return buffered.pop(0)
+        return await receive()
+
+    return prefix[:limit], replay
+
+
 def add_security_middleware(app: FastAPI) -> None:
     """Attach all security middleware to the FastAPI app."""
 
+    # Weighted token-bucket rate limiting (innermost, so 429s still carry CORS headers)
+    app.add_middleware(RateLimitMiddleware)
+
     # CORS — allow local dev frontend
     origins = [
         "http://localhost:5173",
@@ -39,48 +170,7 @@ def add_security_middleware(app: FastAPI) -> None:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Total-Count", "X-Next-Cursor", "X-RateLimit-Remaining", "Retry-After"],
     )
-
-    @app.middleware("http")
-    async def security_middleware(request: Request, call_next: Callable) -> Response:
-        # Skip security checks for CORS preflight (OPTIONS)
-        if request.method == "OPTIONS":
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        path = request.url.path
-
-        # Honeypot detection
-        if path in HONEYPOT_PATHS:
-            _ip_honeypot_hits.add(client_ip)
-            _ip_threat_scores[client_ip] += 50
-            return Response("Not Found", status_code=404)
-
-        # Block known threat IPs
-        if _ip_threat_scores.get(client_ip, 0) >= 100:
-            return Response("Forbidden", status_code=403)
-
-        # WAF — scan query string & body snippets for injection patterns
-        query_str = str(request.url.query)
-        for pattern in BLOCKED_PATTERNS:
-            if pattern.lower() in query_str.lower():
-                _ip_threat_scores[client_ip] += 30
-                return Response(
-                    content='{"detail": "Request blocked by WAF."}',
-                    status_code=400,
-                    media_type="application/json"
-                )
-
-        # Process request
-        response: Response = await call_next(request)
-
-        # Add security headers (OWASP recommended)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Cache-Control"] = "no-store"
-        response.headers["X-MarketMind-Security"] = "MLDM-v8"
-
-        return response
+    # Added last, so it wraps CORS and screens requests first
+    app.add_middleware(SecurityMiddleware)
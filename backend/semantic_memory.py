@@ -0,0 +1,256 @@
+"""
+MarketMind — Semantic Outcome Memory
+Local vector index over high-rated Outcome Memory snippets, so generation endpoints can
+pull the most similar past winners for a workspace into prompts and the Why This panel.
+
+  • Embeddings: signed feature hashing of words and word bigrams into a fixed-size,
+    L2-normalised float32 vector — deterministic across processes, no model download.
+  • Storage: one append-only file of (outcome id, vector) records per workspace, read
+    through a NumPy memmap; every worker on the node sees new rows without a reload.
+  • Search: exact scan for small workspaces; past IVF_MIN_ROWS an IVF index (spherical
+    k-means centroids + inverted lists, persisted as ivf.npz) probes SEMANTIC_NPROBE lists.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from typing import Optional
+
+from db import DATA_DIR
+from outcome_store import get_outcome_store
+
+try:
+    import numpy as np
+except ImportError:  # semantic recall is skipped without NumPy
+    np = None
+
+HAS_NUMPY = np is not None
+
+SEMANTIC_MEMORY_ENABLED = os.getenv("SEMANTIC_MEMORY_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_MIN_RATING = int(os.getenv("SEMANTIC_MIN_RATING", "4"))
+SEMANTIC_MIN_SIMILARITY = float(os.getenv("SEMANTIC_MIN_SIMILARITY", "0.25"))
+SEMANTIC_NPROBE = int(os.getenv("SEMANTIC_NPROBE", "8"))
+EMBED_DIM = 512
+IVF_MIN_ROWS = 2048
+IVF_MAX_LISTS = 256
+IVF_TRAIN_SAMPLE = 20000
+IVF_ITERATIONS = 10
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Embeddings
+# ──────────────────────────────────────────────────────────────────────────────
+def _features(text: str) -> list[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(text: str, dim: int = EMBED_DIM) -> "np.ndarray":
+    """Hashing-trick embedding; similar wording → high cosine similarity."""
+    vec = np.zeros(dim, dtype=np.float32)
+    for feature in _features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Per-workspace index
+# ──────────────────────────────────────────────────────────────────────────────
+class VectorIndex:
+    """Append-only memmapped vectors with an optional IVF layer for sub-linear search."""
+
+    def __init__(self, directory: str, dim: int = EMBED_DIM):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "vectors.bin")
+        self.ivf_path = os.path.join(directory, "ivf.npz")
+        self.dtype = np.dtype([("id", "<i8"), ("vec", "<f4", (dim,))])
+        self._lock = threading.Lock()
+        self._map = None
+        self._rows = 0
+        self._ivf = None  # (trained rows, centroids, row order by list, list offsets)
+
+    def create(self) -> bool:
+        """Create the vector file; False if it already exists (another worker got there first)."""
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def add(self, outcome_ids: list[int], vectors: "np.ndarray") -> None:
+        records = np.zeros(len(outcome_ids), dtype=self.dtype)
+        records["id"] = outcome_ids
+        records["vec"] = vectors
+        # O_APPEND: concurrent writers from other workers never interleave within a record
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        rows = size // self.dtype.itemsize
+        if rows != self._rows:
+            self._map = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(rows,)) if rows else None
+            self._rows = rows
+        return rows
+
+    def search(self, query: "np.ndarray", k: int) -> list[tuple[int, float]]:
+        """Top-k (outcome id, cosine similarity)."""
+        with self._lock:
+            rows = self._refresh()
+            if not rows:
+                return []
+            ivf = self._ivf_for(rows)
+            vectors = self._map["vec"]
+            if ivf is None:
+                candidates = None
+                scores = vectors @ query
+            else:
+                trained, centroids, order, offsets = ivf
+                probe = np.argsort(centroids @ query)[::-1][:SEMANTIC_NPROBE]
+                candidates = np.concatenate(
+                    [order[offsets[c]:offsets[c + 1]] for c in probe] + [np.arange(trained, rows)]
+                )
+                scores = vectors[candidates] @ query
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            ids = self._map["id"]
+            return [(int(ids[i if candidates is None else candidates[i]]), float(scores[i])) for i in top]
+
+    # ── IVF ──────────────────────────────────────────────────────────────────
+    def _ivf_for(self, rows: int):
+        if rows < IVF_MIN_ROWS:
+            return None
+        if self._ivf is None and os.path.exists(self.ivf_path):
+            self._ivf = self._load_ivf(rows)
+        # Rows appended since training are scanned exactly; retrain once they double the index
+        if self._ivf is None or rows >= 2 * self._ivf[0]:
+            self._ivf = self._train(rows)
+        return self._ivf
+
+    def _load_ivf(self, rows: int):
+        try:
+            with np.load(self.ivf_path) as data:
+                trained, centroids, assign = int(data["rows"]), data["centroids"], data["assign"]
+        except (OSError, ValueError, KeyError):
+            return None
+        if trained > rows:
+            return None
+        return self._lists(trained, centroids, assign)
+
+    def _train(self, rows: int):
+        vectors = np.asarray(self._map["vec"][:rows])
+        nlist = min(IVF_MAX_LISTS, int(np.sqrt(rows)))
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(rows, size=min(rows, IVF_TRAIN_SAMPLE), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(IVF_ITERATIONS):  # spherical k-means
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        tmp = self.ivf_path + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, rows=rows, centroids=centroids, assign=assign)
+        os.replace(tmp, self.ivf_path)
+        return self._lists(rows, centroids, assign)
+
+    @staticmethod
+    def _lists(trained: int, centroids: "np.ndarray", assign: "np.ndarray"):
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1))
+        return trained, centroids, order, offsets
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Workspace-level API
+# ──────────────────────────────────────────────────────────────────────────────
+class SemanticMemory:
+    def __init__(self, root: str = os.path.join(DATA_DIR, "semantic")):
+        self.root = root
+        self._indexes: dict[str, VectorIndex] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return SEMANTIC_MEMORY_ENABLED and HAS_NUMPY
+
+    def _index(self, workspace_id: str) -> tuple[VectorIndex, bool]:
+        """(index, backfilled) — backfilled is True when this call created it from the outcome log."""
+        with self._lock:
+            index = self._indexes.get(workspace_id)
+            if index is not None:
+                return index, False
+            directory = os.path.join(self.root, hashlib.sha1(workspace_id.encode("utf-8")).hexdigest()[:16])
+            index = VectorIndex(directory)
+            backfilled = index.create()
+            if backfilled:
+                # First use of this workspace: index everything already logged (including the caller's outcome)
+                backlog = get_outcome_store().high_rated(workspace_id, SEMANTIC_MIN_RATING)
+                if backlog:
+                    index.add([o["id"] for o in backlog], np.stack([embed(o["content_snippet"]) for o in backlog]))
+            self._indexes[workspace_id] = index
+            return index, backfilled
+
+    def index_outcome(self, workspace_id: str, outcome_id: int, snippet: Optional[str], rating: Optional[int]) -> bool:
+        """Add a logged (already committed) outcome if it is a high-rated snippet worth recalling."""
+        if not self.enabled or not snippet or rating is None or rating < SEMANTIC_MIN_RATING:
+            return False
+        index, backfilled = self._index(workspace_id)
+        if not backfilled:
+            index.add([outcome_id], embed(snippet)[None, :])
+        return True
+
+    def similar(self, workspace_id: str, text: str, k: int = 3, module: Optional[str] = None) -> list[dict]:
+        """Top-k past high-rated outcomes most similar to `text`, with their stored metadata."""
+        if not self.enabled or not text:
+            return []
+        hits = self._index(workspace_id)[0].search(embed(text), k * 4 if module else k)
+        hits = [(oid, score) for oid, score in hits if score >= SEMANTIC_MIN_SIMILARITY]
+        outcomes = get_outcome_store().get_many([oid for oid, _ in hits])
+        results = []
+        for oid, score in hits:
+            outcome = outcomes.get(oid)
+            if outcome is None or (module and outcome["module"] != module):
+                continue
+            results.append({**outcome, "similarity": round(score, 3)})
+            if len(results) == k:
+                break
+        return results
+
+
+def prompt_block(hits: list[dict]) -> str:
+    """Prompt section quoting past winners; empty when there is nothing to recall."""
+    if not hits:
+        return ""
+    lines = "\n".join(f'- "{h["content_snippet"][:300]}" (rated {h["rating"]}/5)' for h in hits)
+    return f"\nPast high-performing content from this workspace (match what worked, do not copy):\n{lines}\n"
+
+
+def why_this(hits: list[dict]) -> list[dict]:
+    """Why This panel entries for recalled outcomes."""
+    return [{
+        "rule": f"Modelled on a past {h['rating']}★ {h['module']} outcome: \"{h['content_snippet'][:80]}\"",
+        "confidence": int(h["similarity"] * 100),
+        "outcomes": 1,
+    } for h in hits]
+
+
+_semantic: Optional[SemanticMemory] = None
+
+
+def get_semantic_memory() -> SemanticMemory:
+    global _semantic
+    if _semantic is None:
+        _semantic = SemanticMemory()
+    return _semantic
@@ -0,0 +1,130 @@
+"""
+MarketMind — Simulator Session Store
+Server-held sales practice sessions: the full transcript plus a rolling summary of the
+turns that have scrolled out of the prompt window. Clients send only the new rep message;
+prompts carry the summary and the last few messages, so their size stays bounded.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from db import connect
+
+SIMULATOR_SESSIONS_DB = os.getenv("SIMULATOR_SESSIONS_DB", "simulator_sessions.db")
+SIMULATOR_SESSION_TTL_DAYS = int(os.getenv("SIMULATOR_SESSION_TTL_DAYS", "30"))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _stamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SessionStore:
+    """Sessions are scoped to a workspace; a session id from another workspace reads as missing."""
+
+    def __init__(self, path: str = SIMULATOR_SESSIONS_DB):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS simulator_sessions ("
+            " id TEXT PRIMARY KEY, workspace_id TEXT NOT NULL, persona TEXT NOT NULL, model TEXT,"
+            " summary TEXT NOT NULL DEFAULT '', summarized_upto INTEGER NOT NULL DEFAULT 0,"
+            " messages INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL, updated_at TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_simulator_sessions_updated ON simulator_sessions(updated_at);"
+            "CREATE TABLE IF NOT EXISTS simulator_messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq));"
+        )
+
+    def create(self, workspace_id: str, persona: str, model: Optional[str] = None) -> dict:
+        now = _utcnow()
+        session = {
+            "id": f"sim_{uuid.uuid4().hex[:16]}", "workspace_id": workspace_id, "persona": persona, "model": model,
+            "summary": "", "summarized_upto": 0, "messages": 0, "created_at": _stamp(now), "updated_at": _stamp(now),
+        }
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO simulator_sessions (id, workspace_id, persona, model, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (session["id"], workspace_id, persona, model, session["created_at"], session["updated_at"]),
+                )
+                self._expire(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return session
+
+    def _expire(self, now: datetime) -> None:
+        cutoff = _stamp(now - timedelta(days=SIMULATOR_SESSION_TTL_DAYS))
+        self._conn.execute(
+            "DELETE FROM simulator_messages WHERE session_id IN"
+            " (SELECT id FROM simulator_sessions WHERE updated_at < ?)", (cutoff,)
+        )
+        self._conn.execute("DELETE FROM simulator_sessions WHERE updated_at < ?", (cutoff,))
+
+    def get(self, session_id: str, workspace_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM simulator_sessions WHERE id = ? AND workspace_id = ?", (session_id, workspace_id)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def append(self, session_id: str, messages: list[dict]) -> int:
+        """Append messages ({role, content}) in order; returns the session's new message count."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._conn.execute(
+                    "SELECT messages FROM simulator_sessions WHERE id = ?", (session_id,)
+                ).fetchone()["messages"]
+                self._conn.executemany(
+                    "INSERT INTO simulator_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    [(session_id, count + i + 1, m["role"], m["content"]) for i, m in enumerate(messages)],
+                )
+                count += len(messages)
+                self._conn.execute(
+                    "UPDATE simulator_sessions SET messages = ?, updated_at = ? WHERE id = ?",
+                    (count, _stamp(_utcnow()), session_id),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def messages(self, session_id: str, after: int = 0, upto: Optional[int] = None) -> list[dict]:
+        """Messages with after < seq <= upto, oldest first."""
+        query = "SELECT seq, role, content FROM simulator_messages WHERE session_id = ? AND seq > ?"
+        params: list = [session_id, after]
+        if upto is not None:
+            query += " AND seq <= ?"
+            params.append(upto)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY seq", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> None:
+        """Record a summary covering messages 1..upto; ignored if a newer summary already landed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE simulator_sessions SET summary = ?, summarized_upto = ? WHERE id = ? AND summarized_upto < ?",
+                (summary, upto, session_id, upto),
+            )
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        _store = SessionStore()
+    return _store
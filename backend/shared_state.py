@@ -0,0 +1,269 @@
+"""
+MarketMind — Shared Counter State
+Small keyed-counter store used by the security layer. Values decay exponentially
+(half-life per call), so idle keys fade out on their own, and every backend is
+hard-bounded in size. Token buckets for rate limiting live in the same store.
+
+Backends (SHARED_STATE_BACKEND):
+  sqlite — WAL database in the data directory; every worker on the node sees the
+           same counters (local stand-in for Redis/Memcached) (default)
+  memory — per-process LRU, for single-worker dev runs and tests
+
+Request-path callers use the *_async functions, which run SQLite calls on a dedicated
+thread so a busy database never stalls the event loop. SQLite waits at most
+SHARED_STATE_BUSY_TIMEOUT_MS for a lock and then fails open (the request is not
+penalised or limited) rather than queueing behind other workers.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Protocol
+
+from db import connect
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "sqlite").lower()
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "shared_state.db")
+SHARED_STATE_MAX_KEYS = int(os.getenv("SHARED_STATE_MAX_KEYS", "100000"))  # per namespace
+SHARED_STATE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_STATE_BUSY_TIMEOUT_MS", "50"))
+DECAY_FLOOR = 0.5  # values that decay below this are treated as gone
+
+
+def decayed(value: float, updated_at: float, half_life: float, now: float) -> float:
+    if half_life <= 0 or now <= updated_at:
+        return value
+    return value * 0.5 ** ((now - updated_at) / half_life)
+
+
+def refill(tokens: float, updated_at: float, rate: float, burst: float, now: float) -> float:
+    return min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _take(tokens: float, cost: float, rate: float) -> tuple[bool, float, float]:
+    """(allowed, tokens left, seconds until `cost` tokens are available)."""
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate if rate > 0 else float("inf")
+
+
+class StateBackend(Protocol):
+    blocking: bool  # calls do I/O and belong off the event loop
+
+    def get(self, namespace: str, key: str, half_life: float) -> float: ...
+    def add(self, namespace: str, key: str, delta: float, half_life: float) -> float: ...
+    def take(self, namespace: str, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]: ...
+    def stats(self) -> dict: ...
+
+
+class MemoryStateBackend:
+    """Per-process LRU; the least recently touched key is evicted past max_keys."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int = SHARED_STATE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._data: dict[str, OrderedDict[str, tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _table(self, namespace: str) -> OrderedDict:
+        return self._data.setdefault(namespace, OrderedDict())
+
+    def get(self, namespace: str, key: str, half_life: float) -> float:
+        with self._lock:
+            item = self._table(namespace).get(key)
+        if item is None:
+            return 0.0
+        value = decayed(item[0], item[1], half_life, time.time())
+        return value if value >= DECAY_FLOOR else 0.0
+
+    def add(self, namespace: str, key: str, delta: float, half_life: float) -> float:
+        now = time.time()
+        with self._lock:
+            table = self._table(namespace)
+            value, updated_at = table.get(key, (0.0, now))
+            value = decayed(value, updated_at, half_life, now) + delta
+            table[key] = (value, now)
+            table.move_to_end(key)
+            while len(table) > self.max_keys:
+                table.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def take(self, namespace: str, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]:
+        """Token bucket: refill at `rate`/s up to `burst`, then try to spend `cost`."""
+        now = time.time()
+        with self._lock:
+            table = self._table(namespace)
+            tokens, updated_at = table.get(key, (burst, now))
+            allowed, tokens, retry_after = _take(refill(tokens, updated_at, rate, burst, now), cost, rate)
+            table[key] = (tokens, now)
+            table.move_to_end(key)
+            while len(table) > self.max_keys:
+                table.popitem(last=False)
+                self.evictions += 1
+        return allowed, tokens, retry_after
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "keys": {ns: len(t) for ns, t in self._data.items()},
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteStateBackend:
+    """Node-wide counters. Read-modify-write runs in an IMMEDIATE transaction, so increments
+    from different workers never get lost."""
+
+    blocking = True
+
+    def __init__(self, path: str = SHARED_STATE_DB, max_keys: int = SHARED_STATE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._conn = connect(path)
+        # Counters are advisory: wait briefly for a lock, then fail open
+        self._conn.execute(f"PRAGMA busy_timeout={SHARED_STATE_BUSY_TIMEOUT_MS}")
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.errors = 0
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value REAL NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key));"
+            "CREATE INDEX IF NOT EXISTS idx_counters_updated ON counters(namespace, updated_at);"
+        )
+
+    def _fail_open(self, default: Any, fn: Callable, *args) -> Any:
+        try:
+            return fn(*args)
+        except sqlite3.OperationalError as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 1000 == 0:
+                print(f"⚠️ [SHARED STATE] {e} — failing open ({self.errors} errors so far)")
+            return default
+
+    def get(self, namespace: str, key: str, half_life: float) -> float:
+        return self._fail_open(0.0, self._get, namespace, key, half_life)
+
+    def add(self, namespace: str, key: str, delta: float, half_life: float) -> float:
+        return self._fail_open(0.0, self._add, namespace, key, delta, half_life)
+
+    def take(self, namespace: str, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]:
+        return self._fail_open((True, burst, 0.0), self._take_tokens, namespace, key, cost, rate, burst)
+
+    def _get(self, namespace: str, key: str, half_life: float) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, updated_at FROM counters WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        if row is None:
+            return 0.0
+        value = decayed(row["value"], row["updated_at"], half_life, time.time())
+        return value if value >= DECAY_FLOOR else 0.0
+
+    def _add(self, namespace: str, key: str, delta: float, half_life: float) -> float:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value, updated_at FROM counters WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                value = delta + (decayed(row["value"], row["updated_at"], half_life, now) if row else 0.0)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO counters (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, value, now),
+                )
+                self._writes += 1
+                if self._writes % 256 == 0:
+                    # Anything idle for 10 half-lives has decayed below 1/1024 of its value
+                    self._evict(namespace, 10 * half_life, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return value
+
+    def _take_tokens(self, namespace: str, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]:
+        """Token bucket shared by every worker: refill at `rate`/s up to `burst`, then try to spend `cost`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value, updated_at FROM counters WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+                tokens = refill(row["value"], row["updated_at"], rate, burst, now) if row else burst
+                allowed, tokens, retry_after = _take(tokens, cost, rate)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO counters (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, tokens, now),
+                )
+                self._writes += 1
+                if self._writes % 256 == 0:
+                    # A bucket idle for burst/rate seconds is full again, same as a missing row
+                    self._evict(namespace, burst / rate if rate > 0 else 0, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed, tokens, retry_after
+
+    def _evict(self, namespace: str, idle_after: float, now: float) -> None:
+        """Drop keys idle for longer than `idle_after` seconds, then trim to the LRU bound."""
+        if idle_after > 0:
+            self._conn.execute(
+                "DELETE FROM counters WHERE namespace = ? AND updated_at < ?", (namespace, now - idle_after)
+            )
+        self._conn.execute(
+            "DELETE FROM counters WHERE namespace = ? AND key IN ("
+            " SELECT key FROM counters WHERE namespace = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (namespace, namespace, self.max_keys),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                rows = self._conn.execute("SELECT namespace, COUNT(*) AS n FROM counters GROUP BY namespace").fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+        return {"backend": "sqlite", "keys": {r["namespace"]: r["n"] for r in rows}, "errors": self.errors}
+
+
+_backend: Optional[StateBackend] = None
+
+
+def get_state_backend() -> StateBackend:
+    global _backend
+    if _backend is None:
+        _backend = MemoryStateBackend() if SHARED_STATE_BACKEND == "memory" else SQLiteStateBackend()
+    return _backend
+
+
+# One thread is enough: the SQLite backend serialises on its own lock anyway, and a dedicated
+# thread never competes with the threadpool that runs sync route handlers
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def _offload(fn: Callable, *args) -> Any:
+    global _executor
+    if not get_state_backend().blocking:
+        return fn(*args)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def get_async(namespace: str, key: str, half_life: float) -> float:
+    return await _offload(get_state_backend().get, namespace, key, half_life)
+
+
+async def add_async(namespace: str, key: str, delta: float, half_life: float) -> float:
+    return await _offload(get_state_backend().add, namespace, key, delta, half_life)
+
+
+async def take_async(namespace: str, key: str, cost: float, rate: float, burst: float) -> tuple[bool, float, float]:
+    return await _offload(get_state_backend().take, namespace, key, cost, rate, burst)
@@ -0,0 +1,113 @@
+"""
+MarketMind — Structured Output Extraction
+Pulls the trailing JSON scores block out of a free-text LLM report in linear time:
+find the last occurrence of an anchor key, step back to its opening brace and let
+json's raw_decode parse exactly one object from there — no backtracking regex over
+the whole report. Missing or malformed values fall back to per-key defaults, and
+every extractor keeps success-rate counters for /metrics.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# How far before the anchor key the opening brace may sit (whitespace, earlier keys)
+MAX_BRACE_LOOKBACK = 512
+
+# Wrappers models put around the block; removed from the report once the block is cut out
+_MARKERS_RE = re.compile(r"<MARKET_METRICS>|</MARKET_METRICS>|\[VISUALIZATION_DATA\]|```(?:json)?\s*```", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+_decoder = json.JSONDecoder()
+
+
+@dataclass
+class Extraction:
+    values: dict
+    text: str             # report with the JSON block and its markers removed
+    found: bool           # a JSON object with the anchor key was parsed
+    missing: list[str]    # keys that fell back to their default
+
+
+class ScoreExtractor:
+    """Extracts a flat {name: score} object, clamping every score to [low, high]."""
+
+    def __init__(self, name: str, defaults: dict[str, float], low: float = 1, high: float = 100):
+        self.name = name
+        self.defaults = defaults
+        self.low = low
+        self.high = high
+        self._anchors = [json.dumps(key) for key in defaults]
+        self.attempts = 0
+        self.complete = 0
+        self.partial = 0
+        self.failed = 0
+        _registry[name] = self
+
+    def _locate(self, text: str) -> Optional[tuple[int, int, dict]]:
+        """(start, end, object) of the last JSON object holding any score key."""
+        for anchor in self._anchors:
+            at = text.rfind(anchor)
+            if at < 0:
+                continue
+            low = max(0, at - MAX_BRACE_LOOKBACK)
+            # The nearest brace may sit inside an earlier string value ("uses {braces}"); step back
+            start = text.rfind("{", low, at)
+            while start >= 0:
+                try:
+                    obj, end = _decoder.raw_decode(text, start)
+                except (ValueError, RecursionError):
+                    obj, end = None, start
+                if isinstance(obj, dict) and end > at:
+                    return start, end, obj
+                start = text.rfind("{", low, start)
+        return None
+
+    def _score(self, value) -> Optional[float]:
+        # Models sometimes answer "82", "82%" or 82.0
+        if isinstance(value, str):
+            m = _NUMBER_RE.search(value)
+            value = float(m.group(0)) if m else None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        value = min(self.high, max(self.low, value))
+        return int(value) if float(value).is_integer() else value
+
+    def extract(self, text: str) -> Extraction:
+        self.attempts += 1
+        values = dict(self.defaults)
+        located = self._locate(text or "")
+        if located is None:
+            self.failed += 1
+            return Extraction(values, (text or "").strip(), False, list(self.defaults))
+
+        start, end, obj = located
+        missing = []
+        for key in self.defaults:
+            score = self._score(obj.get(key))
+            if score is None:
+                missing.append(key)
+            else:
+                values[key] = score
+        if missing:
+            self.partial += 1
+        else:
+            self.complete += 1
+        clean = _MARKERS_RE.sub("", text[:start] + text[end:]).strip()
+        return Extraction(values, clean, True, missing)
+
+    def stats(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "complete": self.complete,
+            "partial": self.partial,
+            "failed": self.failed,
+            "success_rate": round(self.complete / self.attempts, 4) if self.attempts else 0.0,
+        }
+
+
+_registry: dict[str, ScoreExtractor] = {}
+
+
+def get_structured_output_stats() -> dict:
+    return {name: extractor.stats() for name, extractor in _registry.items()}
@@ -0,0 +1,12 @@
+"""
+Test setup: stores go to a throwaway data directory and provider keys are cleared before
+any backend module is imported, so nothing touches backend/data or a live API.
+"""
+import os
+import tempfile
+
+os.environ["MARKETMIND_DATA_DIR"] = tempfile.mkdtemp(prefix="marketmind-tests-")
+os.environ["SHARED_STATE_BACKEND"] = "memory"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+for _key in ("GROQ_API_KEY", "GEMINI_API_KEY", "OPENAI_API_KEY", "SERPAPI_KEY"):
+    os.environ[_key] = ""
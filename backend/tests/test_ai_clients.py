@@ -0,0 +1,152 @@
+import asyncio
+
+import httpx
+import pytest
+
+import ai_clients
+
+
+def mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_pooled_clients_are_reused_per_provider_and_loop():
+    async def main():
+        first = ai_clients._get_http_client("groq")
+        assert ai_clients._get_http_client("groq") is first
+        assert ai_clients._get_http_client("gemini") is not first
+        await ai_clients.close_http_clients()
+        assert first.is_closed
+        return first
+
+    first = asyncio.run(main())
+
+    async def other_loop():
+        client = ai_clients._get_http_client("groq")
+        await ai_clients.close_http_clients()
+        return client
+
+    assert asyncio.run(other_loop()) is not first
+
+
+def test_groq_sdk_client_follows_the_pooled_http_client(monkeypatch):
+    monkeypatch.setattr(ai_clients, "GROQ_API_KEY", "test-key")
+
+    async def main():
+        sdk = ai_clients._get_groq()
+        assert ai_clients._get_groq() is sdk
+        await ai_clients.close_http_clients()
+        rebuilt = ai_clients._get_groq()
+        assert rebuilt is not sdk
+        assert ai_clients._groq_http_client is ai_clients._get_http_client("groq")
+        await ai_clients.close_http_clients()
+
+    asyncio.run(main())
+
+
+def test_gemini_request_parses_text_and_raises_on_errors(monkeypatch):
+    monkeypatch.setattr(ai_clients, "GEMINI_API_KEY", "test-key")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b"fail" in request.content:
+            return httpx.Response(429, json={"error": {"message": "quota"}})
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "Hi "}, {"text": "there"}]}}]})
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        ai_clients._http_clients["gemini"] = (loop, mock_client(handler))
+        try:
+            assert await ai_clients._gemini_request("hello") == "Hi there"
+            with pytest.raises(ai_clients.GeminiError) as info:
+                await ai_clients._gemini_request("please fail")
+            assert info.value.status_code == 429
+        finally:
+            await ai_clients.close_http_clients()
+
+    asyncio.run(main())
+
+
+class QuotaError(Exception):
+    status_code = 429
+
+
+def stream_of(*tokens, fail_with=None):
+    async def stream(prompt, **kwargs):
+        for token in tokens:
+            yield token
+        if fail_with is not None:
+            raise fail_with
+    return stream
+
+
+@pytest.fixture
+def router(monkeypatch):
+    fresh = ai_clients.ProviderRouter(hedge=False)
+    monkeypatch.setattr(ai_clients, "_text_router", fresh)
+    return fresh
+
+
+async def collect(stream) -> list[str]:
+    return [token async for token in stream]
+
+
+def test_stream_falls_back_before_the_first_token(monkeypatch, router):
+    monkeypatch.setattr(ai_clients, "groq_stream", stream_of(fail_with=RuntimeError("down")))
+    monkeypatch.setattr(ai_clients, "gemini_stream", stream_of("Hel", "lo"))
+    assert asyncio.run(collect(ai_clients.unified_stream("hi"))) == ["Hel", "lo"]
+    assert router.health("groq").failures == 1
+
+
+def test_stream_keeps_partial_output_when_it_breaks_mid_response(monkeypatch, router):
+    monkeypatch.setattr(ai_clients, "groq_stream", stream_of("Hel", fail_with=RuntimeError("reset")))
+    monkeypatch.setattr(ai_clients, "gemini_stream", stream_of("never"))
+    assert asyncio.run(collect(ai_clients.unified_stream("hi"))) == ["Hel"]
+
+
+def test_stream_failure_is_raised_with_the_right_wording(monkeypatch, router):
+    monkeypatch.setattr(ai_clients, "groq_stream", stream_of(fail_with=QuotaError()))
+    monkeypatch.setattr(ai_clients, "gemini_stream", stream_of(fail_with=QuotaError()))
+    with pytest.raises(ai_clients.AllProvidersFailed) as info:
+        asyncio.run(collect(ai_clients.unified_stream("hi")))
+    assert ai_clients.generation_error_message(info.value).startswith("⚠️ Multi-Model Quota Exceeded")
+
+
+def test_non_quota_stream_failures_are_not_labelled_as_quota(monkeypatch, router):
+    monkeypatch.setattr(ai_clients, "groq_stream", stream_of(fail_with=RuntimeError("GROQ_API_KEY not set")))
+    monkeypatch.setattr(ai_clients, "gemini_stream", stream_of(fail_with=RuntimeError("connect timeout")))
+    with pytest.raises(ai_clients.AllProvidersFailed) as info:
+        asyncio.run(collect(ai_clients.unified_stream("hi")))
+    message = ai_clients.generation_error_message(info.value)
+    assert message.startswith("⚠️ AI providers unavailable") and "GROQ_API_KEY not set" in message
+
+
+def test_stream_with_every_circuit_open_raises(monkeypatch, router):
+    for name in ("groq", "gemini"):
+        router.health(name).record_failure(QuotaError())
+    with pytest.raises(ai_clients.AllProvidersFailed) as info:
+        asyncio.run(collect(ai_clients.unified_stream("hi")))
+    assert set(info.value.errors) == {"groq", "gemini"}
+    assert "circuit open" in ai_clients.generation_error_message(info.value)
+
+
+def test_image_cascade_accepts_any_http_url_and_skips_paid_fallbacks(monkeypatch):
+    calls = []
+
+    def provider(name, url):
+        async def fn(prompt):
+            calls.append(name)
+            return url
+        fn.__name__ = name
+        return ai_clients._acceptable(fn)
+
+    monkeypatch.setattr(ai_clients, "IMAGE_CASCADE_MODE", "race")
+    monkeypatch.setattr(ai_clients, "_image_router", ai_clients.ProviderRouter(hedge=False))
+    monkeypatch.setattr(ai_clients, "IMAGE_PROVIDERS", [
+        ("flux", provider("flux", None)),
+        ("pollinations", provider("pollinations", "https://image.pollinations.ai/prompt/Error%20monitoring")),
+        ("dalle", provider("dalle", "https://paid.example/img.png")),
+        ("placeholder", provider("placeholder", "https://api.dicebear.com/x.png")),
+    ])
+    url = asyncio.run(ai_clients._image_cascade("Error monitoring SaaS"))
+    assert url == "https://image.pollinations.ai/prompt/Error%20monitoring"
+    assert "dalle" not in calls
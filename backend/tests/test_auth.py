@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+import auth
+from auth import _BcryptPool, authenticate_user, register_user
+from user_store import SQLiteUserRepository
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = _BcryptPool(workers=2, max_pending=2)
+    monkeypatch.setattr(auth, "_bcrypt_pool", pool)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    repo = SQLiteUserRepository(str(tmp_path / "users.db"))
+    monkeypatch.setattr(auth, "get_user_repository", lambda: repo)
+    return repo
+
+
+def test_pool_rejects_past_max_pending(pool):
+    release = threading.Event()
+
+    async def main():
+        jobs = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*jobs)
+        return exc.value
+
+    exc = asyncio.run(main())
+    assert exc.status_code == 429
+    assert exc.headers["Retry-After"] == "1"
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["completed"] == 2
+    assert pool.pending == 0
+
+
+def test_abandoned_jobs_count_until_they_finish(pool):
+    release = threading.Event()
+
+    async def main():
+        job = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        job.cancel()  # the client went away; the hash is still running
+        await asyncio.gather(job, return_exceptions=True)
+        assert pool.pending == 1
+        release.set()
+
+    asyncio.run(main())
+    pool._executor.shutdown(wait=True)  # joins the worker, so the job's done-callback has run
+    assert pool.pending == 0
+    assert pool.stats()["completed"] == 1
+
+
+def test_login_upgrades_hashes_made_with_another_cost(pool, repo, monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+    asyncio.run(register_user("Ada@Example.com", "s3cret-pass", "Ada"))
+    assert repo.get("ada@example.com")["hashed_password"].startswith("$2b$04$")
+
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    assert asyncio.run(authenticate_user("ada@example.com", "wrong")) is None
+    assert repo.get("ada@example.com")["hashed_password"].startswith("$2b$04$")
+    assert asyncio.run(authenticate_user("ada@example.com", "s3cret-pass"))["email"] == "ada@example.com"
+    stored = repo.get("ada@example.com")["hashed_password"]
+    assert stored.startswith("$2b$05$")
+    assert bcrypt.checkpw(b"s3cret-pass", stored.encode())
+
+
+def test_rehash_is_skipped_when_the_pool_is_busy(pool, repo, monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 4)
+    asyncio.run(register_user("ada@example.com", "s3cret-pass", "Ada"))
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+
+    run = pool.run
+
+    async def busy_after_verify(fn, *args):
+        if fn is auth._hash_password:
+            raise HTTPException(status_code=429, detail="busy")
+        return await run(fn, *args)
+
+    monkeypatch.setattr(pool, "run", busy_after_verify)
+    assert asyncio.run(authenticate_user("ada@example.com", "s3cret-pass")) is not None
+    assert repo.get("ada@example.com")["hashed_password"].startswith("$2b$04$")
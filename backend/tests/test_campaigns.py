@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.campaigns as campaigns
+from auth import get_current_user
+
+POLLINATIONS_URL = "https://image.pollinations.ai/prompt/error%20free%20onboarding?width=1024"
+
+
+class _NoMemory:
+    def similar(self, *args):
+        return []
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(campaigns, "get_semantic_memory", lambda: _NoMemory())
+    app = FastAPI()
+    app.include_router(campaigns.router)
+    app.dependency_overrides[get_current_user] = lambda: {"workspace_id": "ws"}
+    return TestClient(app)
+
+
+def _stub(monkeypatch, text, image):
+    async def generate(prompt, model_name=None):
+        return text
+
+    async def flux(prompt):
+        return image
+
+    monkeypatch.setattr(campaigns, "unified_generate", generate)
+    monkeypatch.setattr(campaigns, "flux_generate", flux)
+
+
+def _generate(client):
+    return client.post("/campaigns/generate", json={"product_description": "Error-free onboarding for SaaS"})
+
+
+def test_text_and_image_stages_run_concurrently(client, monkeypatch):
+    started = []
+    both_started = asyncio.Event()
+
+    async def stage(name, value):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=2)
+        return value
+
+    monkeypatch.setattr(campaigns, "unified_generate", lambda prompt, model_name=None: stage("content", "## Campaign"))
+    monkeypatch.setattr(campaigns, "flux_generate", lambda prompt: stage("image", POLLINATIONS_URL))
+    body = _generate(client).json()
+    assert body["status"] == "complete"
+    assert body["content"] == "## Campaign"
+    assert set(body["timings_ms"]) == {"content", "image"}
+
+
+def test_image_url_is_kept_even_when_the_prompt_mentions_error(client, monkeypatch):
+    _stub(monkeypatch, "## Campaign", POLLINATIONS_URL)
+    body = _generate(client).json()
+    assert body["status"] == "complete"
+    assert body["image_url"] == POLLINATIONS_URL
+
+
+@pytest.mark.parametrize("image", [None, "", "Image generation error: quota", "data:image/png;base64,AAAA"])
+def test_non_url_image_is_a_failed_stage(client, monkeypatch, image):
+    _stub(monkeypatch, "## Campaign", image)
+    body = _generate(client).json()
+    assert body["status"] == "partial"
+    assert body["image_url"] is None
+    assert body["content"] == "## Campaign"
+    assert "image" in body["stage_errors"]
+
+
+def test_provider_failure_text_is_a_failed_stage(client, monkeypatch):
+    _stub(monkeypatch, "⚠️ All AI providers are currently unavailable.", POLLINATIONS_URL)
+    body = _generate(client).json()
+    assert body["status"] == "partial"
+    assert body["content"] is None
+    assert body["image_url"] == POLLINATIONS_URL
+    assert "content" in body["stage_errors"]
+
+
+def test_all_stages_failing_is_a_server_error(client, monkeypatch):
+    _stub(monkeypatch, "⚠️ All AI providers are currently unavailable.", None)
+    assert _generate(client).status_code == 500
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import routers.competitor as competitor
+from grounding import Grounding
+from report_store import CompetitorReportStore
+
+CONTEXT = ("General Brand Context", "", "N/A")
+SCORES = {"Product Quality": 80, "Market Share": 30, "Customer Satisfaction": 75, "Innovation Rate": 65}
+
+
+def report(tag: str, sections=competitor.REPORT_SECTIONS) -> str:
+    body = "\n\n".join(f"## {name}\n{name} text ({tag})" for name in sections)
+    return f"{body}\n\n{json.dumps(SCORES)}"
+
+
+def results(*snippets: str) -> list[dict]:
+    return [{"title": s, "snippet": s, "link": f"https://example.com/{s}"} for s in snippets]
+
+
+class Harness:
+    def __init__(self, monkeypatch, tmp_path):
+        self.store = CompetitorReportStore(str(tmp_path / "reports.db"))
+        self.grounding = Grounding({facet: results(facet) for facet in ("market", "pricing", "reviews", "news")})
+        self.replies: list[str] = []
+        self.prompts: list[str] = []
+        monkeypatch.setattr(competitor, "get_report_store", lambda: self.store)
+        monkeypatch.setattr(competitor, "ground", self._ground)
+        monkeypatch.setattr(competitor, "unified_generate", self._generate)
+
+    async def _ground(self, facets, limit=None):
+        return self.grounding
+
+    async def _generate(self, prompt, model_name=None):
+        self.prompts.append(prompt)
+        return self.replies.pop(0)
+
+    def run(self, **kwargs) -> dict:
+        return asyncio.run(competitor.run_analysis("Acme", CONTEXT, **kwargs))
+
+
+@pytest.fixture
+def harness(monkeypatch, tmp_path):
+    return Harness(monkeypatch, tmp_path)
+
+
+def test_unchanged_grounding_reuses_the_report(harness):
+    harness.replies = [report("v1")]
+    first = harness.run()
+    assert first["delta"]["mode"] == "full"
+    assert first["metrics"] == SCORES
+
+    second = harness.run()
+    assert second["delta"] == {"mode": "unchanged", "changed_facets": [], "regenerated_sections": []}
+    assert second["content"] == first["content"]
+    assert second["generated_at"] == first["generated_at"]
+    assert len(harness.prompts) == 1
+
+
+def test_changed_facet_regenerates_only_its_sections(harness):
+    harness.replies = [report("v1")]
+    harness.run()
+
+    harness.grounding.sections["pricing"] = results("price cut")
+    affected = [name for name, facets in competitor.REPORT_SECTIONS.items() if "pricing" in facets]
+    harness.replies = [report("v2", affected)]
+    second = harness.run()
+    assert second["delta"]["mode"] == "partial"
+    assert second["delta"]["changed_facets"] == ["pricing"]
+    assert second["delta"]["regenerated_sections"] == affected
+    assert "Strategic Comparison text (v1)" in second["content"]
+    assert "Pricing & Positioning Loopholes text (v2)" in second["content"]
+
+
+def test_changed_facet_without_a_matching_heading_regenerates_in_full(harness):
+    harness.replies = [report("v1").replace("## ", "### ")]
+    harness.run()
+
+    harness.grounding.sections["pricing"] = results("price cut")
+    harness.replies = [report("v2")]
+    second = harness.run()
+    assert second["delta"]["mode"] == "full"
+    assert second["delta"]["changed_facets"] == ["pricing"]
+    assert "Strategic Comparison text (v2)" in second["content"]
+
+    assert harness.run()["delta"]["mode"] == "unchanged"
+    assert len(harness.prompts) == 2
+
+
+def test_failed_partial_generation_keeps_the_previous_report(harness):
+    harness.replies = [report("v1")]
+    first = harness.run()
+    harness.grounding.sections["news"] = results("launch")
+    harness.replies = ["⚠️ AI providers unavailable: groq: down"]
+    second = harness.run()
+    assert second["delta"]["mode"] == "unchanged"
+    assert second["content"] == first["content"]
+
+
+def test_failed_full_generation_raises(harness):
+    harness.replies = ["⚠️ AI providers unavailable: groq: down"]
+    with pytest.raises(HTTPException) as info:
+        harness.run()
+    assert info.value.status_code == 502
+    assert harness.store.get("default", "Acme") is None
+
+
+def test_without_grounding_every_run_is_full(harness):
+    harness.grounding = Grounding()
+    harness.replies = [report("v1"), report("v2")]
+    assert harness.run()["delta"]["mode"] == "full"
+    second = harness.run()
+    assert second["delta"]["mode"] == "full"
+    assert "(v2)" in second["content"]
+
+
+def test_failed_search_keeps_the_last_snapshot(harness):
+    harness.replies = [report("v1")]
+    harness.run()
+    harness.grounding = Grounding({"market": [], "pricing": results("pricing"), "reviews": results("reviews"),
+                                   "news": results("news")}, errors={"market": "timeout"})
+    assert harness.run()["delta"]["mode"] == "unchanged"
+
+
+def test_stale_or_forced_runs_regenerate_in_full(harness, monkeypatch):
+    harness.replies = [report("v1"), report("v2"), report("v3")]
+    harness.run()
+    assert harness.run(force_refresh=True)["delta"]["mode"] == "full"
+    monkeypatch.setattr(competitor, "COMPETITOR_REPORT_MAX_AGE_DAYS", -1)
+    assert harness.run()["delta"]["mode"] == "full"
@@ -0,0 +1,64 @@
+import importlib
+
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+
+import encryption
+
+OLD_KEY = "fernet:" + Fernet.generate_key().decode()
+NEW_KEY = "fernet:" + Fernet.generate_key().decode()
+
+
+@pytest.fixture
+def secrets(monkeypatch):
+    """Swap the configured secret list (newest first) and drop the cached MultiFernet."""
+    def use(*values):
+        monkeypatch.setattr(encryption, "_SECRETS", list(values))
+        encryption._get_fernet.cache_clear()
+    yield use
+    encryption._get_fernet.cache_clear()
+
+
+def test_import_derives_no_keys(monkeypatch):
+    monkeypatch.setenv("ENCRYPTION_SECRETS", "")
+    module = importlib.reload(encryption)
+    assert module._derive_key.cache_info().currsize == 0
+    assert module._get_fernet.cache_info().currsize == 0
+    assert module.decrypt(module.encrypt("ada@example.com")) == "ada@example.com"
+    assert module._derive_key.cache_info().currsize == 1
+
+
+def test_round_trip_and_empty_values(secrets):
+    secrets(NEW_KEY)
+    token = encryption.encrypt("+44 20 7946 0000")
+    assert token != "+44 20 7946 0000"
+    assert encryption.decrypt(token) == "+44 20 7946 0000"
+    assert encryption.encrypt("") == "" and encryption.decrypt("") == ""
+    assert encryption.encrypt(None) is None
+
+
+def test_rotation_keeps_old_data_readable_and_rewrites_it(secrets):
+    secrets(OLD_KEY)
+    old = encryption.encrypt("ada@example.com")
+
+    secrets(NEW_KEY, OLD_KEY)
+    assert encryption.decrypt(old) == "ada@example.com"
+    rotated = encryption.rotate(old)
+
+    secrets(NEW_KEY)
+    assert encryption.decrypt(rotated) == "ada@example.com"
+    with pytest.raises(InvalidToken):
+        encryption.decrypt(old)
+
+
+def test_bulk_helpers_match_single_calls(secrets):
+    secrets(OLD_KEY)
+    values = ["ada@example.com", None, "", "Ada Lovelace"]
+    encrypted = encryption.encrypt_many(values)
+    assert encrypted[1] is None and encrypted[2] == ""
+    assert encryption.decrypt_many(encrypted) == values
+
+    secrets(NEW_KEY, OLD_KEY)
+    rotated = encryption.rotate_many(encrypted)
+    secrets(NEW_KEY)
+    assert encryption.decrypt_many(rotated) == values
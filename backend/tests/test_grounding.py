@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+import grounding
+from grounding import Grounding, SearchError, competitor_facets, ground, search
+from response_cache import MemoryCache, ResponseCache
+
+
+class _Response:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class _SerpApi:
+    """Fake pooled HTTP client: records queries and answers after a short delay."""
+
+    def __init__(self, fail: tuple[str, ...] = ()):
+        self.queries: list[str] = []
+        self.fail = fail
+
+    async def get(self, url, params):
+        self.queries.append(params["q"])
+        link = f"https://example.com/{len(self.queries)}"
+        await asyncio.sleep(0.01)
+        if any(word in params["q"] for word in self.fail):
+            return _Response(500, {})
+        return _Response(200, {"organic_results": [
+            {"title": params["q"], "snippet": f"About {params['q']}", "link": link},
+        ]})
+
+
+@pytest.fixture
+def serpapi(monkeypatch):
+    api = _SerpApi()
+    monkeypatch.setattr(grounding, "SERPAPI_KEY", "test-key")
+    monkeypatch.setattr(grounding, "_get_http_client", lambda name: api)
+    monkeypatch.setattr(grounding, "_cache", ResponseCache(MemoryCache()))
+    return api
+
+
+def test_original_query_goes_upstream_and_the_cache_key_is_folded(serpapi):
+    first = asyncio.run(search("  Apple   iOS pricing "))
+    second = asyncio.run(search("apple ios PRICING"))
+    assert serpapi.queries == ["Apple iOS pricing"]
+    assert first == second
+
+
+def test_identical_lookups_in_flight_share_one_call(serpapi):
+    async def main():
+        return await asyncio.gather(*(search("HubSpot pricing") for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert serpapi.queries == ["HubSpot pricing"]
+    assert all(r == results[0] for r in results)
+
+
+def test_failures_are_not_cached(serpapi):
+    serpapi.fail = ("news",)
+    with pytest.raises(SearchError) as exc:
+        asyncio.run(search("HubSpot news"))
+    assert exc.value.status_code == 500
+    serpapi.fail = ()
+    assert asyncio.run(search("HubSpot news"))
+    assert serpapi.queries == ["HubSpot news", "HubSpot news"]
+
+
+def test_ground_reports_failed_facets_without_failing(serpapi):
+    serpapi.fail = ("reviews",)
+    result = asyncio.run(ground(competitor_facets("HubSpot")))
+    assert list(result.sections) == list(competitor_facets("HubSpot"))
+    assert set(result.errors) == {"reviews"}
+    assert result.sections["reviews"] == []
+    assert result.live
+    assert "reviews" not in result.fingerprints()
+    assert "[PRICING]" in result.text() and "[REVIEWS]" not in result.text()
+
+
+def test_without_a_key_grounding_falls_back_to_trained_knowledge(monkeypatch):
+    monkeypatch.setattr(grounding, "SERPAPI_KEY", "")
+    with pytest.raises(SearchError):
+        asyncio.run(search("HubSpot"))
+    result = asyncio.run(ground({"market": "HubSpot"}))
+    assert not result.live
+    assert result.text() == grounding.NO_GROUNDING_NOTE
+
+
+def test_facets_follow_configuration(monkeypatch):
+    monkeypatch.setattr(grounding, "GROUNDING_FACETS", ["pricing", "news"])
+    assert competitor_facets("HubSpot") == {"pricing": "HubSpot pricing plans", "news": "HubSpot news"}
+    monkeypatch.setattr(grounding, "GROUNDING_FACETS", ["unknown"])
+    assert list(competitor_facets("HubSpot", "MarketMind")) == ["market"]
+    assert "HubSpot vs MarketMind" in competitor_facets("HubSpot", "MarketMind")["market"]
+
+
+def test_fingerprints_ignore_order_and_text_dedupes_links(monkeypatch):
+    monkeypatch.setattr(grounding, "SERPAPI_KEY", "test-key")
+    a = {"link": "https://a.example", "snippet": "Plans from $20"}
+    b = {"link": "https://b.example", "snippet": "New CEO appointed"}
+    one = Grounding(sections={"pricing": [a, b], "news": [b]})
+    two = Grounding(sections={"pricing": [b, a], "news": [b]})
+    assert one.fingerprints() == two.fingerprints()
+    assert one.fingerprints()["pricing"] != one.fingerprints()["news"]
+
+    text = one.text()
+    assert text.count("https://b.example") == 1
+    assert one.text({"news"}).startswith("[NEWS]")
@@ -0,0 +1,94 @@
+import csv
+import io
+import random
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import lead_scoring
+from lead_scoring import LeadFrame, compute_lead_score, score_frame
+
+ROLES = ["CEO", "Co-Founder", "VP Marketing", "Growth Lead", "Engineer", "", "Head of Sales", "Managing Director"]
+
+
+def _baseline(row: dict):
+    try:
+        return compute_lead_score(row)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _assert_matches_baseline(rows: list[dict]):
+    scored = score_frame(LeadFrame.from_rows(rows))
+    for i, row in enumerate(rows):
+        expected = _baseline(row)
+        if expected is None:
+            assert not scored.valid[i], row
+        else:
+            assert scored.valid[i], row
+            assert scored.result(i) == expected, row
+
+
+def test_random_rows_match_row_by_row_scoring():
+    rng = random.Random(7)
+    rows = [
+        {
+            "email_opens": rng.choice([rng.randint(0, 40), str(rng.randint(0, 40)), None, ""]),
+            "page_visits": rng.randint(0, 60),
+            "company_size": rng.choice([rng.randint(0, 5000), str(rng.randint(0, 5000))]),
+            "role": rng.choice(ROLES),
+        }
+        for _ in range(2000)
+    ]
+    _assert_matches_baseline(rows)
+
+
+def test_edge_cells_match_row_by_row_scoring():
+    rows = [
+        {"email_opens": "99999999999999999999", "page_visits": 3, "company_size": 50, "role": "CEO"},
+        {"email_opens": 1, "page_visits": -99999999999999999999, "company_size": "10" * 15, "role": "cmo"},
+        {"email_opens": "-5", "page_visits": 0, "company_size": 0, "role": "sales"},
+        {"email_opens": "abc", "page_visits": 1, "company_size": 1, "role": "founder"},
+        {"email_opens": "2.5", "page_visits": 1, "company_size": 1, "role": ""},
+        {},
+    ]
+    _assert_matches_baseline(rows)
+
+
+def test_tier_counts_skip_invalid_rows():
+    rows = [{"email_opens": 30, "page_visits": 30, "company_size": 100, "role": "CEO"}, {"email_opens": "x"}]
+    counts = score_frame(LeadFrame.from_rows(rows)).tier_counts()
+    assert sum(counts.values()) == 1
+
+
+class _BrokenPool:
+    """Stands in for a ProcessPoolExecutor whose worker was killed."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_discarded_and_the_file_scored_in_process(monkeypatch):
+    rows = "".join(f"lead{i},{ROLES[i % len(ROLES)]},{i % 9},{i % 30},{i % 700}\n" for i in range(300))
+    data = ("name,role,email_opens,page_visits,company_size\n" + rows).encode()
+    broken = _BrokenPool()
+    monkeypatch.setattr(lead_scoring, "_pool", broken)
+
+    shards = list(lead_scoring.score_file_parallel(io.BytesIO(data), top_k=5, shard_bytes=512))
+    assert broken.shut_down
+    assert lead_scoring._pool is None
+    assert sum(s.total + s.invalid for s in shards) == 300
+
+    expected = score_frame(LeadFrame.from_rows(list(csv.DictReader(io.StringIO(data.decode())))))
+    assert sum(s.tiers["Hot"] for s in shards) == expected.tier_counts()["Hot"]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.leads as leads
+from auth import get_current_user
+from lead_scoring import CSVChunker, split_complete_records
+
+CSV = (
+    'name,role,notes\n'
+    'Ada,CEO,"met at the summit\nwants a demo, next week"\n'
+    'Bo,"Head of ""Growth""",plain\n'
+    'Cy,Engineer,"three\nline\nnote"\n'
+)
+EXPECTED = [
+    {"name": "Ada", "role": "CEO", "notes": "met at the summit\nwants a demo, next week"},
+    {"name": "Bo", "role": 'Head of "Growth"', "notes": "plain"},
+    {"name": "Cy", "role": "Engineer", "notes": "three\nline\nnote"},
+]
+
+
+def _chunked(data: bytes, size: int) -> list[dict]:
+    chunker = CSVChunker(chunk_rows=2)
+    rows = []
+    for i in range(0, len(data), size):
+        for batch in chunker.feed(data[i:i + size]):
+            rows.extend(batch)
+    for batch in chunker.close():
+        rows.extend(batch)
+    return rows
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 1 << 16])
+def test_chunker_keeps_quoted_multiline_records_whole(size):
+    assert _chunked(CSV.encode(), size) == EXPECTED
+
+
+def test_split_complete_records_never_cuts_inside_quotes():
+    text = 'a,b\n1,"open\nstill open'
+    assert split_complete_records(text) == len("a,b\n")
+    assert split_complete_records(text.encode()) == len("a,b\n")
+    assert split_complete_records('1,"x\ny"\n2,z') == len('1,"x\ny"\n')
+
+
+def _leads_csv(rows: int) -> bytes:
+    return ("name,role,email_opens,page_visits,company_size\n"
+            + "".join(f"lead{i},CEO,{i % 9},{i % 30},{i % 700}\n" for i in range(rows))).encode()
+
+
+def _multipart(data: bytes) -> tuple[bytes, str]:
+    boundary = "leadsboundary"
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"leads.csv\"\r\n"
+            f"Content-Type: text/csv\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.include_router(leads.router)
+    app.dependency_overrides[get_current_user] = lambda: {"workspace_id": "ws"}
+    return app
+
+
+def _summary(text: str) -> dict:
+    lines = [json.loads(line) for line in text.splitlines()]
+    assert "summary" in lines[-1]
+    assert all("score" in lead for lead in lines[:-1])
+    return lines[-1]["summary"]
+
+
+def test_stream_scores_raw_and_multipart_bodies(app):
+    client = TestClient(app)
+    data = _leads_csv(50)
+    raw = client.post("/leads/score-batch/stream", content=data, headers={"content-type": "text/csv"})
+    body, content_type = _multipart(data)
+    upload = client.post("/leads/score-batch/stream", content=body, headers={"content-type": content_type})
+    assert raw.status_code == upload.status_code == 200
+    assert _summary(raw.text)["total"] == _summary(upload.text)["total"] == 50
+
+
+def _run(app, body_messages: list[dict], content_type: str) -> list[dict]:
+    """Drive the ASGI app directly: deliver `body_messages`, then report the client as gone."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/leads/score-batch/stream", "raw_path": b"/leads/score-batch/stream",
+        "query_string": b"", "root_path": "", "client": ("test", 1), "server": ("test", 80),
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    pending = list(body_messages)
+    sent = []
+
+    async def receive():
+        if pending:
+            return pending.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), timeout=10))
+    return sent
+
+
+def _sent_body(sent: list[dict]) -> bytes:
+    return b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+def test_disconnect_stops_scoring_a_spooled_upload(app, monkeypatch):
+    monkeypatch.setattr(leads, "BATCH_READ_BYTES", 256)
+    calls = []
+    score_rows = leads.score_rows
+    monkeypatch.setattr(leads, "score_rows", lambda rows, acc, materialize=True: calls.append(len(rows)) or score_rows(rows, acc, materialize))
+
+    body, content_type = _multipart(_leads_csv(5000))
+    sent = _run(app, [{"type": "http.request", "body": body, "more_body": False}], content_type)
+    assert b"summary" not in _sent_body(sent)
+    assert sum(calls) < 5000
+
+
+def test_disconnect_mid_body_ends_the_stream_cleanly(app):
+    data = _leads_csv(100)
+    sent = _run(app, [{"type": "http.request", "body": data[:len(data) // 2], "more_body": True}], "text/csv")
+    assert sent[0]["status"] == 200
+    assert b"summary" not in _sent_body(sent)
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.outcome_memory as outcome_memory
+from auth import get_current_user
+from outcome_store import RULE_MIN_OUTCOMES, OutcomeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OutcomeStore(str(tmp_path / "outcomes.db"))
+
+
+def test_counters_track_each_module_action_pair(store):
+    for _ in range(3):
+        store.log("ws", "campaigns", "posted_as_is", "copy", "clicks", 5)
+    store.log("ws", "pitch", "edited")
+    store.log("other", "campaigns", "posted_as_is")
+
+    counters = {(c["module"], c["action_type"]): c for c in store.counters("ws")}
+    assert counters[("campaigns", "posted_as_is")]["count"] == 3
+    assert counters[("pitch", "edited")]["count"] == 1
+    assert counters[("pitch", "edited")]["rule_since"] is None
+    assert counters[("campaigns", "posted_as_is")]["rule_since"] is not None
+    assert [c["action_type"] for c in store.counters("ws", min_count=RULE_MIN_OUTCOMES)] == ["posted_as_is"]
+    assert store.total("ws") == 4
+    assert store.total("other") == 1
+    assert store.total("nobody") == 0
+
+
+def test_rule_since_is_the_time_the_threshold_was_crossed(store):
+    logged = [store.log("ws", "campaigns", "shared")["logged_at"] for _ in range(RULE_MIN_OUTCOMES + 2)]
+    (counter,) = store.counters("ws")
+    assert counter["rule_since"] == logged[RULE_MIN_OUTCOMES - 1]
+
+
+def test_outcomes_survive_a_restart(tmp_path):
+    path = str(tmp_path / "outcomes.db")
+    first = OutcomeStore(path)
+    first.log("ws", "campaigns", "shared", "Spring launch copy", rating=5)
+    first.log("ws", "campaigns", "shared")
+
+    reopened = OutcomeStore(path)
+    assert reopened.total("ws") == 2
+    assert reopened.counters("ws")[0]["count"] == 2
+    assert reopened.high_rated("ws", 4)[0]["content_snippet"] == "Spring launch copy"
+
+
+def test_recent_is_newest_first_and_filters_by_module(store):
+    ids = [store.log("ws", module, "shared")["id"] for module in ("campaigns", "pitch", "campaigns")]
+    assert [o["id"] for o in store.recent("ws")] == ids[::-1]
+    assert [o["id"] for o in store.recent("ws", module="campaigns", limit=1)] == [ids[2]]
+    assert set(store.get_many(ids[:2])) == set(ids[:2])
+
+
+class _NoIndex:
+    def index_outcome(self, *args):
+        return False
+
+
+def test_rules_follow_new_logs(store, monkeypatch):
+    monkeypatch.setattr(outcome_memory, "get_outcome_store", lambda: store)
+    monkeypatch.setattr(outcome_memory, "get_semantic_memory", lambda: _NoIndex())
+    monkeypatch.setattr(outcome_memory, "_rules_cache", {})
+    app = FastAPI()
+    app.include_router(outcome_memory.router)
+    app.dependency_overrides[get_current_user] = lambda: {"workspace_id": "ws"}
+    client = TestClient(app)
+
+    assert client.get("/memory/status").json()["status"] == "empty"
+    entry = {"module": "campaigns", "action_type": "posted_as_is"}
+    assert client.post("/memory/log", json=entry).json()["rule_count"] == 0
+    assert client.get("/memory/rules").json()["status"] == "learning"
+
+    for _ in range(RULE_MIN_OUTCOMES):
+        client.post("/memory/log", json=entry)
+    body = client.get("/memory/rules").json()
+    assert body["total_outcomes"] == RULE_MIN_OUTCOMES + 1
+    assert body["rules"][0]["outcomes"] == RULE_MIN_OUTCOMES + 1
+    assert body["rules"][0]["module"] == "campaigns"
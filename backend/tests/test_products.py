@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.products as products
+from auth import get_current_user
+from product_store import SQLiteProductRepository, new_product_id
+
+
+def product(name: str, workspace_id: str = "ws", product_id=None) -> dict:
+    return {"id": product_id or new_product_id(), "name": name, "description": f"{name} description",
+            "category": "SaaS", "price": 10.0, "sales_volume": 1, "workspace_id": workspace_id}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return SQLiteProductRepository(str(tmp_path / "products.db"))
+
+
+@pytest.fixture
+def client(repo, monkeypatch):
+    monkeypatch.setattr(products, "get_product_repository", lambda: repo)
+    app = FastAPI()
+    app.include_router(products.router)
+    app.dependency_overrides[get_current_user] = lambda: {"workspace_id": "ws"}
+    return TestClient(app)
+
+
+def test_ids_are_full_uuids():
+    ids = {new_product_id() for _ in range(10_000)}
+    assert len(ids) == 10_000
+    assert all(len(i) == len("prod_") + 32 for i in ids)
+
+
+def test_keyset_paging_walks_the_workspace_in_order(repo):
+    repo.add_many([product(f"p{i}") for i in range(5)] + [product("other", "elsewhere")])
+    page, cursor = repo.list("ws", limit=2)
+    names = [p["name"] for p in page]
+    while cursor is not None:
+        page, cursor = repo.list("ws", limit=2, after=cursor)
+        names += [p["name"] for p in page]
+    assert names == [f"p{i}" for i in range(5)]
+    assert repo.count("ws") == 5
+    assert [p["name"] for p in repo.list("ws", limit=None)[0]] == names
+
+
+def test_bulk_insert_is_all_or_nothing(repo):
+    repo.add_many([product("first", product_id="prod_dup")])
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.add_many([product("second"), product("clash", product_id="prod_dup")])
+    assert [p["name"] for p in repo.list("ws", limit=None)[0]] == ["first"]
+
+
+def test_products_are_scoped_to_their_workspace(repo):
+    repo.add_many([product("mine", product_id="prod_mine")])
+    assert repo.get("prod_mine", "ws")["name"] == "mine"
+    assert repo.get("prod_mine", "elsewhere") is None
+    assert not repo.delete("prod_mine", "elsewhere")
+    assert repo.delete("prod_mine", "ws")
+
+
+def test_listing_without_a_limit_returns_the_whole_catalog(client):
+    r = client.post("/products/bulk", json={"products": [
+        {"name": f"p{i}", "description": "d", "category": "SaaS", "price": 1, "sales_volume": 1} for i in range(150)
+    ]})
+    assert r.json()["imported"] == 150
+    r = client.get("/products/")
+    assert len(r.json()) == 150
+    assert "X-Next-Cursor" not in r.headers
+
+    r = client.get("/products/", params={"limit": 100})
+    assert len(r.json()) == 100
+    assert r.headers["X-Total-Count"] == "150"
+    rest = client.get("/products/", params={"limit": 100, "after": r.headers["X-Next-Cursor"]})
+    assert len(rest.json()) == 50 and "X-Next-Cursor" not in rest.headers
@@ -0,0 +1,201 @@
+import asyncio
+
+import pytest
+
+import provider_router
+from provider_router import (
+    CLOSED, HALF_OPEN, OPEN, AllProvidersFailed, CircuitOpen, ProviderHealth, ProviderRouter, provider_budget,
+)
+
+
+class QuotaError(Exception):
+    status_code = 429
+
+
+def ok(value="ok", delay=0.0):
+    async def fn():
+        await asyncio.sleep(delay)
+        return value
+    return fn
+
+
+def boom(exc=None):
+    async def fn():
+        raise exc or RuntimeError("down")
+    return fn
+
+
+def expire_cooldown(health: ProviderHealth) -> None:
+    health.open_until = 0.0
+
+
+def test_breaker_opens_after_threshold_failures():
+    health = ProviderHealth("groq")
+    for _ in range(provider_router.BREAKER_FAILURE_THRESHOLD - 1):
+        health.record_failure(RuntimeError("x"))
+    assert health.state == CLOSED
+    health.record_failure(RuntimeError("x"))
+    assert health.state == OPEN
+    assert not health.available()
+
+
+def test_quota_error_opens_immediately():
+    health = ProviderHealth("groq")
+    health.record_failure(QuotaError())
+    assert health.state == OPEN
+    assert health.quota_errors == 1
+
+
+def test_half_open_admits_exactly_one_probe():
+    health = ProviderHealth("groq")
+    health.record_failure(QuotaError())
+    expire_cooldown(health)
+    assert health.available()
+    assert health.acquire()
+    assert health.state == HALF_OPEN
+    assert not health.available()
+    assert not health.acquire()
+    health.record_success(0.1)
+    assert health.state == CLOSED
+    assert health.acquire() and health.acquire()
+
+
+def test_failed_probe_reopens_the_breaker():
+    health = ProviderHealth("groq")
+    health.record_failure(QuotaError())
+    expire_cooldown(health)
+    assert health.acquire()
+    health.record_failure(RuntimeError("still down"))
+    assert health.state == OPEN
+    assert not health.probe_in_flight
+
+
+def test_call_falls_back_and_skips_open_providers():
+    async def main():
+        router = ProviderRouter(hedge=False)
+        assert await router.call([("groq", boom()), ("gemini", ok("g"))]) == ("gemini", "g")
+        router.health("groq").record_failure(QuotaError())
+        calls = []
+
+        async def tracked():
+            calls.append("groq")
+            return "never"
+
+        assert await router.call([("groq", tracked), ("gemini", ok("g"))]) == ("gemini", "g")
+        assert calls == []
+
+    asyncio.run(main())
+
+
+def test_call_raises_when_every_provider_fails():
+    async def main():
+        router = ProviderRouter(hedge=False)
+        with pytest.raises(AllProvidersFailed) as info:
+            await router.call([("groq", boom(QuotaError())), ("gemini", boom(QuotaError()))])
+        assert info.value.quota_exhausted
+        assert set(info.value.errors) == {"groq", "gemini"}
+
+    asyncio.run(main())
+
+
+def test_burst_after_cooldown_sends_a_single_probe():
+    async def main():
+        router = ProviderRouter(hedge=False)
+        health = router.health("groq")
+        health.record_failure(QuotaError())
+        expire_cooldown(health)
+        results = await asyncio.gather(
+            *(router.attempt("groq", ok(delay=0.01)) for _ in range(20)), return_exceptions=True
+        )
+        assert sum(r == "ok" for r in results) == 1
+        assert sum(isinstance(r, CircuitOpen) for r in results) == 19
+        assert health.state == CLOSED
+
+    asyncio.run(main())
+
+
+def test_cancelled_probe_frees_the_slot():
+    async def main():
+        router = ProviderRouter(hedge=False)
+        health = router.health("groq")
+        health.record_failure(QuotaError())
+        expire_cooldown(health)
+        probe = asyncio.create_task(router.attempt("groq", ok(delay=10)))
+        await asyncio.sleep(0)
+        assert health.probe_in_flight
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert not health.probe_in_flight
+        assert await router.attempt("groq", ok()) == "ok"
+
+    asyncio.run(main())
+
+
+def test_provider_budget_caps_each_provider_including_fallbacks():
+    async def main():
+        router = ProviderRouter(hedge=False)
+        router.health("groq").consecutive_failures = -10 ** 6  # keep the breaker closed throughout
+        live = {"groq": 0, "gemini": 0}
+        peak = {"groq": 0, "gemini": 0}
+
+        def tracked(name, fail):
+            async def fn():
+                live[name] += 1
+                peak[name] = max(peak[name], live[name])
+                await asyncio.sleep(0.01)
+                live[name] -= 1
+                if fail:
+                    raise RuntimeError("down")
+                return name
+            return fn
+
+        limits = {"groq": asyncio.Semaphore(3), "gemini": asyncio.Semaphore(2)}
+
+        async def one():
+            with provider_budget(limits):
+                return await router.call([("groq", tracked("groq", True)), ("gemini", tracked("gemini", False))])
+
+        results = await asyncio.gather(*(one() for _ in range(12)))
+        assert all(name == "gemini" for name, _ in results)
+        assert peak == {"groq": 3, "gemini": 2}
+
+    asyncio.run(main())
+
+
+def test_race_ties_go_to_the_preferred_provider():
+    async def main():
+        for _ in range(40):
+            router = ProviderRouter(hedge=False)
+            name, _ = await router.race(
+                [("flux", boom()), ("pollinations", ok("p")), ("unsplash", ok("u")), ("placeholder", ok("d"))],
+                grace=1,
+            )
+            assert name == "pollinations"
+
+    asyncio.run(main())
+
+
+def test_race_keeps_sequential_providers_out_of_the_burst():
+    async def main():
+        launched = []
+
+        def tracked(name, fn):
+            async def call():
+                launched.append(name)
+                return await fn()
+            return call
+
+        router = ProviderRouter(hedge=False)
+        candidates = [("flux", boom()), ("pollinations", boom()), ("dalle", ok("paid")), ("placeholder", ok("d", 0.01))]
+        name, _ = await router.race([(n, tracked(n, fn)) for n, fn in candidates], grace=1, sequential={"dalle"})
+        assert name == "placeholder" and "dalle" not in launched
+
+        router = ProviderRouter(hedge=False)
+        candidates = [("flux", boom()), ("dalle", ok("paid")), ("sora", ok("paid too")), ("placeholder", boom())]
+        launched.clear()
+        assert await router.race([(n, tracked(n, fn)) for n, fn in candidates], grace=1,
+                                 sequential={"dalle", "sora"}) == ("dalle", "paid")
+        assert launched == ["flux", "placeholder", "dalle"]
+
+    asyncio.run(main())
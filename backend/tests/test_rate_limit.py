@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+import shared_state
+from rate_limit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(shared_state, "_backend", shared_state.MemoryStateBackend())
+
+
+def test_longest_prefix_sets_the_cost():
+    limiter = RateLimiter({"/competitor/analyse": 8, "/competitor/analyse-batch": 20, "/health": 0})
+    assert limiter.cost("/competitor/analyse-batch") == 20
+    assert limiter.cost("/competitor/analyse") == 8
+    assert limiter.cost("/health") == 0
+    assert limiter.cost("/products/") == rate_limit.DEFAULT_COST
+
+
+def test_batch_cost_leaves_room_in_the_default_bucket():
+    limiter = RateLimiter(rate_limit.DEFAULT_COSTS)
+    assert limiter.cost("/competitor/analyse-batch") <= rate_limit.RATE_LIMIT_BURST / 2
+
+
+def test_costs_above_the_burst_are_capped_at_a_full_bucket(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_BURST", 10)
+    limiter = RateLimiter({"/expensive": 60})
+
+    async def main():
+        allowed, remaining, _ = await limiter.check("ws:a", limiter.cost("/expensive"), authenticated=True)
+        assert allowed and remaining == pytest.approx(0, abs=0.1)
+        allowed, _, retry_after = await limiter.check("ws:a", limiter.cost("/expensive"), authenticated=True)
+        assert not allowed and retry_after > 0
+        assert limiter.stats()["limited"] == 1
+
+    asyncio.run(main())
+
+
+def test_anonymous_callers_use_the_smaller_bucket():
+    limiter = RateLimiter({})
+
+    async def main():
+        assert (await limiter.check("ip:1", rate_limit.RATE_LIMIT_ANON_BURST, authenticated=False))[0]
+        assert not (await limiter.check("ip:1", 5, authenticated=False))[0]
+        assert (await limiter.check("ws:1", rate_limit.RATE_LIMIT_ANON_BURST + 5, authenticated=True))[0]
+
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+import ai_clients
+import response_cache
+from response_cache import MemoryCache, ResponseCache, SQLiteCache, TieredCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_keys_change_with_every_input():
+    base = make_key("groq", "llama", "sys", "prompt", {"temperature": 0.8}, "ws")
+    assert base == make_key("groq", "llama", "sys", "prompt", {"temperature": 0.8}, "ws")
+    variants = [
+        make_key("gemini", "llama", "sys", "prompt", {"temperature": 0.8}, "ws"),
+        make_key("groq", "llama", "other", "prompt", {"temperature": 0.8}, "ws"),
+        make_key("groq", "llama", "sys", "prompt!", {"temperature": 0.8}, "ws"),
+        make_key("groq", "llama", "sys", "prompt", {"temperature": 0.9}, "ws"),
+        make_key("groq", "llama", "sys", "prompt", {"temperature": 0.8}, "other-ws"),
+    ]
+    assert base not in variants
+
+
+def test_memory_tier_expires_and_evicts_least_recent(clock):
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", "1", ttl=10)
+    cache.set("b", "2", ttl=10)
+    cache.get("a")
+    cache.set("c", "3", ttl=10)
+    assert cache.get("b") is None and cache.get("a") == "1"
+    clock[0] += 11
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_a_restart_and_promotes_hits(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    TieredCache(MemoryCache(), SQLiteCache(path)).set("k", "v", ttl=60)
+    memory = MemoryCache()
+    restarted = TieredCache(memory, SQLiteCache(path))
+    assert restarted.get("k") == "v"
+    assert memory.get("k") == "v"
+    clock[0] += 61
+    assert SQLiteCache(path).get("k") is None
+
+
+class RecordingBackend(SQLiteCache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value, ttl):
+        self.threads.append(threading.get_ident())
+        super().set(key, value, ttl)
+
+
+def test_async_access_keeps_disk_io_off_the_event_loop(tmp_path):
+    backend = RecordingBackend(str(tmp_path / "cache.db"))
+    cache = ResponseCache(backend)
+
+    async def main():
+        await cache.set_async("k", "v", ttl=60)
+        assert await cache.get_async("k") == "v"
+        assert await cache.get_async("missing") is None
+
+    asyncio.run(main())
+    loop_thread = threading.get_ident()
+    assert len(backend.threads) == 3 and loop_thread not in backend.threads
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_locked_disk_tier_counts_as_a_miss(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(SQLiteCache(path))
+    cache.backend._conn.execute("PRAGMA busy_timeout=10")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        async def main():
+            await cache.set_async("k", "v", ttl=60)
+            return await cache.get_async("k")
+
+        assert asyncio.run(main()) is None
+    finally:
+        other.execute("ROLLBACK")
+
+
+def test_unified_generate_serves_repeats_from_the_cache(monkeypatch, tmp_path):
+    calls = []
+
+    async def route(prompt, model_name, system):
+        calls.append(prompt)
+        return "⚠️ AI providers unavailable: down" if "fail" in prompt else f"answer to {prompt}"
+
+    monkeypatch.setattr(ai_clients, "_route_generate", route)
+    monkeypatch.setattr(ai_clients, "get_response_cache", lambda: cache)
+    cache = ResponseCache(TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "cache.db"))))
+
+    async def main():
+        assert await ai_clients.unified_generate("brief", cache_ttl=60, cache_scope="ws") == "answer to brief"
+        assert await ai_clients.unified_generate("brief", cache_ttl=60, cache_scope="ws") == "answer to brief"
+        await ai_clients.unified_generate("brief", cache_ttl=60, cache_scope="other")
+        await ai_clients.unified_generate("fail", cache_ttl=60)
+        await ai_clients.unified_generate("fail", cache_ttl=60)
+
+    asyncio.run(main())
+    assert calls == ["brief", "brief", "fail", "fail"]
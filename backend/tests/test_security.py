@@ -0,0 +1,111 @@
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from security import HONEYPOT_PENALTY, THREAT_BLOCK_SCORE, SecurityMiddleware, _peek_body
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return PlainTextResponse("pong", headers={"x-frame-options": "SAMEORIGIN"})
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return PlainTextResponse(await request.body())
+
+    @app.get("/stream")
+    async def stream():
+        async def parts():
+            for i in range(3):
+                yield f"part {i}\n"
+        return StreamingResponse(parts(), media_type="text/plain")
+
+    app.add_middleware(SecurityMiddleware)
+    return app
+
+
+_addresses = (f"198.51.100.{i}" for i in itertools.count(1))
+
+
+def _client(app: FastAPI) -> TestClient:
+    """Client with its own address, so threat scores never leak between tests."""
+    ip = next(_addresses)
+
+    async def from_ip(scope, receive, send):
+        await app({**scope, "client": (ip, 1)}, receive, send)
+
+    return TestClient(from_ip)
+
+
+def test_security_headers_replace_handler_values():
+    response = _client(_app()).get("/ping")
+    assert response.text == "pong"
+    assert response.headers["x-frame-options"] == "DENY"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert len(response.headers.get_list("x-frame-options")) == 1
+
+
+def test_streaming_responses_pass_through_chunk_by_chunk():
+    app = _app()
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+             "root_path": "", "headers": [], "client": ("192.0.2.10", 1), "server": ("test", 80)}
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    chunks = [m["body"] for m in sent if m["type"] == "http.response.body" and m.get("body")]
+    assert chunks == [b"part 0\n", b"part 1\n", b"part 2\n"]
+
+
+def test_honeypot_hits_lead_to_a_block():
+    client = _client(_app())
+    for _ in range(-(-THREAT_BLOCK_SCORE // HONEYPOT_PENALTY)):
+        assert client.get("/wp-admin").status_code == 404
+    assert client.get("/ping").status_code == 403
+    assert _client(_app()).get("/ping").status_code == 200
+
+
+def test_waf_blocks_query_and_header_attacks():
+    client = _client(_app())
+    assert client.get("/ping?file=../../etc/passwd").status_code == 400
+    assert client.get("/ping", headers={"user-agent": "<script>alert(1)</script>"}).status_code == 400
+    assert client.get("/ping", params={"q": "running shoes"}).status_code == 200
+
+
+def test_peeked_body_reaches_the_handler_intact():
+    body = b'{"copy": "' + b"x" * 50_000 + b'"}'
+    response = _client(_app()).post("/echo", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 200
+    assert response.content == body
+
+
+def test_peek_reads_only_up_to_the_limit():
+    messages = [{"type": "http.request", "body": b"a" * 10, "more_body": True} for _ in range(5)]
+    messages[-1]["more_body"] = False
+    pending = list(messages)
+    calls = []
+
+    async def receive():
+        calls.append(1)
+        return pending.pop(0)
+
+    async def main():
+        prefix, replay = await _peek_body(receive, 25)
+        assert prefix == b"a" * 25
+        assert len(calls) == 3
+        replayed = [await replay() for _ in range(5)]
+        return replayed
+
+    assert asyncio.run(main()) == messages
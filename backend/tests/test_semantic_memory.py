@@ -0,0 +1,83 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import semantic_memory
+from outcome_store import OutcomeStore
+from semantic_memory import SemanticMemory, VectorIndex, embed
+
+WINNER = "Launch week giveaway: tag a friend to win a free annual plan"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = OutcomeStore(str(tmp_path / "outcomes.db"))
+    monkeypatch.setattr(semantic_memory, "get_outcome_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def memory(tmp_path, store):
+    return SemanticMemory(str(tmp_path / "semantic"))
+
+
+def _log(store, memory, snippet, rating=5, module="campaigns", workspace="ws"):
+    outcome_id = store.log(workspace, module, "posted_as_is", snippet, rating=rating)["id"]
+    return memory.index_outcome(workspace, outcome_id, snippet, rating)
+
+
+def test_embedding_is_deterministic_and_normalised():
+    a, b = embed(WINNER), embed(WINNER)
+    assert np.array_equal(a, b)
+    assert abs(float(np.linalg.norm(a)) - 1.0) < 1e-5
+    assert float(a @ embed("tag a friend to win a free plan")) > float(a @ embed("quarterly churn report"))
+
+
+def test_similar_returns_high_rated_matches_only(store, memory):
+    assert _log(store, memory, WINNER)
+    assert _log(store, memory, "Quarterly churn report for enterprise accounts")
+    assert not _log(store, memory, "Tag a friend to win a free plan, launch week", rating=2)
+
+    hits = memory.similar("ws", "launch giveaway: tag a friend, win a free plan")
+    assert [h["content_snippet"] for h in hits] == [WINNER]
+    assert hits[0]["similarity"] >= semantic_memory.SEMANTIC_MIN_SIMILARITY
+    assert memory.similar("other", WINNER) == []
+
+
+def test_module_filter(store, memory):
+    _log(store, memory, WINNER, module="instagram")
+    assert memory.similar("ws", WINNER, module="campaigns") == []
+    assert memory.similar("ws", WINNER, module="instagram")[0]["module"] == "instagram"
+
+
+def test_first_use_backfills_the_log_once(store, memory):
+    store.log("ws", "campaigns", "shared", WINNER, rating=5)
+    _log(store, memory, "Another five star launch giveaway post")
+    assert len(memory._index("ws")[0]) == 2
+
+
+def test_new_rows_are_visible_to_other_workers(store, memory):
+    other = SemanticMemory(memory.root)
+    assert other.similar("ws", WINNER) == []
+    _log(store, memory, WINNER)
+    assert other.similar("ws", WINNER)[0]["content_snippet"] == WINNER
+
+
+def test_ivf_search_finds_exact_matches(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_memory, "IVF_MIN_ROWS", 256)
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((600, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(str(tmp_path / "ivf"), dim=64)
+    index.create()
+    index.add(list(range(600)), vectors)
+
+    for i in (0, 137, 599):
+        assert index.search(vectors[i], 1)[0][0] == i
+    assert (tmp_path / "ivf" / "ivf.npz").exists()
+
+    # Rows appended after training are still scanned exactly
+    extra = rng.standard_normal(64).astype(np.float32)
+    extra /= np.linalg.norm(extra)
+    index.add([600], extra[None, :])
+    assert index.search(extra, 1)[0][0] == 600
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+import shared_state
+from shared_state import MemoryStateBackend, SQLiteStateBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+def test_bucket_spends_burst_then_refuses(backend, clock):
+    for expected_left in (6, 2):
+        allowed, left, retry_after = backend.take("bucket", "ws", 4, rate=2, burst=10)
+        assert allowed and left == pytest.approx(expected_left) and retry_after == 0
+    allowed, left, retry_after = backend.take("bucket", "ws", 4, rate=2, burst=10)
+    assert not allowed
+    assert left == pytest.approx(2)
+    assert retry_after == pytest.approx(1.0)
+
+
+def test_bucket_refills_at_rate_up_to_burst(backend, clock):
+    backend.take("bucket", "ws", 10, rate=2, burst=10)
+    clock[0] += 1.5
+    allowed, left, _ = backend.take("bucket", "ws", 3, rate=2, burst=10)
+    assert allowed and left == pytest.approx(0)
+    clock[0] += 3600
+    allowed, left, _ = backend.take("bucket", "ws", 1, rate=2, burst=10)
+    assert allowed and left == pytest.approx(9)
+
+
+def test_buckets_are_independent_per_key(backend, clock):
+    backend.take("bucket", "a", 10, rate=1, burst=10)
+    assert not backend.take("bucket", "a", 1, rate=1, burst=10)[0]
+    assert backend.take("bucket", "b", 1, rate=1, burst=10)[0]
+
+
+def test_scores_decay_by_half_life(backend, clock):
+    backend.add("threat", "ip", 40, half_life=60)
+    clock[0] += 60
+    assert backend.get("threat", "ip", half_life=60) == pytest.approx(20)
+    assert backend.add("threat", "ip", 5, half_life=60) == pytest.approx(25)
+
+
+def test_sqlite_fails_open_while_the_database_is_locked(tmp_path):
+    path = str(tmp_path / "state.db")
+    backend = SQLiteStateBackend(path)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert backend.take("bucket", "ws", 5, rate=1, burst=10) == (True, 10, 0.0)
+        assert backend.add("threat", "ip", 5, half_life=60) == 0.0
+        assert backend.errors == 2
+    finally:
+        other.execute("ROLLBACK")
+    assert backend.take("bucket", "ws", 5, rate=1, burst=10)[0]
@@ -0,0 +1,110 @@
+import json
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routers.simulator as simulator
+from auth import get_current_user
+from provider_router import AllProvidersFailed
+from session_store import SessionStore
+
+FAILURE = "⚠️ AI providers unavailable: groq: down"
+
+
+class Fake:
+    def __init__(self):
+        self.replies: list[str] = []
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt, model_name=None, system=None):
+        self.prompts.append(prompt)
+        return self.replies.pop(0) if self.replies else "Fine, tell me more."
+
+    async def stream(self, prompt, model_name=None, system=None):
+        self.prompts.append(prompt)
+        reply = self.replies.pop(0) if self.replies else "Fine, tell me more."
+        if reply == FAILURE:
+            raise AllProvidersFailed({"groq": RuntimeError("down")})
+        for token in re.split(r"(?<= )", reply):
+            yield token
+
+
+@pytest.fixture
+def sim(monkeypatch, tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    fake = Fake()
+    monkeypatch.setattr(simulator, "get_session_store", lambda: store)
+    monkeypatch.setattr(simulator, "unified_generate", fake.generate)
+    monkeypatch.setattr(simulator, "unified_stream", fake.stream)
+    app = FastAPI()
+    app.include_router(simulator.router)
+    app.dependency_overrides[get_current_user] = lambda: {"workspace_id": "ws"}
+    client = TestClient(app)
+    session_id = client.post("/simulator/start", json={"persona": "cfo"}).json()["session_id"]
+    return client, store, fake, session_id
+
+
+def events(response) -> list[dict]:
+    return [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_turns_are_stored_server_side(sim):
+    client, store, fake, session_id = sim
+    r = client.post("/simulator/message", json={"session_id": session_id, "rep_message": "Hello"})
+    assert r.status_code == 200
+    assert [m["role"] for m in store.messages(session_id)] == ["rep", "persona"]
+
+
+def test_provider_failure_is_reported_not_recorded(sim):
+    client, store, fake, session_id = sim
+    fake.replies = [FAILURE]
+    r = client.post("/simulator/message", json={"session_id": session_id, "rep_message": "Hello"})
+    assert r.status_code == 502
+    assert r.json()["detail"] == FAILURE
+    assert store.messages(session_id) == []
+
+
+def test_streamed_provider_failure_is_an_error_event(sim):
+    client, store, fake, session_id = sim
+    fake.replies = [FAILURE]
+    r = client.post("/simulator/message/stream", json={"session_id": session_id, "rep_message": "Hello"})
+    assert events(r)[-1] == {"error": FAILURE}
+    assert store.messages(session_id) == []
+
+
+def test_old_turns_fold_into_the_summary(sim, monkeypatch):
+    client, store, fake, session_id = sim
+    monkeypatch.setattr(simulator, "SIMULATOR_RECENT_MESSAGES", 4)
+    monkeypatch.setattr(simulator, "SIMULATOR_SUMMARY_BATCH", 2)
+    for i in range(3):
+        fake.replies = [f"reply {i}", f"notes after {i}"]
+        client.post("/simulator/message", json={"session_id": session_id, "rep_message": f"pitch {i}"})
+    session = store.get(session_id, "ws")
+    assert session["summarized_upto"] == 2
+    assert session["summary"] == "notes after 2"
+    assert "pitch 0" in fake.prompts[-1] and "pitch 1" not in fake.prompts[-1]
+
+
+def test_failed_summary_is_not_stored(sim, monkeypatch):
+    client, store, fake, session_id = sim
+    monkeypatch.setattr(simulator, "SIMULATOR_RECENT_MESSAGES", 2)
+    monkeypatch.setattr(simulator, "SIMULATOR_SUMMARY_BATCH", 2)
+    store.append(session_id, [{"role": "rep", "content": "a"}, {"role": "persona", "content": "b"}])
+    fake.replies = ["reply", FAILURE]
+    client.post("/simulator/message", json={"session_id": session_id, "rep_message": "c"})
+    assert store.get(session_id, "ws")["summarized_upto"] == 0
+
+
+def test_debrief_uses_the_summary_and_recent_window(sim):
+    client, store, fake, session_id = sim
+    store.append(session_id, [
+        {"role": "rep" if i % 2 == 0 else "persona", "content": f"msg{i + 1}"} for i in range(200)
+    ])
+    store.set_summary(session_id, "SUMMARY-TEXT", 180)
+    assert client.post("/simulator/debrief", json={"session_id": session_id}).status_code == 200
+    prompt = fake.prompts[-1]
+    window = simulator.SIMULATOR_RECENT_MESSAGES + simulator.SIMULATOR_SUMMARY_BATCH
+    assert "SUMMARY-TEXT" in prompt
+    assert f"msg{200 - window + 1}\n" in prompt and f"msg{200 - window}\n" not in prompt
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def main():
+        flight = SingleFlight("test")
+        runs = []
+
+        async def fn():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(10)))
+        assert results == ["result"] * 10
+        assert len(runs) == 1
+        assert flight.stats() == {"calls": 10, "upstream_executions": 1, "coalesced": 9, "in_flight": 0}
+
+    asyncio.run(main())
+
+
+def test_different_keys_and_sequential_calls_run_separately():
+    async def main():
+        flight = SingleFlight("test")
+        runs = []
+
+        async def fn():
+            runs.append(1)
+            return len(runs)
+
+        await asyncio.gather(flight.do("a", fn), flight.do("b", fn))
+        await flight.do("a", fn)
+        assert len(runs) == 3
+
+    asyncio.run(main())
+
+
+def test_failure_reaches_every_waiter():
+    async def main():
+        flight = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def main():
+        flight = SingleFlight("test")
+
+        async def fn():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", fn))
+        second = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "done"
+
+    asyncio.run(main())
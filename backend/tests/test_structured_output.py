@@ -0,0 +1,53 @@
+import json
+
+from structured_output import ScoreExtractor
+
+DEFAULTS = {"Product Quality": 60, "Market Share": 40}
+
+
+def extractor(name: str) -> ScoreExtractor:
+    return ScoreExtractor(f"test_{name}", DEFAULTS)
+
+
+def test_trailing_block_is_parsed_and_cut_out():
+    text = 'Report body.\n\n<MARKET_METRICS>\n{"Product Quality": 82, "Market Share": "35%"}\n</MARKET_METRICS>'
+    result = extractor("trailing").extract(text)
+    assert result.found and result.missing == []
+    assert result.values == {"Product Quality": 82, "Market Share": 35}
+    assert result.text == "Report body."
+
+
+def test_scores_are_clamped_and_missing_keys_default():
+    ex = extractor("clamp")
+    result = ex.extract('Text {"Product Quality": 140.0, "Market Share": "n/a"}')
+    assert result.values == {"Product Quality": 100, "Market Share": 40}
+    assert result.missing == ["Market Share"]
+    assert ex.stats()["partial"] == 1
+
+
+def test_last_block_wins():
+    text = 'Example: {"Product Quality": 1, "Market Share": 1}\nFinal: {"Product Quality": 90, "Market Share": 70}'
+    assert extractor("last").extract(text).values == {"Product Quality": 90, "Market Share": 70}
+
+
+def test_nested_braces_in_strings_do_not_confuse_the_parser():
+    block = json.dumps({"note": "uses {braces}", "Product Quality": 77, "Market Share": 12})
+    result = extractor("nested").extract("Body\n" + block)
+    assert result.values == {"Product Quality": 77, "Market Share": 12}
+    assert result.text == "Body"
+
+
+def test_no_block_falls_back_to_defaults():
+    ex = extractor("none")
+    result = ex.extract('No scores here. {"unrelated": 1} {"Product Quality": ')
+    assert not result.found
+    assert result.values == DEFAULTS
+    assert ex.stats() == {"attempts": 1, "complete": 0, "partial": 0, "failed": 1, "success_rate": 0.0}
+
+
+def test_long_unbalanced_input_stays_fast():
+    import time
+    text = '{"Product Quality": ' + "[" * 50_000 + "x" * 200_000
+    started = time.perf_counter()
+    extractor("adversarial").extract(text)
+    assert time.perf_counter() - started < 1.0
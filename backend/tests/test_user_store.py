@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+import pytest
+
+import auth
+from auth import _TokenCache, create_access_token, resolve_token
+from user_store import SQLiteUserRepository, UserExists
+
+
+def user(email: str, workspace_id: str = "ws-1") -> dict:
+    return {"email": email, "name": "Ada", "hashed_password": "$2b$04$hash", "role": "admin",
+            "workspace_id": workspace_id, "created_at": "2026-01-01T00:00:00"}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    return SQLiteUserRepository(str(tmp_path / "users.db"))
+
+
+def test_users_persist_and_lookups_ignore_case(tmp_path, repo):
+    repo.add(user("ada@example.com"))
+    assert repo.get("ADA@example.com")["workspace_id"] == "ws-1"
+    assert SQLiteUserRepository(str(tmp_path / "users.db")).get("ada@example.com")["name"] == "Ada"
+    assert repo.get("nobody@example.com") is None
+
+
+def test_duplicate_registration_is_rejected(repo):
+    repo.add(user("ada@example.com"))
+    with pytest.raises(UserExists):
+        repo.add(user("ada@example.com", workspace_id="ws-2"))
+    repo.add_if_missing(user("ada@example.com", workspace_id="ws-3"))
+    assert repo.get("ada@example.com")["workspace_id"] == "ws-1"
+
+
+def test_update_password_hash(repo):
+    repo.add(user("ada@example.com"))
+    repo.update_password_hash("Ada@Example.com", "$2b$12$new")
+    assert repo.get("ada@example.com")["hashed_password"] == "$2b$12$new"
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = _TokenCache(max_entries=2, ttl=60)
+    far = 1e12
+    cache.set("a", {"n": 1}, far)
+    cache.set("b", {"n": 2}, far)
+    assert cache.get("a") == {"n": 1}  # "b" is now the oldest
+    cache.set("c", {"n": 3}, far)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+
+def test_token_cache_entries_expire_at_ttl_or_token_exp(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    cache = _TokenCache(max_entries=10, ttl=60)
+    cache.set("long-lived", {}, exp=10_000)
+    cache.set("expiring", {}, exp=1010)
+    now[0] = 1020
+    assert cache.get("expiring") is None
+    assert cache.get("long-lived") == {}
+    now[0] = 1061
+    assert cache.get("long-lived") is None
+    assert cache.stats()["size"] == 0
+
+
+class _CountingRepo:
+    def __init__(self, repo):
+        self.repo = repo
+        self.gets = 0
+
+    def get(self, email):
+        self.gets += 1
+        return self.repo.get(email)
+
+
+def test_resolve_token_verifies_once_and_hides_the_hash(repo, monkeypatch):
+    repo.add(user("ada@example.com"))
+    counting = _CountingRepo(repo)
+    monkeypatch.setattr(auth, "get_user_repository", lambda: counting)
+    monkeypatch.setattr(auth, "_token_cache", _TokenCache())
+
+    token = create_access_token({"sub": "ada@example.com"})
+    principal = resolve_token(token)
+    assert principal["workspace_id"] == "ws-1"
+    assert "hashed_password" not in principal
+    assert resolve_token(token) == principal
+    assert counting.gets == 1
+
+
+def test_resolve_token_rejects_bad_expired_and_orphaned_tokens(repo, monkeypatch):
+    monkeypatch.setattr(auth, "get_user_repository", lambda: repo)
+    monkeypatch.setattr(auth, "_token_cache", _TokenCache())
+    assert resolve_token("not-a-jwt") is None
+    assert resolve_token(create_access_token({"sub": "ghost@example.com"})) is None
+    repo.add(user("ada@example.com"))
+    assert resolve_token(create_access_token({"sub": "ada@example.com"}, timedelta(seconds=-5))) is None
@@ -0,0 +1,76 @@
+import json
+
+from waf import DEFAULT_RULES, WafMatcher, load_rules
+
+
+def matcher() -> WafMatcher:
+    return WafMatcher(load_rules(""))
+
+
+def test_query_blocklist_is_case_insensitive():
+    waf = matcher()
+    assert waf.scan_query("q=1 union select *").name == "sql_union"
+    assert waf.scan_query("file=../../etc/passwd").name == "path_traversal"
+    assert waf.scan_query("name={{7*7}}").name == "template_injection"
+    assert waf.scan_query("q=running shoes&page=2") is None
+
+
+def test_body_only_gets_high_precision_rules():
+    waf = matcher()
+    assert waf.scan_body(b'{"copy": "Hi {{first_name}}, join our union of makers"}') is None
+    assert waf.scan_body(b'{"q": "1 UNION ALL SELECT password"}').name == "sqli_union_select"
+    assert waf.scan_body(b"<ScRiPt>alert(1)</script>").name == "script_tag"
+
+
+def test_headers_skip_credentials():
+    waf = matcher()
+    assert waf.scan_headers([(b"Authorization", b"Bearer ../token"), (b"Cookie", b"x=<script")]) is None
+    assert waf.scan_headers([(b"user-agent", b"<script>")]).name == "script_tag"
+
+
+def test_hits_are_counted_per_rule():
+    waf = matcher()
+    waf.scan_query("eval(1)")
+    waf.scan_query("EVAL(2)")
+    assert waf.stats()["eval_call"] == 2
+    assert all(rule.hits == 0 for rule in DEFAULT_RULES)
+
+
+def test_rules_load_from_json(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([
+        {"name": "literal", "pattern": "a.b", "scopes": ["query"]},
+        {"name": "pattern", "pattern": r"x\d+y", "regex": True, "scopes": ["body"]},
+    ]))
+    waf = WafMatcher(load_rules(str(path)))
+    assert waf.scan_query("axb") is None
+    assert waf.scan_query("a.b").name == "literal"
+    assert waf.scan_body(b"x42y").name == "pattern"
+    assert waf.scan_query("x42y") is None
+
+
+def test_form_bodies_are_url_decoded_before_matching():
+    waf = matcher()
+    form = b"application/x-www-form-urlencoded; charset=utf-8"
+    assert waf.scan_body(b"q=1+UNION+ALL+SELECT+password", form).name == "sqli_union_select"
+    assert waf.scan_body(b"bio=%3CScRiPt%3Ealert(1)", form).name == "script_tag"
+    assert waf.scan_body(b"copy=Join+our+union+of+makers", form) is None
+    # JSON is matched as sent: a literal "%3Cscript" there is not markup
+    assert waf.scan_body(b'{"q": "%3Cscript"}', b"application/json") is None
+
+
+def test_middleware_blocks_encoded_form_attacks():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from security import SecurityMiddleware
+
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"bytes": len(await request.body())}
+
+    app.add_middleware(SecurityMiddleware)
+    client = TestClient(app)
+    assert client.post("/echo", data={"bio": "Join our union of makers"}).status_code == 200
+    assert client.post("/echo", data={"bio": "<script>alert(1)</script>"}).status_code == 400
@@ -0,0 +1,75 @@
+"""
+MarketMind — User Store
+Persistent user accounts behind a small repository interface (SQLite/WAL by default),
+shared by every uvicorn worker on the node and kept across restarts.
+"""
+import os
+import sqlite3
+import threading
+from typing import Optional, Protocol
+
+from db import connect
+
+USERS_DB = os.getenv("USERS_DB", "users.db")
+
+_COLUMNS = ("email", "name", "hashed_password", "role", "workspace_id", "created_at")
+
+
+class UserExists(Exception):
+    """Raised when registering an email that already has an account."""
+
+
+class UserRepository(Protocol):
+    def get(self, email: str) -> Optional[dict]: ...
+    def add(self, user: dict) -> None: ...
+    def add_if_missing(self, user: dict) -> None: ...
+    def update_password_hash(self, email: str, hashed_password: str) -> None: ...
+
+
+class SQLiteUserRepository:
+    def __init__(self, path: str = USERS_DB):
+        self._conn = connect(path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " email TEXT PRIMARY KEY, name TEXT NOT NULL, hashed_password TEXT NOT NULL,"
+            " role TEXT NOT NULL, workspace_id TEXT NOT NULL, created_at TEXT NOT NULL)"
+        )
+
+    def get(self, email: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM users WHERE email = ?", (email.lower(),)).fetchone()
+        return {name: row[name] for name in _COLUMNS} if row else None
+
+    def _insert(self, verb: str, user: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"{verb} INTO users ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                tuple(user[name] for name in _COLUMNS),
+            )
+
+    def add(self, user: dict) -> None:
+        """Insert a new user; the primary key makes concurrent duplicate registrations fail cleanly."""
+        try:
+            self._insert("INSERT", user)
+        except sqlite3.IntegrityError:
+            raise UserExists(user["email"]) from None
+
+    def add_if_missing(self, user: dict) -> None:
+        self._insert("INSERT OR IGNORE", user)
+
+    def update_password_hash(self, email: str, hashed_password: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE users SET hashed_password = ? WHERE email = ?", (hashed_password, email.lower())
+            )
+
+
+_repository: Optional[UserRepository] = None
+
+
+def get_user_repository() -> UserRepository:
+    global _repository
+    if _repository is None:
+        _repository = SQLiteUserRepository()
+    return _repository
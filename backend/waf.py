@@ -0,0 +1,117 @@
+"""
+MarketMind — WAF Matcher
+Every rule for a scope (query, headers, body) is compiled into one alternation of
+named groups, so a request is scanned once per scope no matter how many rules exist;
+the group that matched identifies the rule for its hit counter.
+
+Rules come from DEFAULT_RULES or a JSON file (WAF_RULES_FILE) shaped like:
+  [{"name": "sqli_union", "pattern": "union\\s+select", "regex": true, "scopes": ["query", "body"]}]
+Patterns are case-insensitive; non-regex patterns match literally.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import unquote_plus
+
+WAF_RULES_FILE = os.getenv("WAF_RULES_FILE", "")
+WAF_BODY_INSPECT_BYTES = int(os.getenv("WAF_BODY_INSPECT_BYTES", "8192"))
+
+SCOPES = ("query", "headers", "body")
+
+# Headers that carry opaque credentials — never scanned
+SKIP_HEADERS = {b"authorization", b"cookie"}
+
+
+@dataclass
+class WafRule:
+    name: str
+    pattern: str
+    regex: bool = False
+    scopes: tuple[str, ...] = ("query",)
+    hits: int = field(default=0, compare=False)
+
+    @property
+    def expression(self) -> str:
+        return self.pattern if self.regex else re.escape(self.pattern)
+
+
+# Query strings keep the original blocklist. Headers and bodies carry free text (user agents,
+# campaign copy, "{{first_name}}" email templates), so they only get high-precision rules.
+DEFAULT_RULES = [
+    WafRule("path_traversal", "../", scopes=("query", "headers")),
+    WafRule("path_traversal_win", "..\\", scopes=("query", "headers")),
+    WafRule("script_tag", "<script", scopes=("query", "headers", "body")),
+    WafRule("template_injection", "{{", scopes=("query",)),
+    WafRule("eval_call", "eval(", scopes=("query",)),
+    WafRule("exec_call", "exec(", scopes=("query",)),
+    WafRule("sql_drop", "DROP ", scopes=("query",)),
+    WafRule("sql_union", "UNION ", scopes=("query",)),
+    WafRule("sqli_union_select", r"\bunion\s+(?:all\s+)?select\b", regex=True, scopes=("body",)),
+    WafRule("sqli_drop_table", r"\bdrop\s+(?:table|database)\b", regex=True, scopes=("body",)),
+]
+
+
+def load_rules(path: str = WAF_RULES_FILE) -> list[WafRule]:
+    if not path:
+        return [WafRule(r.name, r.pattern, r.regex, r.scopes) for r in DEFAULT_RULES]
+    with open(path, encoding="utf-8") as f:
+        return [
+            WafRule(r["name"], r["pattern"], bool(r.get("regex", False)), tuple(r.get("scopes", ["query"])))
+            for r in json.load(f)
+        ]
+
+
+class WafMatcher:
+    """Compiled multi-rule matcher with per-rule hit counters."""
+
+    def __init__(self, rules: list[WafRule]):
+        self.rules = rules
+        self._by_group: dict[str, WafRule] = {}
+        self._compiled: dict[str, Optional[re.Pattern]] = {}
+        for scope in SCOPES:
+            parts = []
+            for i, rule in enumerate(rules):
+                if scope in rule.scopes:
+                    group = f"r{i}"
+                    self._by_group[group] = rule
+                    parts.append(f"(?P<{group}>{rule.expression})")
+            self._compiled[scope] = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def _match(self, scope: str, text: str) -> Optional[WafRule]:
+        pattern = self._compiled[scope]
+        if pattern is None or not text:
+            return None
+        m = pattern.search(text)
+        if m is None:
+            return None
+        rule = self._by_group[m.lastgroup]
+        rule.hits += 1
+        return rule
+
+    def scan_query(self, query: str) -> Optional[WafRule]:
+        return self._match("query", query)
+
+    def scan_headers(self, headers: list[tuple[bytes, bytes]]) -> Optional[WafRule]:
+        text = "\n".join(v.decode("latin-1") for k, v in headers if k.lower() not in SKIP_HEADERS)
+        return self._match("headers", text)
+
+    def scan_body(self, prefix: bytes, content_type: bytes = b"") -> Optional[WafRule]:
+        text = prefix[:WAF_BODY_INSPECT_BYTES].decode("utf-8", errors="ignore")
+        if content_type.startswith(b"application/x-www-form-urlencoded"):
+            text = unquote_plus(text)  # "union+select" / "%3Cscript" must match like the decoded form
+        return self._match("body", text)
+
+    def stats(self) -> dict:
+        return {rule.name: rule.hits for rule in self.rules}
+
+
+_matcher: Optional[WafMatcher] = None
+
+
+def get_waf() -> WafMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = WafMatcher(load_rules())
+    return _matcher
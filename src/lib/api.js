@@ -86,6 +86,7 @@ async function streamPost(path, body, onToken, onDone) {
         for (const line of lines) {
             if (!line.startsWith('data: ')) continue;
             const data = JSON.parse(line.slice(6));
+            if (data.error) throw new Error(data.error);
             if (data.done) { onDone(); return; }
             onToken(data.token);
         }
@@ -122,12 +123,21 @@ const api = {
     scoreLead: (data) => post('/leads/score', data),
     scoreLeads: (data) => post('/leads/score', data),
     scoreBatch: (formData) => postForm('/leads/score-batch', formData),
+    scoreBatchStream: (formData, format = 'ndjson') => fetch(`${BASE_URL}/leads/score-batch/stream?format=${format}`, {
+        method: 'POST',
+        headers: getToken() ? { Authorization: `Bearer ${getToken()}` } : {},
+        body: formData,
+    }),
     generateBulkOutreach: (data) => post('/leads/outreach', data),
 
     // Module 6 — Simulator
     getPersonas: () => get('/simulator/personas'),
+    // With a session_id from startSession the server keeps the history; send only the new message
+    startSession: (data) => post('/simulator/start', data),
+    getSession: (sessionId) => get(`/simulator/sessions/${sessionId}`),
     sendMessage: (data) => post('/simulator/message', data).then(res => ({ ...res, content: res.persona_response })),
-    practiceSale: (data) => post('/simulator/message', { persona: data.persona, rep_message: data.rep_message, history: data.history || [], model: data.model }).then(res => ({ ...res, content: res.persona_response })),
+    practiceSale: (data) => post('/simulator/message', { persona: data.persona, rep_message: data.rep_message, session_id: data.session_id, history: data.session_id ? [] : (data.history || []), model: data.model }).then(res => ({ ...res, content: res.persona_response })),
+    streamMessage: (data, onToken, onDone) => streamPost('/simulator/message/stream', { persona: data.persona, rep_message: data.rep_message, session_id: data.session_id, history: data.session_id ? [] : (data.history || []), model: data.model }, onToken, onDone),
     getDebrief: (data) => post('/simulator/debrief', data),
 
     // Module 7 — Intelligence